@@ -0,0 +1,388 @@
+"""
+Process-wide registry for the app config (-c FILE) and app_settings.json.
+
+Each file is parsed and validated once; every caller shares the same dict:
+
+    from Campaigns_and_Channels.config import CONFIG
+
+    config = CONFIG.load_config("IT566_app_config.json")   # ConfigError if invalid
+    settings = CONFIG.settings()                           # app_settings.json
+
+Long-running modes (interactive menu, --serve) call CONFIG.watch(), which
+polls the loaded files' mtimes and hot-reloads the RELOADABLE keys in
+place (log level, buffer/table sizes, slow-query threshold). Other changes
+are reported as needing a restart. An edit that fails to parse or
+validate is reported and the running config is kept.
+
+Components that copy values out of the config at startup subscribe to be
+told about reloads: CONFIG.subscribe(callback), callback(source, changed,
+doc) with source "config" or "settings" and changed a list of dotted keys.
+Bound methods are held weakly.
+"""
+
+import copy
+import json
+import os
+import sys
+import threading
+import weakref
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+
+class ConfigError(ValueError):
+    """A config or settings file is unreadable or fails validation."""
+
+
+class Field:
+    """
+    Schema entry for one key.
+      kind     : expected type (or tuple of types); dict fields may nest `fields`
+      required : key must be present
+      choices  : allowed values
+      minimum  : lower bound for numbers
+      maximum  : upper bound for numbers
+    """
+
+    __slots__ = ("kind", "required", "choices", "minimum", "maximum", "fields")
+
+    def __init__(self, kind, required: bool = False, choices=None, minimum=None,
+                 maximum=None, fields: Optional[Dict[str, "Field"]] = None) -> None:
+        self.kind = kind
+        self.required = required
+        self.choices = choices
+        self.minimum = minimum
+        self.maximum = maximum
+        self.fields = fields
+
+
+_NUMBER = (int, float)
+LOG_LEVELS = ("notset", "debug", "info", "warning", "error", "critical")
+
+CONFIG_SCHEMA = {
+    "meta": Field(dict, required=True, fields={
+        "log_prefix": Field(str, required=True),
+        "version": Field(str),
+        "app_name": Field(str),
+    }),
+    "database": Field(dict, required=True, fields={
+        "pool": Field(dict, required=True, fields={
+            "name": Field(str, required=True),
+            "size": Field(int, required=True, minimum=1),
+            "reset_session": Field(bool),
+            "use_pure": Field(bool),
+            "warm_up": Field(bool),
+        }),
+        "connection": Field(dict, required=True, fields={
+            "config": Field(dict, required=True, fields={
+                "host": Field(str),
+                "port": Field(int, minimum=1),
+                "user": Field(str),
+                "password": Field(str),
+                "database": Field(str),
+            }),
+        }),
+        "driver": Field(str, choices=("cext", "pure", "auto")),
+        "statement_cache": Field(dict, fields={"prepared": Field(bool)}),
+        "instrumentation": Field(dict, fields={
+            "enabled": Field(bool),
+            "slow_query_ms": Field(_NUMBER, minimum=0),
+            "log_params": Field(bool),
+        }),
+        "query_audit": Field(dict, fields={
+            "enabled": Field(bool),
+            "mode": Field(str, choices=("warn", "fail")),
+            "max_per_template": Field(int, minimum=1),
+            "stack_depth": Field(int, minimum=1),
+        }),
+    }),
+    "metrics_buffer": Field(dict, fields={
+        "enabled": Field(bool),
+        "mode": Field(str, choices=("overwrite", "additive")),
+        "max_pending": Field(int, minimum=1),
+        "flush_interval_seconds": Field(_NUMBER, minimum=0),
+        "max_attempts": Field(int, minimum=1),
+    }),
+    "ui": Field(dict, fields={
+        "max_rows": Field(int, minimum=1),
+        "pager": Field(str, choices=("auto", "always", "never")),
+        "sample_rows": Field(int, minimum=1),
+        "chunk_rows": Field(int, minimum=1),
+    }),
+    "http": Field(dict, fields={
+        "host": Field(str),
+        "port": Field(int, minimum=0),
+        "workers": Field(int, minimum=1),
+        "keepalive_timeout": Field(_NUMBER, minimum=0),
+        "etag_ttl_seconds": Field(_NUMBER, minimum=0),
+        "access_log": Field(bool),
+    }),
+    "tracing": Field(dict, fields={
+        "enabled": Field(bool),
+        "file": Field(str),
+        "sample_rate": Field(_NUMBER, minimum=0, maximum=1),
+    }),
+    "profiling": Field(dict, fields={
+        "enabled": Field(bool),
+        "memory": Field(bool),
+        "sample_rate": Field(_NUMBER, minimum=0, maximum=1),
+        "dir": Field(str),
+        "top_n": Field(int, minimum=1),
+    }),
+    "reload": Field(dict, fields={
+        "interval_seconds": Field(_NUMBER, minimum=0),
+    }),
+    "purge": Field(dict, fields={
+        "retention_days": Field(int, minimum=1),
+        "mode": Field(str, choices=("delete", "archive")),
+        "chunk_rows": Field(int, minimum=1),
+        "throttle_ms": Field(_NUMBER, minimum=0),
+    }),
+}
+
+SETTINGS_SCHEMA = {
+    "logs_dir": Field(str, required=True),
+    "log_filename": Field(str, required=True),
+    "log_level": Field(str, required=True, choices=LOG_LEVELS),
+    "log_to_console": Field(bool, required=True),
+    "log_to_file": Field(bool, required=True),
+    "deployed_to_production": Field(bool),
+    "log_queue_size": Field(int, minimum=1),
+    "log_queue_policy": Field(str, choices=("drop", "block")),
+    "log_queue_block_ms": Field(_NUMBER, minimum=0),
+    "log_debug_sample_rate": Field(_NUMBER, minimum=0, maximum=1),
+}
+
+# Dotted keys (or prefixes) applied to the running process on reload
+RELOADABLE = {
+    "config": (
+        "database.instrumentation",
+        "database.query_audit",
+        "metrics_buffer.max_pending",
+        "metrics_buffer.flush_interval_seconds",
+        "metrics_buffer.max_attempts",
+        "ui",
+        "reload.interval_seconds",
+        "purge",
+    ),
+    "settings": ("log_level", "log_queue_policy", "log_queue_block_ms", "log_debug_sample_rate"),
+}
+
+
+def validate(doc, schema: Dict[str, Field], path: str = "") -> List[str]:
+    """Problems found in doc (empty when valid). Unknown keys are allowed."""
+    if not isinstance(doc, dict):
+        return [f"{path or 'document'}: expected an object"]
+    problems = []
+    for key, field in schema.items():
+        where = f"{path}.{key}" if path else key
+        if key not in doc:
+            if field.required:
+                problems.append(f"{where}: required")
+            continue
+        value = doc[key]
+        # bool is an int subclass: do not accept true for a size
+        if not isinstance(value, field.kind) or (isinstance(value, bool) and field.kind is not bool):
+            kinds = field.kind if isinstance(field.kind, tuple) else (field.kind,)
+            problems.append(f"{where}: expected {' or '.join(k.__name__ for k in kinds)}, "
+                            f"got {type(value).__name__}")
+            continue
+        if field.choices is not None and value not in field.choices:
+            problems.append(f"{where}: must be one of {', '.join(map(str, field.choices))}")
+        if field.minimum is not None and value < field.minimum:
+            problems.append(f"{where}: must be >= {field.minimum}")
+        if field.maximum is not None and value > field.maximum:
+            problems.append(f"{where}: must be <= {field.maximum}")
+        if field.fields is not None:
+            problems += validate(value, field.fields, where)
+    return problems
+
+
+def _diff(old, new, path: str = "") -> List[str]:
+    """Dotted keys whose values differ between two documents."""
+    if isinstance(old, dict) and isinstance(new, dict):
+        out = []
+        for key in sorted(set(old) | set(new), key=str):
+            where = f"{path}.{key}" if path else str(key)
+            out += _diff(old.get(key), new.get(key), where)
+        return out
+    return [] if old == new else [path]
+
+
+def _reloadable(source: str, key: str) -> bool:
+    return any(key == p or key.startswith(p + ".") for p in RELOADABLE[source])
+
+
+def _assign(doc: dict, key: str, new_doc: dict) -> None:
+    """Copy one dotted key from new_doc into doc, in place."""
+    parts = key.split(".")
+    src = new_doc
+    for part in parts[:-1]:
+        src = src.get(part, {}) if isinstance(src, dict) else {}
+        doc = doc.setdefault(part, {})
+    if isinstance(src, dict) and parts[-1] in src:
+        doc[parts[-1]] = copy.deepcopy(src[parts[-1]])
+    else:
+        doc.pop(parts[-1], None)
+
+
+class _Entry:
+    __slots__ = ("source", "path", "doc", "stamp")
+
+    def __init__(self, source: str, path: str, doc: dict, stamp) -> None:
+        self.source = source
+        self.path = path
+        self.doc = doc
+        self.stamp = stamp
+
+
+def _stamp(path: str):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+class ConfigRegistry:
+    def __init__(self) -> None:
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.RLock()
+        self._subscribers: list = []
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.interval_seconds = 2.0
+
+    # ---------------------------------------------------------- #
+    # LOADING
+    # ---------------------------------------------------------- #
+    def _parse(self, path: str, schema: Dict[str, Field]) -> dict:
+        try:
+            with open(path, "r") as f:
+                doc = json.loads(f.read())
+        except ValueError as e:
+            raise ConfigError(f"{path}: invalid JSON: {e}")
+        problems = validate(doc, schema)
+        if problems:
+            raise ConfigError(f"{path}: " + "; ".join(problems))
+        return doc
+
+    def load_config(self, path: str) -> dict:
+        """The validated app config at path, parsed once per process."""
+        key = str(Path(path).resolve())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                try:
+                    doc = self._parse(path, CONFIG_SCHEMA)
+                except OSError as e:
+                    raise ConfigError(f"{path}: {e.strerror or e}")
+                entry = self._entries[key] = _Entry("config", key, doc, _stamp(key))
+            return entry.doc
+
+    def settings(self, path: str = "app_settings.json") -> dict:
+        """
+        The validated settings file, parsed once per process. A missing file
+        is created with defaults; an unreadable or invalid one raises
+        ConfigError and is left untouched.
+        """
+        key = str(Path(path).resolve())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                try:
+                    doc = self._parse(path, SETTINGS_SCHEMA)
+                except FileNotFoundError:
+                    from .settings import Settings
+                    doc = Settings().create_settings_json_file(path)
+                except OSError as e:
+                    raise ConfigError(f"{path}: {e.strerror or e}")
+                entry = self._entries[key] = _Entry("settings", key, doc, _stamp(key))
+            return entry.doc
+
+    # ---------------------------------------------------------- #
+    # HOT RELOAD
+    # ---------------------------------------------------------- #
+    def subscribe(self, callback: Callable) -> None:
+        """callback(source, changed_keys, doc) after each applied reload."""
+        ref = weakref.WeakMethod(callback) if hasattr(callback, "__self__") else (lambda: callback)
+        with self._lock:
+            self._subscribers.append(ref)
+
+    def check(self) -> List[str]:
+        """Reload any changed file once; returns the keys applied."""
+        applied = []
+        with self._lock:
+            entries = list(self._entries.values())
+        for entry in entries:
+            stamp = _stamp(entry.path)
+            if stamp is None or stamp == entry.stamp:
+                continue
+            entry.stamp = stamp
+            schema = CONFIG_SCHEMA if entry.source == "config" else SETTINGS_SCHEMA
+            try:
+                new_doc = self._parse(entry.path, schema)
+            except (ConfigError, OSError) as e:
+                print(f"WARNING: config reload skipped, keeping running values: {e}", file=sys.stderr)
+                continue
+
+            changed = _diff(entry.doc, new_doc)
+            live = [k for k in changed if _reloadable(entry.source, k)]
+            ignored = [k for k in changed if k not in live]
+            with self._lock:
+                for key in live:
+                    _assign(entry.doc, key, new_doc)
+            if ignored:
+                print(f"WARNING: {entry.path}: restart to apply {', '.join(ignored)}", file=sys.stderr)
+            if live:
+                self._notify(entry.source, live, entry.doc)
+                applied += live
+        return applied
+
+    def _notify(self, source: str, changed: List[str], doc: dict) -> None:
+        with self._lock:
+            refs = list(self._subscribers)
+        dead = []
+        for ref in refs:
+            callback = ref()
+            if callback is None:
+                dead.append(ref)
+                continue
+            try:
+                callback(source, changed, doc)
+            except Exception as e:
+                print(f"WARNING: config reload handler failed: {e!r}", file=sys.stderr)
+        if dead:
+            with self._lock:
+                self._subscribers = [r for r in self._subscribers if r not in dead]
+
+    def watch(self, interval_seconds: Optional[float] = None) -> None:
+        """
+        Start polling loaded files for changes (daemon thread; idempotent).
+        Interval: argument, else config reload.interval_seconds, else 2s.
+        0 disables watching.
+        """
+        if interval_seconds is None:
+            for entry in self._entries.values():
+                if entry.source == "config":
+                    interval_seconds = entry.doc.get("reload", {}).get("interval_seconds")
+        if interval_seconds is not None:
+            self.interval_seconds = float(interval_seconds)
+        if self.interval_seconds <= 0 or self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._run, name="config-watch", daemon=True)
+        self._watcher.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds if self.interval_seconds > 0 else 2.0):
+            self.check()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+
+CONFIG = ConfigRegistry()
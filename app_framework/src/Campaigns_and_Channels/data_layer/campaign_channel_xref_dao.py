@@ -1,11 +1,442 @@
 from __future__ import annotations
 
-from datetime import date
-from typing import List, Dict, Optional
+import json
+from datetime import date, datetime
+from typing import List, Dict, Iterator, Optional
 
-from .db import DB, row_to_dict
+from .db import (
+    DB, Fields, rows_to_dicts, fetch_one, in_chunks, in_placeholders, projection_key, select_list,
+)
+from .campaign_dao import COLUMNS as CAMPAIGN_COLUMNS
+from .channel_dao import COLUMNS as CHANNEL_COLUMNS
+from .query_registry import QUERIES
+from .instrumentation import instrument_dao
+from .schema import ensure_table
 
 
+_LINK_CHECK = QUERIES.register("xref.link_check", """
+    SELECT 1 FROM campaign_channel_xref
+    WHERE campaign_id = %s AND channel_id = %s
+""")
+_LINK_INSERT = QUERIES.register("xref.link_insert", """
+    INSERT INTO campaign_channel_xref (campaign_id, channel_id)
+    VALUES (%s, %s)
+""")
+_UNLINK = QUERIES.register("xref.unlink", """
+    DELETE FROM campaign_channel_xref
+    WHERE campaign_id = %s AND channel_id = %s
+""")
+
+
+def _channels_for_campaign_template(fields: Fields):
+    def build():
+        return f"""
+            SELECT {select_list('channel', CHANNEL_COLUMNS, fields, alias='ch')}
+            FROM channel ch
+            JOIN campaign_channel_xref ccx
+              ON ccx.channel_id = ch.channel_id
+            WHERE ccx.campaign_id = %s
+            ORDER BY ch.channel_id
+        """
+    return QUERIES.variant(
+        "xref.list_channels_for_campaign", projection_key(CHANNEL_COLUMNS, fields), build
+    )
+
+
+# Many campaigns at once: IN list on the primary key's leading column,
+# keyset-paginated on (campaign_id, channel_id), the primary key order.
+def _channels_for_campaigns_template(n: int, fields: Fields):
+    def build():
+        return f"""
+            SELECT ccx.campaign_id, {select_list('channel', CHANNEL_COLUMNS, fields, alias='ch')}
+            FROM campaign_channel_xref ccx
+            JOIN channel ch
+              ON ch.channel_id = ccx.channel_id
+            WHERE ccx.campaign_id IN ({in_placeholders(n)})
+              AND (ccx.campaign_id > %s OR (ccx.campaign_id = %s AND ccx.channel_id > %s))
+            ORDER BY ccx.campaign_id, ccx.channel_id
+            LIMIT %s
+        """
+    key = ";".join(k for k in (str(n), projection_key(CHANNEL_COLUMNS, fields)) if k)
+    return QUERIES.variant("xref.channels_for_campaigns", key, build, paged=True)
+
+
+# The reverse direction walks the (channel_id, campaign_id) order of the
+# fk_ccx_channel index (InnoDB secondary indexes carry the primary key),
+# keyset-paginated on campaign_id: every page is one index range scan.
+def _campaigns_for_channel_template(fields: Fields):
+    def build():
+        return f"""
+            SELECT {select_list('campaign', CAMPAIGN_COLUMNS, fields, alias='c')}
+            FROM campaign_channel_xref ccx
+            JOIN campaign c
+              ON c.campaign_id = ccx.campaign_id
+            WHERE ccx.channel_id = %s AND ccx.campaign_id > %s
+            ORDER BY ccx.campaign_id
+            LIMIT %s
+        """
+    return QUERIES.variant(
+        "xref.campaigns_for_channel", projection_key(CAMPAIGN_COLUMNS, fields), build,
+        paged=True,
+    )
+
+
+def _campaigns_for_channels_template(n: int, fields: Fields):
+    def build():
+        return f"""
+            SELECT ccx.channel_id, {select_list('campaign', CAMPAIGN_COLUMNS, fields, alias='c')}
+            FROM campaign_channel_xref ccx
+            JOIN campaign c
+              ON c.campaign_id = ccx.campaign_id
+            WHERE ccx.channel_id IN ({in_placeholders(n)})
+              AND (ccx.channel_id > %s OR (ccx.channel_id = %s AND ccx.campaign_id > %s))
+            ORDER BY ccx.channel_id, ccx.campaign_id
+            LIMIT %s
+        """
+    key = ";".join(k for k in (str(n), projection_key(CAMPAIGN_COLUMNS, fields)) if k)
+    return QUERIES.variant("xref.campaigns_for_channels", key, build, paged=True)
+
+
+_UPSERT_METRICS_SQL = """
+    INSERT INTO campaign_daily_metrics (
+        campaign_id, metric_date, impressions, clicks, spend_cents, revenue_cents
+    )
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+      impressions = VALUES(impressions),
+      clicks      = VALUES(clicks),
+      spend_cents = VALUES(spend_cents),
+      revenue_cents = VALUES(revenue_cents)
+"""
+_INCREMENT_METRICS_SQL = """
+    INSERT INTO campaign_daily_metrics (
+        campaign_id, metric_date, impressions, clicks, spend_cents, revenue_cents
+    )
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+      impressions = impressions + VALUES(impressions),
+      clicks      = clicks + VALUES(clicks),
+      spend_cents = spend_cents + VALUES(spend_cents),
+      revenue_cents = revenue_cents + VALUES(revenue_cents)
+"""
+# executemany rewrites plain-cursor INSERTs into one multi-row statement,
+# so the bulk forms deliberately skip server-side prepare
+_UPSERT_METRICS_MANY = QUERIES.register(
+    "xref.upsert_metrics_many", _UPSERT_METRICS_SQL, prepared=False
+)
+_INCREMENT_METRICS_MANY = QUERIES.register(
+    "xref.increment_metrics_many", _INCREMENT_METRICS_SQL, prepared=False
+)
+_LIFETIME_ADD_SQL = """
+    INSERT INTO campaign_lifetime_metrics (
+        campaign_id, impressions, clicks, spend_cents, revenue_cents
+    )
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+      impressions = impressions + VALUES(impressions),
+      clicks      = clicks + VALUES(clicks),
+      spend_cents = spend_cents + VALUES(spend_cents),
+      revenue_cents = revenue_cents + VALUES(revenue_cents)
+"""
+_LIFETIME_ADD_MANY = QUERIES.register(
+    "xref.lifetime_add_many", _LIFETIME_ADD_SQL, prepared=False
+)
+_LIFETIME_GET = QUERIES.register("xref.lifetime_get", """
+    SELECT impressions, clicks, spend_cents, revenue_cents
+    FROM campaign_lifetime_metrics
+    WHERE campaign_id = %s
+""")
+# Daily rows plus the sums db:purge recorded for the rows it removed: what
+# the lifetime totals must add up to
+_LIFETIME_SOURCE = """
+    SELECT campaign_id, impressions, clicks, spend_cents, revenue_cents
+    FROM campaign_daily_metrics
+    UNION ALL
+    SELECT campaign_id, impressions, clicks, spend_cents, revenue_cents
+    FROM campaign_purged_metrics
+"""
+# Campaigns whose stored lifetime totals differ from their daily (and
+# purged) rows, in both directions: daily rows without a (matching)
+# summary row, and summary rows left non-zero after their rows are gone.
+_LIFETIME_DRIFT = QUERIES.register("xref.lifetime_drift", f"""
+    SELECT d.campaign_id,
+           COALESCE(l.impressions, 0), COALESCE(l.clicks, 0),
+           COALESCE(l.spend_cents, 0), COALESCE(l.revenue_cents, 0),
+           d.impressions, d.clicks, d.spend_cents, d.revenue_cents
+    FROM (
+        SELECT campaign_id,
+               COALESCE(SUM(impressions), 0)   AS impressions,
+               COALESCE(SUM(clicks), 0)        AS clicks,
+               COALESCE(SUM(spend_cents), 0)   AS spend_cents,
+               COALESCE(SUM(revenue_cents), 0) AS revenue_cents
+        FROM ({_LIFETIME_SOURCE}) m
+        GROUP BY campaign_id
+    ) d
+    LEFT JOIN campaign_lifetime_metrics l ON l.campaign_id = d.campaign_id
+    WHERE COALESCE(l.impressions, 0) <> d.impressions
+       OR COALESCE(l.clicks, 0) <> d.clicks
+       OR COALESCE(l.spend_cents, 0) <> d.spend_cents
+       OR COALESCE(l.revenue_cents, 0) <> d.revenue_cents
+    UNION ALL
+    SELECT l.campaign_id,
+           l.impressions, l.clicks, l.spend_cents, l.revenue_cents,
+           0, 0, 0, 0
+    FROM campaign_lifetime_metrics l
+    WHERE NOT EXISTS (
+            SELECT 1 FROM campaign_daily_metrics d WHERE d.campaign_id = l.campaign_id)
+      AND NOT EXISTS (
+            SELECT 1 FROM campaign_purged_metrics p WHERE p.campaign_id = l.campaign_id)
+      AND (l.impressions <> 0 OR l.clicks <> 0 OR l.spend_cents <> 0 OR l.revenue_cents <> 0)
+    ORDER BY 1
+""")
+
+
+METRIC_COLUMNS = ("impressions", "clicks", "spend_cents", "revenue_cents")
+
+
+def _old_metrics_template(n: int):
+    # the daily rows an overwrite batch replaces, locked until commit
+    def build():
+        return f"""
+            SELECT campaign_id, metric_date, impressions, clicks, spend_cents, revenue_cents
+            FROM campaign_daily_metrics
+            WHERE campaign_id IN ({in_placeholders(n)})
+              AND metric_date BETWEEN %s AND %s
+            FOR UPDATE
+        """
+    return QUERIES.variant("xref.old_metrics_for_update", str(n), build, paged=True)
+
+
+def _lifetime_rebuild_template(n: int):
+    def build():
+        return f"""
+            INSERT INTO campaign_lifetime_metrics (
+                campaign_id, impressions, clicks, spend_cents, revenue_cents
+            )
+            SELECT campaign_id,
+                   COALESCE(SUM(impressions), 0), COALESCE(SUM(clicks), 0),
+                   COALESCE(SUM(spend_cents), 0), COALESCE(SUM(revenue_cents), 0)
+            FROM (
+                SELECT campaign_id, impressions, clicks, spend_cents, revenue_cents
+                FROM campaign_daily_metrics
+                WHERE campaign_id IN ({in_placeholders(n)})
+                UNION ALL
+                SELECT campaign_id, impressions, clicks, spend_cents, revenue_cents
+                FROM campaign_purged_metrics
+                WHERE campaign_id IN ({in_placeholders(n)})
+            ) m
+            GROUP BY campaign_id
+            ON DUPLICATE KEY UPDATE
+              impressions = VALUES(impressions),
+              clicks      = VALUES(clicks),
+              spend_cents = VALUES(spend_cents),
+              revenue_cents = VALUES(revenue_cents)
+        """
+    return QUERIES.variant("xref.lifetime_rebuild", str(n), build, paged=True)
+
+
+def _lifetime_prune_template(n: int):
+    def build():
+        return f"""
+            DELETE FROM campaign_lifetime_metrics
+            WHERE campaign_id IN ({in_placeholders(n)})
+              AND NOT EXISTS (
+                  SELECT 1 FROM campaign_daily_metrics d
+                  WHERE d.campaign_id = campaign_lifetime_metrics.campaign_id)
+              AND NOT EXISTS (
+                  SELECT 1 FROM campaign_purged_metrics p
+                  WHERE p.campaign_id = campaign_lifetime_metrics.campaign_id)
+        """
+    return QUERIES.variant("xref.lifetime_prune", str(n), build, paged=True)
+
+
+def _lifetime_deltas(rows) -> List[tuple]:
+    """Per-campaign sums of (campaign_id, date, impr, clicks, spend, revenue) rows."""
+    totals: Dict[int, list] = {}
+    for row in rows:
+        acc = totals.setdefault(row[0], [0, 0, 0, 0])
+        for i in range(4):
+            acc[i] += int(row[2 + i] or 0)
+    # campaign order: concurrent batches lock summary rows in the same order
+    return [(cid, *acc) for cid, acc in sorted(totals.items()) if any(acc)]
+
+
+# metrics_idempotency_key.idempotency_key is VARCHAR(191): INSERT IGNORE
+# would truncate a longer key and let two keys collide, so callers reject them
+IDEMPOTENCY_KEY_MAX_LENGTH = 191
+
+_CLAIM_IDEMPOTENCY_KEY = QUERIES.register("xref.claim_idempotency_key", """
+    INSERT IGNORE INTO metrics_idempotency_key (idempotency_key, rows_applied)
+    VALUES (%s, %s)
+""")
+
+_COUNT_CAMPAIGNS_FOR_CHANNEL = QUERIES.register("xref.count_campaigns_for_channel", """
+    SELECT COUNT(*)
+    FROM campaign_channel_xref
+    WHERE channel_id = %s
+""")
+_COUNT_CHANNELS_FOR_CAMPAIGN = QUERIES.register("xref.count_channels_for_campaign", """
+    SELECT COUNT(*)
+    FROM campaign_channel_xref
+    WHERE campaign_id = %s
+""")
+_ALL_MAPPINGS = QUERIES.register("xref.list_all_mappings", """
+    SELECT
+        ccx.campaign_id,
+        c.name AS campaign_name,
+        ccx.channel_id,
+        ch.name AS channel_name
+    FROM campaign_channel_xref ccx
+    JOIN campaign c ON ccx.campaign_id = c.campaign_id
+    JOIN channel ch ON ccx.channel_id = ch.channel_id
+    ORDER BY ccx.campaign_id, ccx.channel_id
+""")
+_MAPPINGS_PAGE_AFTER = QUERIES.register("xref.mappings_page_after", """
+    SELECT
+        ccx.campaign_id,
+        c.name AS campaign_name,
+        ccx.channel_id,
+        ch.name AS channel_name
+    FROM campaign_channel_xref ccx
+    JOIN campaign c ON ccx.campaign_id = c.campaign_id
+    JOIN channel ch ON ccx.channel_id = ch.channel_id
+    WHERE ccx.campaign_id > %s
+       OR (ccx.campaign_id = %s AND ccx.channel_id > %s)
+    ORDER BY ccx.campaign_id, ccx.channel_id
+    LIMIT %s
+""", paged=True)
+
+# Campaign row + its channels (one JSON array) + lifetime metric totals in
+# one round trip. JSON_ARRAYAGG gives no order guarantee; the DAO sorts.
+_CAMPAIGN_DETAIL = QUERIES.register("xref.campaign_detail", f"""
+    SELECT
+        {", ".join("c." + col for col in CAMPAIGN_COLUMNS)},
+        (SELECT JSON_ARRAYAGG(JSON_OBJECT(
+                    'channel_id', ch.channel_id, 'name', ch.name,
+                    'type', ch.type, 'created_at', ch.created_at))
+           FROM campaign_channel_xref ccx
+           JOIN channel ch ON ch.channel_id = ccx.channel_id
+          WHERE ccx.campaign_id = c.campaign_id) AS channels,
+        COALESCE(m.impressions, 0)   AS impressions,
+        COALESCE(m.clicks, 0)        AS clicks,
+        COALESCE(m.spend_cents, 0)   AS spend_cents,
+        COALESCE(m.revenue_cents, 0) AS revenue_cents
+    FROM campaign c
+    LEFT JOIN campaign_lifetime_metrics m ON m.campaign_id = c.campaign_id
+    WHERE c.campaign_id = %s
+""")
+
+
+def _performance(campaign_id, impressions, clicks, spend_cents, revenue_cents,
+                 start_date=None, end_date=None) -> Dict:
+    """Totals (Decimal/None from SUM) -> the performance dict with derived KPIs."""
+    impressions = int(impressions or 0)
+    clicks = int(clicks or 0)
+    spend_cents = int(spend_cents or 0)
+    revenue_cents = int(revenue_cents or 0)
+
+    # Safe computed metrics
+    ctr = (clicks / impressions) if impressions > 0 else 0.0
+    cpc = (spend_cents / clicks) / 100.0 if clicks > 0 else 0.0  # USD/click
+    roas = (revenue_cents / spend_cents) if spend_cents > 0 else 0.0
+
+    return {
+        "campaign_id": campaign_id,
+        "impressions": impressions,
+        "clicks": clicks,
+        "spend_cents": spend_cents,
+        "revenue_cents": revenue_cents,
+        "ctr": ctr,
+        "cpc": cpc,
+        "roas": roas,
+        "start_date": start_date,
+        "end_date": end_date,
+    }
+
+
+def _json_channels(value) -> List[Dict]:
+    """Decode the JSON_ARRAYAGG column (NULL when no channels are linked)."""
+    if value is None:
+        return []
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode()
+    channels = json.loads(value) if isinstance(value, str) else value
+    for ch in channels:
+        # JSON has no timestamp type: restore what the row-based reads return
+        if isinstance(ch.get("created_at"), str):
+            ch["created_at"] = datetime.fromisoformat(ch["created_at"])
+    channels.sort(key=lambda ch: ch["channel_id"])
+    return channels
+
+
+def _performance_template(has_start: bool, has_end: bool):
+    def build():
+        base_sql = """
+            SELECT
+                COALESCE(SUM(impressions), 0)   AS impressions,
+                COALESCE(SUM(clicks), 0)        AS clicks,
+                COALESCE(SUM(spend_cents), 0)   AS spend_cents,
+                COALESCE(SUM(revenue_cents), 0) AS revenue_cents
+            FROM campaign_daily_metrics
+            WHERE campaign_id = %s
+        """
+        if has_start:
+            base_sql += " AND metric_date >= %s"
+        if has_end:
+            base_sql += " AND metric_date <= %s"
+        return base_sql
+
+    key = ("start" if has_start else "") + ("," if has_start and has_end else "") + \
+        ("end" if has_end else "")
+    return QUERIES.variant("xref.get_campaign_performance", key, build)
+
+
+def _compare_template(n: Optional[int]):
+    """
+    Current- and prior-window totals per campaign in one pass over the
+    union of both windows; n IN placeholders, or every campaign if None.
+    """
+    def build():
+        sums = ",\n                ".join(
+            f"COALESCE(SUM(CASE WHEN m.metric_date BETWEEN %s AND %s THEN m.{col} END), 0)"
+            for _window in ("current", "prior")
+            for col in METRIC_COLUMNS
+        )
+        where = f"WHERE c.campaign_id IN ({in_placeholders(n)})" if n is not None else ""
+        return f"""
+            SELECT
+                c.campaign_id, c.name,
+                {sums}
+            FROM campaign c
+            LEFT JOIN campaign_daily_metrics m
+              ON m.campaign_id = c.campaign_id
+             AND m.metric_date BETWEEN %s AND %s
+            {where}
+            GROUP BY c.campaign_id, c.name
+            ORDER BY c.campaign_id
+        """
+    return QUERIES.variant(
+        "xref.compare_performance", "all" if n is None else str(n), build, paged=True
+    )
+
+
+def _comparison(campaign_id, name, current: Dict, prior: Dict) -> Dict:
+    """current/prior performance dicts -> the comparison record with deltas."""
+    change, change_pct = {}, {}
+    for key in (*METRIC_COLUMNS, "ctr", "cpc", "roas"):
+        change[key] = current[key] - prior[key]
+        change_pct[key] = (change[key] / prior[key] * 100.0) if prior[key] else None
+    return {
+        "campaign_id": campaign_id,
+        "name": name,
+        "current": current,
+        "prior": prior,
+        "change": change,
+        "change_pct": change_pct,
+    }
+
+
+@instrument_dao
 class CampaignChannelXrefDAO:
     """
     Data Access Object that manages:
@@ -20,27 +451,16 @@ class CampaignChannelXrefDAO:
         Insert a mapping if it does not exist.
         Returns True if newly added, False if already existed.
         """
-        sql_check = """
-            SELECT 1 FROM campaign_channel_xref
-            WHERE campaign_id = %s AND channel_id = %s
-        """
-        sql_insert = """
-            INSERT INTO campaign_channel_xref (campaign_id, channel_id)
-            VALUES (%s, %s)
-        """
-
         conn = DB.get_connection()
         try:
-            cur = conn.cursor()
-            cur.execute(sql_check, (campaign_id, channel_id))
-            if cur.fetchone():
+            cur = DB.execute(conn, _LINK_CHECK, (campaign_id, channel_id))
+            if fetch_one(cur):
                 return False  # already linked
 
-            cur.execute(sql_insert, (campaign_id, channel_id))
+            DB.execute(conn, _LINK_INSERT, (campaign_id, channel_id))
             conn.commit()
             return True
         finally:
-            cur.close()
             conn.close()
 
     def unlink(self, campaign_id: int, channel_id: int) -> int:
@@ -48,45 +468,122 @@ class CampaignChannelXrefDAO:
         Remove a single campaign ↔ channel mapping.
         Returns number of rows deleted (0 or 1).
         """
-        sql = """
-            DELETE FROM campaign_channel_xref
-            WHERE campaign_id = %s AND channel_id = %s
-        """
         conn = DB.get_connection()
         try:
-            cur = conn.cursor()
-            cur.execute(sql, (campaign_id, channel_id))
+            cur = DB.execute(conn, _UNLINK, (campaign_id, channel_id))
             conn.commit()
             return cur.rowcount
         finally:
-            cur.close()
             conn.close()
 
     # ---------------------------------------------------------- #
     # LIST: Channels for Campaign
     # ---------------------------------------------------------- #
-    def list_channels_for_campaign(self, campaign_id: int) -> List[Dict]:
+    def list_channels_for_campaign(
+        self, campaign_id: int, fields: Fields = CHANNEL_COLUMNS
+    ) -> List[Dict]:
         """
-        Return a list of channel rows linked to a campaign.
+        Return a list of channel rows linked to a campaign
+        (fields: a ChannelDAO projection).
         """
-        sql = """
-            SELECT ch.*
-            FROM channel ch
-            JOIN campaign_channel_xref ccx
-              ON ccx.channel_id = ch.channel_id
-            WHERE ccx.campaign_id = %s
-            ORDER BY ch.channel_id
+        conn = DB.get_connection()
+        try:
+            cur = DB.execute(conn, _channels_for_campaign_template(fields), (campaign_id,))
+            return rows_to_dicts(cur, cur.fetchall())
+        finally:
+            conn.close()
+
+    # ---------------------------------------------------------- #
+    # LIST: Campaigns for Channel(s)
+    # ---------------------------------------------------------- #
+    def iter_channels_for_campaigns(
+        self,
+        campaign_ids,
+        fields: Fields = CHANNEL_COLUMNS,
+        batch_size: int = 1000,
+    ) -> Iterator[Dict]:
+        """
+        Channels linked to any of campaign_ids, as rows with campaign_id plus
+        the channel fields, ordered by (campaign_id, channel_id): one query
+        per IN_CHUNK campaigns and batch_size rows.
         """
+        if "channel_id" not in fields:
+            fields = ("channel_id",) + tuple(fields)
+        for ids, n in in_chunks(campaign_ids):
+            template = _channels_for_campaigns_template(n, fields)
+            last = (0, 0)
+            while True:
+                conn = DB.get_connection()
+                try:
+                    cur = DB.execute(
+                        conn, template, (*ids, last[0], last[0], last[1], batch_size)
+                    )
+                    page = rows_to_dicts(cur, cur.fetchall())
+                finally:
+                    conn.close()
+                if page:
+                    # before yielding: callers may consume (pop) the row's keys
+                    last = (page[-1]["campaign_id"], page[-1]["channel_id"])
+                yield from page
+                if len(page) < batch_size:
+                    break
+
+    def list_campaigns_for_channel(
+        self,
+        channel_id: int,
+        fields: Fields = CAMPAIGN_COLUMNS,
+        after_id: int = 0,
+        limit: int = 1000,
+    ) -> List[Dict]:
+        """
+        One page of the campaigns linked to a channel, in campaign_id order:
+        those with campaign_id > after_id (pass the last id of the previous
+        page). campaign_id is always read, as the pagination key.
+        """
+        if "campaign_id" not in fields:
+            fields = ("campaign_id",) + tuple(fields)
         conn = DB.get_connection()
         try:
-            cur = conn.cursor()
-            cur.execute(sql, (campaign_id,))
-            rows = cur.fetchall()
-            return [row_to_dict(cur, r) for r in rows]
+            cur = DB.execute(
+                conn, _campaigns_for_channel_template(fields), (channel_id, after_id, limit)
+            )
+            return rows_to_dicts(cur, cur.fetchall())
         finally:
-            cur.close()
             conn.close()
 
+    def iter_campaigns_for_channels(
+        self,
+        channel_ids,
+        fields: Fields = CAMPAIGN_COLUMNS,
+        batch_size: int = 1000,
+    ) -> Iterator[Dict]:
+        """
+        Campaigns linked to any of channel_ids, as rows with channel_id plus
+        the campaign fields, ordered by (channel_id, campaign_id). Channels
+        are batched into IN lists and each batch is keyset-paginated, so a
+        page is one query however many channels it spans.
+        """
+        if "campaign_id" not in fields:
+            fields = ("campaign_id",) + tuple(fields)
+        for ids, n in in_chunks(channel_ids):
+            template = _campaigns_for_channels_template(n, fields)
+            last = (0, 0)
+            while True:
+                conn = DB.get_connection()
+                try:
+                    cur = DB.execute(
+                        conn, template, (*ids, last[0], last[0], last[1], batch_size)
+                    )
+                    page = rows_to_dicts(cur, cur.fetchall())
+                finally:
+                    conn.close()
+                if page:
+                    # before yielding: callers may consume (pop) the row's keys
+                    last = (page[-1]["channel_id"], page[-1]["campaign_id"])
+                yield from page
+                if len(page) < batch_size:
+                    break
+
     # ---------------------------------------------------------- #
     # UPSERT DAILY METRICS
     # ---------------------------------------------------------- #
@@ -105,27 +602,140 @@ class CampaignChannelXrefDAO:
         Uses composite PK (campaign_id, metric_date) and
         ON DUPLICATE KEY UPDATE to perform the upsert.
         """
-        sql = """
-            INSERT INTO campaign_daily_metrics (
-                campaign_id, metric_date, impressions, clicks, spend_cents, revenue_cents
-            )
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-              impressions = VALUES(impressions),
-              clicks      = VALUES(clicks),
-              spend_cents = VALUES(spend_cents),
-              revenue_cents = VALUES(revenue_cents)
+        self.upsert_campaign_daily_metrics_many(
+            [(campaign_id, metric_date, impressions, clicks, spend_cents, revenue_cents)]
+        )
+
+    def upsert_campaign_daily_metrics_many(
+        self,
+        rows: List[tuple],
+        additive: bool = False,
+    ) -> int:
+        """
+        Batch form of upsert_campaign_daily_metrics, in one transaction.
+
+        rows: (campaign_id, metric_date, impressions, clicks, spend_cents, revenue_cents)
+        additive=False overwrites existing values; additive=True adds to them.
+        Returns the number of input rows written.
+
+        An overwrite moves the campaign's lifetime totals by (new - old):
+        the rows being replaced are read FOR UPDATE in the same
+        transaction, so a concurrent upsert of the same day cannot slip
+        between the read and the write.
         """
+        if not rows:
+            return 0
+        if additive:
+            return self.increment_campaign_daily_metrics_many(rows)
+
+        ensure_table("campaign_lifetime_metrics")
+        # last write wins within the batch too; only the final value counts
+        latest = {(r[0], r[1]): r for r in rows}
         conn = DB.get_connection()
         try:
-            cur = conn.cursor()
-            cur.execute(
-                sql,
-                (campaign_id, metric_date, impressions, clicks, spend_cents, revenue_cents),
-            )
-            conn.commit()
+            try:
+                old = self._lock_old_metrics(conn, latest)
+                DB.executemany(conn, _UPSERT_METRICS_MANY, rows)
+                deltas = []
+                for key, row in latest.items():
+                    prev = old.get(key, (0, 0, 0, 0))
+                    deltas.append((row[0], row[1], *(
+                        int(row[2 + i] or 0) - int(prev[i] or 0) for i in range(4)
+                    )))
+                self._add_lifetime(conn, deltas)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            return len(rows)
+        finally:
+            conn.close()
+
+    def _lock_old_metrics(self, conn, keys) -> Dict[tuple, tuple]:
+        """(campaign_id, metric_date) -> stored (impr, clicks, spend, revenue) for keys."""
+        dates = [d for _, d in keys]
+        lo, hi = min(dates), max(dates)
+        old = {}
+        for params, n in in_chunks(cid for cid, _ in keys):
+            cur = DB.execute(conn, _old_metrics_template(n), (*params, lo, hi))
+            for row in cur.fetchall():
+                key = (row[0], row[1])
+                if key in keys:
+                    old[key] = row[2:]
+        return old
+
+    def _add_lifetime(self, conn, rows) -> None:
+        """Apply daily-row deltas to campaign_lifetime_metrics (caller commits)."""
+        deltas = _lifetime_deltas(rows)
+        if deltas:
+            DB.executemany(conn, _LIFETIME_ADD_MANY, deltas)
+
+    # ---------------------------------------------------------- #
+    # INCREMENT DAILY METRICS (DELTAS)
+    # ---------------------------------------------------------- #
+    def increment_campaign_daily_metrics(
+        self,
+        campaign_id: int,
+        metric_date: date,
+        impressions: int = 0,
+        clicks: int = 0,
+        spend_cents: int = 0,
+        revenue_cents: int = 0,
+        idempotency_key: Optional[str] = None,
+    ) -> bool:
+        """
+        Add deltas to a campaign_daily_metrics row, creating it if missing.
+
+        The addition happens in SQL (impressions = impressions + VALUES(impressions)),
+        so concurrent feeds never need to read-modify-write on the client.
+        Returns False if idempotency_key was already applied (nothing written).
+        """
+        applied = self.increment_campaign_daily_metrics_many(
+            [(campaign_id, metric_date, impressions, clicks, spend_cents, revenue_cents)],
+            idempotency_key=idempotency_key,
+        )
+        return applied > 0
+
+    def increment_campaign_daily_metrics_many(
+        self,
+        rows: List[tuple],
+        idempotency_key: Optional[str] = None,
+    ) -> int:
+        """
+        Bulk form of increment_campaign_daily_metrics, in one transaction.
+
+        rows: (campaign_id, metric_date, impressions, clicks, spend_cents, revenue_cents)
+
+        When idempotency_key is given it is recorded in the same transaction
+        as the deltas (and their lifetime totals); replaying a batch with
+        the same key is a no-op.
+        Returns the number of rows applied (0 for a replayed key).
+        """
+        if not rows:
+            return 0
+
+        ensure_table("campaign_lifetime_metrics")
+        if idempotency_key is not None:
+            ensure_table("metrics_idempotency_key")
+
+        conn = DB.get_connection()
+        try:
+            try:
+                if idempotency_key is not None:
+                    cur = DB.execute(
+                        conn, _CLAIM_IDEMPOTENCY_KEY, (idempotency_key, len(rows))
+                    )
+                    if cur.rowcount == 0:
+                        conn.rollback()
+                        return 0  # batch already applied
+                DB.executemany(conn, _INCREMENT_METRICS_MANY, rows)
+                self._add_lifetime(conn, rows)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            return len(rows)
         finally:
-            cur.close()
             conn.close()
 
     # ---------------------------------------------------------- #
@@ -145,61 +755,136 @@ class CampaignChannelXrefDAO:
           - ctr (click-through rate)
           - cpc (cost per click)
           - roas (revenue / spend, if revenue is provided)
-        """
-        base_sql = """
-            SELECT
-                COALESCE(SUM(impressions), 0)   AS impressions,
-                COALESCE(SUM(clicks), 0)        AS clicks,
-                COALESCE(SUM(spend_cents), 0)   AS spend_cents,
-                COALESCE(SUM(revenue_cents), 0) AS revenue_cents
-            FROM campaign_daily_metrics
-            WHERE campaign_id = %s
-        """
 
+        With no date range the totals come from campaign_lifetime_metrics
+        (one row) instead of summing every daily row.
+        """
         params: list = [campaign_id]
 
         if start_date is not None:
-            base_sql += " AND metric_date >= %s"
             params.append(start_date)
         if end_date is not None:
-            base_sql += " AND metric_date <= %s"
             params.append(end_date)
 
+        if start_date is None and end_date is None:
+            ensure_table("campaign_lifetime_metrics")
+            template = _LIFETIME_GET
+        else:
+            template = _performance_template(start_date is not None, end_date is not None)
+
         conn = DB.get_connection()
         try:
-            cur = conn.cursor()
-            cur.execute(base_sql, tuple(params))
-            row = cur.fetchone()
+            cur = DB.execute(conn, template, params)
+            row = fetch_one(cur)
         finally:
-            cur.close()
             conn.close()
 
+        totals = row if row is not None else (0, 0, 0, 0)
+        return _performance(campaign_id, *totals[:4], start_date=start_date, end_date=end_date)
+
+    def get_campaign_detail(self, campaign_id: int) -> Optional[Dict]:
+        """
+        One campaign with its linked channels and all-time performance, in
+        a single query. Returns None if the campaign does not exist, else
+        the campaign columns plus "channels" (channel rows, by id) and
+        "performance" (as get_campaign_performance with no date range).
+        """
+        ensure_table("campaign_lifetime_metrics")
+        conn = DB.get_connection()
+        try:
+            cur = DB.execute(conn, _CAMPAIGN_DETAIL, (campaign_id,))
+            row = fetch_one(cur)
+        finally:
+            conn.close()
         if row is None:
-            impressions = clicks = spend_cents = revenue_cents = 0
+            return None
+
+        n = len(CAMPAIGN_COLUMNS)
+        detail = dict(zip(CAMPAIGN_COLUMNS, row[:n]))
+        detail["channels"] = _json_channels(row[n])
+        detail["performance"] = _performance(campaign_id, *row[n + 1:n + 5])
+        return detail
+
+    def compare_campaign_performance(
+        self,
+        campaign_ids: Optional[List[int]],
+        start_date: date,
+        end_date: date,
+        prior_start: date,
+        prior_end: date,
+    ) -> List[Dict]:
+        """
+        Performance over [start_date, end_date] against [prior_start, prior_end]
+        for the given campaigns (None = every campaign), one query per
+        IN chunk instead of two get_campaign_performance calls per campaign.
+
+        Returns one dict per campaign, by id: campaign_id, name, "current"
+        and "prior" (shaped like get_campaign_performance), "change"
+        (current - prior, also for ctr/cpc/roas) and "change_pct" (None
+        where the prior value is 0). Campaigns without metrics get zeros.
+        """
+        windows = [start_date, end_date] * len(METRIC_COLUMNS) \
+            + [prior_start, prior_end] * len(METRIC_COLUMNS) \
+            + [min(start_date, prior_start), max(end_date, prior_end)]
+        if campaign_ids is None:
+            chunks = [((), None)]
         else:
-            # Convert Decimal/MySQL values to python ints
-            impressions = int(row[0] or 0)
-            clicks = int(row[1] or 0)
-            spend_cents = int(row[2] or 0)
-            revenue_cents = int(row[3] or 0)
-
-        # Safe computed metrics
-        ctr = (clicks / impressions) if impressions > 0 else 0.0
-        cpc = (spend_cents / clicks) / 100.0 if clicks > 0 else 0.0  # USD/click
-        roas = (revenue_cents / spend_cents) if spend_cents > 0 else 0.0
-
-        return {
-            "campaign_id": campaign_id,
-            "impressions": impressions,
-            "clicks": clicks,
-            "spend_cents": spend_cents,
-            "revenue_cents": revenue_cents,
-            "ctr": ctr,
-            "cpc": cpc,
-            "roas": roas,
-            "start_date": start_date,
-            "end_date": end_date,
-        }
+            chunks = list(in_chunks(campaign_ids))
+
+        out = []
+        conn = DB.get_connection()
+        try:
+            for params, n in chunks:
+                cur = DB.execute(conn, _compare_template(n), (*windows, *params))
+                for row in cur.fetchall():
+                    cid, name = row[0], row[1]
+                    out.append(_comparison(
+                        cid, name,
+                        _performance(cid, *row[2:6], start_date=start_date, end_date=end_date),
+                        _performance(cid, *row[6:10], start_date=prior_start, end_date=prior_end),
+                    ))
+        finally:
+            conn.close()
+        return out
+
+    # ---------------------------------------------------------- #
+    # LIFETIME TOTALS: VERIFY / REPAIR
+    # ---------------------------------------------------------- #
+    def verify_lifetime_metrics(self, repair: bool = False) -> List[Dict]:
+        """
+        Compare campaign_lifetime_metrics with the sums of the daily rows
+        plus what db:purge removed (a full scan of campaign_daily_metrics and
+        campaign_purged_metrics). Returns one dict per drifted campaign:
+        campaign_id, "stored" and "actual" totals.
+
+        repair=True recomputes the drifted campaigns' totals from their
+        daily and purged rows in one transaction; the daily rows it reads are
+        share-locked, so concurrent writes to them wait for the repair.
+        """
+        ensure_table("campaign_lifetime_metrics")
+        conn = DB.get_connection()
+        try:
+            cur = DB.execute(conn, _LIFETIME_DRIFT)
+            drift = [
+                {
+                    "campaign_id": row[0],
+                    "stored": dict(zip(METRIC_COLUMNS, map(int, row[1:5]))),
+                    "actual": dict(zip(METRIC_COLUMNS, map(int, row[5:9]))),
+                }
+                for row in cur.fetchall()
+            ]
+            if repair and drift:
+                try:
+                    for params, n in in_chunks(d["campaign_id"] for d in drift):
+                        DB.execute(conn, _lifetime_rebuild_template(n), (*params, *params))
+                        DB.execute(conn, _lifetime_prune_template(n), params)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            return drift
+        finally:
+            conn.close()
 
     # ---------------------------------------------------------- #
     # COUNTS & REPORTING HELPERS
@@ -209,42 +894,54 @@ class CampaignChannelXrefDAO:
         Return how many campaigns are linked to a given channel.
         Used for safe delete logic in the service layer.
         """
-        sql = """
-            SELECT COUNT(*)
-            FROM campaign_channel_xref
-            WHERE channel_id = %s
+        conn = DB.get_connection()
+        try:
+            cur = DB.execute(conn, _COUNT_CAMPAIGNS_FOR_CHANNEL, (channel_id,))
+            (count,) = fetch_one(cur)
+            return int(count or 0)
+        finally:
+            conn.close()
+
+    def count_channels_for_campaign(self, campaign_id: int) -> int:
+        """
+        Return how many channels are linked to a given campaign: a primary
+        key range count, no channel rows are read.
         """
         conn = DB.get_connection()
         try:
-            cur = conn.cursor()
-            cur.execute(sql, (channel_id,))
-            (count,) = cur.fetchone()
+            cur = DB.execute(conn, _COUNT_CHANNELS_FOR_CAMPAIGN, (campaign_id,))
+            (count,) = fetch_one(cur)
             return int(count or 0)
         finally:
-            cur.close()
             conn.close()
 
     def list_all_mappings(self) -> List[Dict]:
         """
         Return all campaign ↔ channel mappings with names, for reporting.
         """
-        sql = """
-            SELECT
-                ccx.campaign_id,
-                c.name AS campaign_name,
-                ccx.channel_id,
-                ch.name AS channel_name
-            FROM campaign_channel_xref ccx
-            JOIN campaign c ON ccx.campaign_id = c.campaign_id
-            JOIN channel ch ON ccx.channel_id = ch.channel_id
-            ORDER BY ccx.campaign_id, ccx.channel_id
-        """
         conn = DB.get_connection()
         try:
-            cur = conn.cursor()
-            cur.execute(sql)
-            rows = cur.fetchall()
-            return [row_to_dict(cur, r) for r in rows]
+            cur = DB.execute(conn, _ALL_MAPPINGS)
+            return rows_to_dicts(cur, cur.fetchall())
         finally:
-            cur.close()
             conn.close()
+
+    def iter_all_mappings(self, batch_size: int = 1000) -> Iterator[Dict]:
+        """
+        Streaming form of list_all_mappings: batch_size rows per query,
+        keyset-paginated on (campaign_id, channel_id).
+        """
+        last = (0, 0)
+        while True:
+            conn = DB.get_connection()
+            try:
+                cur = DB.execute(
+                    conn, _MAPPINGS_PAGE_AFTER, (last[0], last[0], last[1], batch_size)
+                )
+                page = rows_to_dicts(cur, cur.fetchall())
+            finally:
+                conn.close()
+            yield from page
+            if len(page) < batch_size:
+                return
+            last = (page[-1]["campaign_id"], page[-1]["channel_id"])
@@ -1,90 +1,206 @@
-from .db import DB, row_to_dict
+from typing import Dict, Iterable, Optional, Set
 
+from .db import (
+    DB, Fields, fetch_one, in_chunks, in_placeholders, projection_key,
+    row_to_dict, rows_to_dicts, select_list,
+)
+from .query_registry import QUERIES
+from .instrumentation import instrument_dao
+
+
+COLUMNS: Fields = (
+    "campaign_id", "name", "start_date", "end_date", "status", "budget_cents", "created_at",
+)
+
+_CREATE = QUERIES.register("campaign.create", """
+    INSERT INTO campaign (name, start_date, end_date, budget_cents)
+    VALUES (%s, %s, %s, %s)
+""")
+_DELETE = QUERIES.register(
+    "campaign.delete", "DELETE FROM campaign WHERE campaign_id = %s"
+)
+_SET_STATUS = QUERIES.register(
+    "campaign.set_status", "UPDATE campaign SET status = %s WHERE campaign_id = %s"
+)
+
+
+def _get_template(fields: Fields):
+    def build():
+        return f"SELECT {select_list('campaign', COLUMNS, fields)} FROM campaign WHERE campaign_id = %s"
+    return QUERIES.variant("campaign.get", projection_key(COLUMNS, fields), build)
+
+
+def _list_template(search: bool, fields: Fields):
+    def build():
+        base = f"SELECT {select_list('campaign', COLUMNS, fields)} FROM campaign"
+        if search:
+            base += " WHERE name LIKE %s"
+        return base + " ORDER BY campaign_id ASC LIMIT %s OFFSET %s"
+    key = ";".join(k for k in ("q" if search else "", projection_key(COLUMNS, fields)) if k)
+    return QUERIES.variant("campaign.list", key, build)
+
+
+def _page_after_template(fields: Fields):
+    def build():
+        return f"""
+            SELECT {select_list('campaign', COLUMNS, fields)} FROM campaign
+            WHERE campaign_id > %s ORDER BY campaign_id LIMIT %s
+        """
+    return QUERIES.variant(
+        "campaign.page_after", projection_key(COLUMNS, fields), build, paged=True
+    )
+
+
+def _get_many_template(n: int, fields: Fields):
+    def build():
+        return (
+            f"SELECT {select_list('campaign', COLUMNS, fields)} FROM campaign "
+            f"WHERE campaign_id IN ({in_placeholders(n)})"
+        )
+    key = ";".join(k for k in (str(n), projection_key(COLUMNS, fields)) if k)
+    return QUERIES.variant("campaign.get_many", key, build, paged=True)
+
+
+def _existing_ids_template(n: int):
+    def build():
+        return f"SELECT campaign_id FROM campaign WHERE campaign_id IN ({in_placeholders(n)})"
+    return QUERIES.variant("campaign.existing_ids", n, build, paged=True)
+
+
+def _update_template(keys: tuple):
+    def build():
+        set_clause = ", ".join(f"{k} = %s" for k in keys)
+        return f"UPDATE campaign SET {set_clause} WHERE campaign_id = %s"
+    return QUERIES.variant("campaign.update", ",".join(keys), build)
+
+
+@instrument_dao
 class CampaignDAO:
-    def get(self, campaign_id: int):
-        sql = "SELECT * FROM campaign WHERE campaign_id=%s"
+    # Read projections (fields=...): every column, what the campaign
+    # listings show, and id + name for labels
+    ALL_FIELDS: Fields = COLUMNS
+    LIST_FIELDS: Fields = ("campaign_id", "name", "status", "budget_cents", "created_at")
+    REF_FIELDS: Fields = ("campaign_id", "name")
+
+    def get(self, campaign_id: int, fields: Fields = ALL_FIELDS):
         conn = DB.get_connection()
         try:
-            cur = conn.cursor()
-            cur.execute(sql, (campaign_id,))
-            row = cur.fetchone()
+            cur = DB.execute(conn, _get_template(fields), (campaign_id,))
+            row = fetch_one(cur)
             return row_to_dict(cur, row)
         finally:
-            cur.close()
             conn.close()
 
-    def list(self, limit=50, offset=0, q=None):
-        base = "SELECT * FROM campaign"
+    def get_many(
+        self, campaign_ids: Iterable[int], fields: Fields = ALL_FIELDS
+    ) -> Dict[int, Optional[Dict]]:
+        """
+        Fetch many campaigns with one IN query per IN_CHUNK ids. Returns
+        {campaign_id: row} in the order the ids were given (duplicates
+        dropped); ids that do not exist map to None. campaign_id is always read.
+        """
+        if "campaign_id" not in fields:
+            fields = ("campaign_id",) + tuple(fields)
+        out: Dict[int, Optional[Dict]] = dict.fromkeys(campaign_ids)
+        if not out:
+            return out
+        conn = DB.get_connection()
+        try:
+            for params, n in in_chunks(out):
+                cur = DB.execute(conn, _get_many_template(n, fields), params)
+                for row in rows_to_dicts(cur, cur.fetchall()):
+                    out[row["campaign_id"]] = row
+        finally:
+            conn.close()
+        return out
+
+    def existing_ids(self, campaign_ids: Iterable[int]) -> Set[int]:
+        """
+        The subset of campaign_ids that exist: one index-only query per
+        IN_CHUNK ids, no row data.
+        """
+        found: Set[int] = set()
+        conn = DB.get_connection()
+        try:
+            for params, n in in_chunks(campaign_ids):
+                cur = DB.execute(conn, _existing_ids_template(n), params)
+                found.update(r[0] for r in cur.fetchall())
+        finally:
+            conn.close()
+        return found
+
+    def list(self, limit=50, offset=0, q=None, fields: Fields = ALL_FIELDS):
         args = []
         if q:
-            base += " WHERE name LIKE %s"
             args.append(f"%{q}%")
-        base += " ORDER BY campaign_id ASC LIMIT %s OFFSET %s"
         args += [limit, offset]
 
         conn = DB.get_connection()
         try:
-            cur = conn.cursor()
-            cur.execute(base, tuple(args))
-            rows = cur.fetchall()
-            return [row_to_dict(cur, r) for r in rows]
+            cur = DB.execute(conn, _list_template(bool(q), fields), args)
+            return rows_to_dicts(cur, cur.fetchall())
         finally:
-            cur.close()
             conn.close()
 
-    def create(self, name, start_date=None, end_date=None, budget_cents=0):
-        sql = """
-            INSERT INTO campaign (name, start_date, end_date, budget_cents)
-            VALUES (%s, %s, %s, %s)
+    def iter_all(self, batch_size: int = 1000, fields: Fields = ALL_FIELDS):
+        """
+        Yield every campaign in id order, fetching batch_size rows per query
+        (keyset pagination: no connection is held between batches).
+        campaign_id is always read, as the pagination key.
         """
+        if "campaign_id" not in fields:
+            fields = ("campaign_id",) + tuple(fields)
+        template = _page_after_template(fields)
+        last_id = 0
+        while True:
+            conn = DB.get_connection()
+            try:
+                cur = DB.execute(conn, template, (last_id, batch_size))
+                page = rows_to_dicts(cur, cur.fetchall())
+            finally:
+                conn.close()
+            yield from page
+            if len(page) < batch_size:
+                return
+            last_id = page[-1]["campaign_id"]
+
+    def create(self, name, start_date=None, end_date=None, budget_cents=0):
         conn = DB.get_connection()
         try:
-            cur = conn.cursor()
-            cur.execute(sql, (name, start_date, end_date, budget_cents))
+            cur = DB.execute(conn, _CREATE, (name, start_date, end_date, budget_cents))
             conn.commit()
             return cur.lastrowid
         finally:
-            cur.close()
             conn.close()
 
     def update(self, campaign_id, **fields):
-        keys = list(fields.keys())
+        keys = tuple(fields.keys())
         if not keys:
             return 0
-        set_clause = ", ".join(f"{k} = %s" for k in keys)
-        sql = f"UPDATE campaign SET {set_clause} WHERE campaign_id = %s"
         params = [fields[k] for k in keys] + [campaign_id]
 
         conn = DB.get_connection()
         try:
-            cur = conn.cursor()
-            cur.execute(sql, params)
+            cur = DB.execute(conn, _update_template(keys), params)
             conn.commit()
             return cur.rowcount
         finally:
-            cur.close()
             conn.close()
 
     def delete(self, campaign_id: int) -> int:
-        sql = "DELETE FROM campaign WHERE campaign_id = %s"
         conn = DB.get_connection()
         try:
-            cur = conn.cursor()
-            cur.execute(sql, (campaign_id,))
+            cur = DB.execute(conn, _DELETE, (campaign_id,))
             conn.commit()
             return cur.rowcount
         finally:
-            cur.close()
             conn.close()
 
     def set_status(self, campaign_id: int, status: str) -> bool:
-        sql = "UPDATE campaign SET status = %s WHERE campaign_id = %s"
         conn = DB.get_connection()
         try:
-            cur = conn.cursor()
-            cur.execute(sql, (status, campaign_id))
+            cur = DB.execute(conn, _SET_STATUS, (status, campaign_id))
             conn.commit()
             return cur.rowcount > 0
         finally:
-            cur.close()
             conn.close()
@@ -1,10 +1,77 @@
 from __future__ import annotations
 
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterator, Iterable, Set
 
-from .db import DB, row_to_dict
+from .db import (
+    DB, Fields, fetch_one, in_chunks, in_placeholders, projection_key,
+    row_to_dict, rows_to_dicts, select_list,
+)
+from .query_registry import QUERIES
+from .instrumentation import instrument_dao
 
 
+COLUMNS: Fields = ("channel_id", "name", "type", "created_at")
+
+_CREATE = QUERIES.register("channel.create", """
+    INSERT INTO channel (name, type)
+    VALUES (%s, %s)
+""")
+_DELETE = QUERIES.register(
+    "channel.delete", "DELETE FROM channel WHERE channel_id = %s"
+)
+
+
+def _get_template(fields: Fields):
+    def build():
+        return f"SELECT {select_list('channel', COLUMNS, fields)} FROM channel WHERE channel_id = %s"
+    return QUERIES.variant("channel.get", projection_key(COLUMNS, fields), build)
+
+
+def _list_template(search: bool, fields: Fields):
+    def build():
+        base = f"SELECT {select_list('channel', COLUMNS, fields)} FROM channel"
+        if search:
+            base += " WHERE name LIKE %s"
+        return base + " ORDER BY channel_id LIMIT %s OFFSET %s"
+    key = ";".join(k for k in ("q" if search else "", projection_key(COLUMNS, fields)) if k)
+    return QUERIES.variant("channel.list", key, build)
+
+
+def _page_after_template(fields: Fields):
+    def build():
+        return f"""
+            SELECT {select_list('channel', COLUMNS, fields)} FROM channel
+            WHERE channel_id > %s ORDER BY channel_id LIMIT %s
+        """
+    return QUERIES.variant(
+        "channel.page_after", projection_key(COLUMNS, fields), build, paged=True
+    )
+
+
+def _get_many_template(n: int, fields: Fields):
+    def build():
+        return (
+            f"SELECT {select_list('channel', COLUMNS, fields)} FROM channel "
+            f"WHERE channel_id IN ({in_placeholders(n)})"
+        )
+    key = ";".join(k for k in (str(n), projection_key(COLUMNS, fields)) if k)
+    return QUERIES.variant("channel.get_many", key, build, paged=True)
+
+
+def _existing_ids_template(n: int):
+    def build():
+        return f"SELECT channel_id FROM channel WHERE channel_id IN ({in_placeholders(n)})"
+    return QUERIES.variant("channel.existing_ids", n, build, paged=True)
+
+
+def _update_template(keys: tuple):
+    def build():
+        set_clause = ", ".join(f"{k} = %s" for k in keys)
+        return f"UPDATE channel SET {set_clause} WHERE channel_id = %s"
+    return QUERIES.variant("channel.update", ",".join(keys), build)
+
+
+@instrument_dao
 class ChannelDAO:
     """
     Data Access Object for the 'channel' table.
@@ -16,47 +83,105 @@ class ChannelDAO:
       created_at TIMESTAMP
     """
 
+    # Read projections (fields=...): every column, what the channel
+    # listings show, and id + name for labels
+    ALL_FIELDS: Fields = COLUMNS
+    LIST_FIELDS: Fields = COLUMNS
+    REF_FIELDS: Fields = ("channel_id", "name")
+
     # -------------------------------------------------------------- #
     # READ
     # -------------------------------------------------------------- #
-    def get(self, channel_id: int) -> Optional[Dict]:
-        sql = "SELECT * FROM channel WHERE channel_id = %s"
+    def get(self, channel_id: int, fields: Fields = ALL_FIELDS) -> Optional[Dict]:
         conn = DB.get_connection()
         try:
-            cur = conn.cursor()
-            cur.execute(sql, (channel_id,))
-            row = cur.fetchone()
+            cur = DB.execute(conn, _get_template(fields), (channel_id,))
+            row = fetch_one(cur)
             return row_to_dict(cur, row)
         finally:
-            cur.close()
             conn.close()
 
+    def get_many(
+        self, channel_ids: Iterable[int], fields: Fields = ALL_FIELDS
+    ) -> Dict[int, Optional[Dict]]:
+        """
+        Fetch many channels with one IN query per IN_CHUNK ids. Returns
+        {channel_id: row} in the order the ids were given (duplicates
+        dropped); ids that do not exist map to None. channel_id is always read.
+        """
+        if "channel_id" not in fields:
+            fields = ("channel_id",) + tuple(fields)
+        out: Dict[int, Optional[Dict]] = dict.fromkeys(channel_ids)
+        if not out:
+            return out
+        conn = DB.get_connection()
+        try:
+            for params, n in in_chunks(out):
+                cur = DB.execute(conn, _get_many_template(n, fields), params)
+                for row in rows_to_dicts(cur, cur.fetchall()):
+                    out[row["channel_id"]] = row
+        finally:
+            conn.close()
+        return out
+
+    def existing_ids(self, channel_ids: Iterable[int]) -> Set[int]:
+        """
+        The subset of channel_ids that exist: one index-only query per
+        IN_CHUNK ids, no row data.
+        """
+        found: Set[int] = set()
+        conn = DB.get_connection()
+        try:
+            for params, n in in_chunks(channel_ids):
+                cur = DB.execute(conn, _existing_ids_template(n), params)
+                found.update(r[0] for r in cur.fetchall())
+        finally:
+            conn.close()
+        return found
+
     def list(
         self,
         limit: int = 100,
         offset: int = 0,
         q: Optional[str] = None,
+        fields: Fields = ALL_FIELDS,
     ) -> List[Dict]:
-        base = "SELECT * FROM channel"
         params: list = []
 
         if q:
-            base += " WHERE name LIKE %s"
             params.append(f"%{q}%")
 
-        base += " ORDER BY channel_id LIMIT %s OFFSET %s"
         params.extend([limit, offset])
 
         conn = DB.get_connection()
         try:
-            cur = conn.cursor()
-            cur.execute(base, tuple(params))
-            rows = cur.fetchall()
-            return [row_to_dict(cur, r) for r in rows]
+            cur = DB.execute(conn, _list_template(bool(q), fields), params)
+            return rows_to_dicts(cur, cur.fetchall())
         finally:
-            cur.close()
             conn.close()
 
+    def iter_all(self, batch_size: int = 1000, fields: Fields = ALL_FIELDS) -> Iterator[Dict]:
+        """
+        Yield every channel in id order, batch_size rows per query
+        (keyset pagination: no connection is held between batches).
+        channel_id is always read, as the pagination key.
+        """
+        if "channel_id" not in fields:
+            fields = ("channel_id",) + tuple(fields)
+        template = _page_after_template(fields)
+        last_id = 0
+        while True:
+            conn = DB.get_connection()
+            try:
+                cur = DB.execute(conn, template, (last_id, batch_size))
+                page = rows_to_dicts(cur, cur.fetchall())
+            finally:
+                conn.close()
+            yield from page
+            if len(page) < batch_size:
+                return
+            last_id = page[-1]["channel_id"]
+
     # -------------------------------------------------------------- #
     # CREATE
     # -------------------------------------------------------------- #
@@ -67,19 +192,13 @@ class ChannelDAO:
         Only 'name' and 'type' are stored because the schema defines:
           channel_id, name, type, created_at
         """
-        sql = """
-            INSERT INTO channel (name, type)
-            VALUES (%s, %s)
-        """
         conn = DB.get_connection()
         try:
-            cur = conn.cursor()
             # IMPORTANT: parameters must be a tuple, not a bare string
-            cur.execute(sql, (name, ch_type))
+            cur = DB.execute(conn, _CREATE, (name, ch_type))
             conn.commit()
             return cur.lastrowid
         finally:
-            cur.close()
             conn.close()
 
     # -------------------------------------------------------------- #
@@ -92,22 +211,18 @@ class ChannelDAO:
         Example usage:
           update(1, name="Email (Updated)", type="Email")
         """
-        keys = list(fields.keys())
+        keys = tuple(fields.keys())
         if not keys:
             return 0
 
-        set_clause = ", ".join(f"{k} = %s" for k in keys)
-        sql = f"UPDATE channel SET {set_clause} WHERE channel_id = %s"
         params = [fields[k] for k in keys] + [channel_id]
 
         conn = DB.get_connection()
         try:
-            cur = conn.cursor()
-            cur.execute(sql, params)
+            cur = DB.execute(conn, _update_template(keys), params)
             conn.commit()
             return cur.rowcount
         finally:
-            cur.close()
             conn.close()
 
     # -------------------------------------------------------------- #
@@ -119,13 +234,10 @@ class ChannelDAO:
         Because of ON DELETE CASCADE on campaign_channel_xref (if configured),
         this will also remove its mappings.
         """
-        sql = "DELETE FROM channel WHERE channel_id = %s"
         conn = DB.get_connection()
         try:
-            cur = conn.cursor()
-            cur.execute(sql, (channel_id,))
+            cur = DB.execute(conn, _DELETE, (channel_id,))
             conn.commit()
             return cur.rowcount
         finally:
-            cur.close()
             conn.close()
@@ -1,38 +1,375 @@
 # app_framework/src/Campaigns_and_Channels/data_layer/db.py
 
-import mysql.connector
-from mysql.connector.pooling import MySQLConnectionPool
-from mysql.connector import Error
+import contextlib
+import itertools
+import threading
+import time
+import weakref
+from typing import Iterable, Iterator, List, Tuple
+
+from .. import tracing
+from .query_registry import QueryTemplate
+from .driver import resolve_use_pure
+from .instrumentation import DBStats
 
 
 class DB:
-    _pool: MySQLConnectionPool | None = None
+    _pool = None  # MySQLConnectionPool, or a stand-in installed by use_pool
+
+    # Pool config recorded by init_pool; the pool itself is built on first use
+    _config: dict | None = None
+    _pool_lock = threading.Lock()
+
+    # Statement cache: raw connection -> {template name: cursor}
+    _statements: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+    # Dropped caches: raw connection -> [{template name: cursor}, ...], closed
+    # by the next thread to check that connection out (see _drop_statements)
+    _retired: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+    _statements_lock = threading.Lock()
+    _prepared: bool = True
+    _reset_session: bool = True
+    use_pure: bool = False
+
+    # Per-thread unit of work (see unit_of_work)
+    _local = threading.local()
 
     @classmethod
     def init_pool(cls, cfg: dict) -> None:
         """
-        Initialize the connection pool once from JSON config dict.
+        Record the connection pool config from JSON config dict. The pool is
+        built (and mysql.connector imported) on the first get_connection(),
+        so commands that never query do not pay for connecting.
 
         Expected shape:
         cfg["database"]["pool"]["name"]
         cfg["database"]["pool"]["size"]
         cfg["database"]["connection"]["config"]  -> dict(host, port, user, password, database)
+
+        Optional:
+        cfg["database"]["pool"]["warm_up"]             (default False) build the
+                                                       pool on a background thread now
+        cfg["database"]["pool"]["reset_session"]       (default True)
+        cfg["database"]["statement_cache"]["prepared"] (default True)
+        cfg["database"]["driver"]  -> "cext" | "pure" | "auto" (see driver.py)
+        cfg["database"]["instrumentation"] -> see instrumentation.DBStats
+
+        Server-side prepared statements are deallocated when the pool resets
+        a session, so they are only cached when reset_session is False.
         """
-        if cls._pool is not None:
+        if cls._pool is not None or cls._config is not None:
             return
 
-        cls._pool = MySQLConnectionPool(
-            pool_name=cfg["database"]["pool"]["name"],
-            pool_size=cfg["database"]["pool"]["size"],
+        pool_cfg = cfg["database"]["pool"]
+        cls._reset_session = bool(pool_cfg.get("reset_session", True))
+        stmt_cfg = cfg["database"].get("statement_cache", {})
+        cls._prepared = bool(stmt_cfg.get("prepared", True)) and not cls._reset_session
+        DBStats.configure(cfg)
+        cls._config = cfg
+
+        if pool_cfg.get("warm_up", False):
+            cls.warm_up(background=True)
+
+    @classmethod
+    def warm_up(cls, background: bool = False) -> None:
+        """
+        Build the configured pool now instead of on the first query.
+        In the background a failure is left for the first query to report.
+        """
+        if not background:
+            cls._ensure_pool()
+            return
+
+        def run():
+            try:
+                cls._ensure_pool()
+            except Exception:
+                pass
+
+        threading.Thread(target=run, name="db-warm-up", daemon=True).start()
+
+    @classmethod
+    def _ensure_pool(cls):
+        pool = cls._pool
+        if pool is not None:
+            return pool
+        with cls._pool_lock:
+            if cls._pool is None:
+                if cls._config is None:
+                    raise RuntimeError("DB pool not initialized")
+                cls._pool = cls._build_pool(cls._config)
+            return cls._pool
+
+    @classmethod
+    def _build_pool(cls, cfg: dict):
+        from mysql.connector.pooling import MySQLConnectionPool
+
+        pool_cfg = cfg["database"]["pool"]
+        cls.use_pure = resolve_use_pure(cfg["database"])
+        return MySQLConnectionPool(
+            pool_name=pool_cfg["name"],
+            pool_size=pool_cfg["size"],
+            pool_reset_session=cls._reset_session,
+            use_pure=cls.use_pure,
             **cfg["database"]["connection"]["config"],
         )
 
     @classmethod
-    def get_connection(cls) -> mysql.connector.connection.MySQLConnection:
-        """Get a pooled MySQL connection. Call .close() when done."""
+    def use_pool(cls, pool, prepared: bool = False, reset_session: bool = False) -> None:
+        """
+        Install an already-built pool-like object (anything with
+        get_connection()), e.g. the local stand-in used by benchmarks.
+        """
+        cls.close_pool()
+        cls._pool = pool
+        cls._prepared = prepared
+        cls._reset_session = reset_session
+
+    @classmethod
+    def close_pool(cls) -> None:
+        """
+        Drop the pool and its idle connections so init_pool can run again
+        (e.g. with a different driver). Connections still checked out are
+        closed by their holders.
+        """
+        with cls._pool_lock:
+            cls._config = None
         if cls._pool is None:
-            raise RuntimeError("DB pool not initialized")
-        return cls._pool.get_connection()
+            return
+        try:
+            remove = getattr(cls._pool, "_remove_connections", None)
+            if remove is not None:
+                remove()
+        finally:
+            cls._pool = None
+            cls._drop_statements()
+
+    @classmethod
+    def get_connection(cls) -> "mysql.connector.connection.MySQLConnection":
+        """
+        Get a pooled MySQL connection. Call .close() when done.
+        Inside unit_of_work() this returns a savepoint on the unit's connection.
+        The first call builds the pool recorded by init_pool.
+        """
+        unit = getattr(cls._local, "unit", None)
+        if unit is not None:
+            return unit.savepoint()
+        pool = cls._pool or cls._ensure_pool()
+        started = time.perf_counter()
+        try:
+            with tracing.span("db.checkout"):
+                conn = pool.get_connection()
+        except Exception as e:
+            # matched by name: mysql.connector is not imported until the pool is built
+            if type(e).__name__ == "PoolError":
+                DBStats.record_pool_exhausted()
+            raise
+        DBStats.record_checkout(time.perf_counter() - started)
+        cnx = _raw_connection(conn)
+        if cls._retired:
+            with cls._statements_lock:
+                retired = cls._retired.pop(cnx, ())
+            for per_conn in retired:
+                _close_cursors(per_conn)
+        if cls._reset_session:
+            # session was reset on return to the pool: release the cached cursors
+            with cls._statements_lock:
+                per_conn = cls._statements.pop(cnx, None)
+            if per_conn:
+                _close_cursors(per_conn)
+        return conn
+
+    @classmethod
+    @contextlib.contextmanager
+    def unit_of_work(cls):
+        """
+        Run everything on this thread inside one transaction.
+
+        While the block runs, get_connection() hands out savepoints on a
+        single pooled connection: a DAO's commit() releases its savepoint and
+        its rollback() undoes only its own work, so DAO code is unchanged.
+        The whole unit commits when the block exits normally and rolls back
+        if it raises. Nested calls join the outer unit.
+
+        DDL (e.g. schema.ensure_table) commits implicitly in MySQL; create
+        support tables before entering the unit.
+        """
+        if getattr(cls._local, "unit", None) is not None:
+            yield
+            return
+
+        conn = cls.get_connection()
+        cls._local.unit = _UnitOfWork(conn)
+        try:
+            if not conn.in_transaction:
+                conn.start_transaction()
+            yield
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cls._local.unit = None
+            conn.close()
+
+    # ---------------------------------------------------------- #
+    # STATEMENT CACHE
+    # ---------------------------------------------------------- #
+    @classmethod
+    def set_prepared(cls, enabled: bool) -> None:
+        """Toggle server-side prepared statements (drops cached cursors)."""
+        cls._prepared = bool(enabled)
+        cls._drop_statements()
+
+    @classmethod
+    def _drop_statements(cls) -> None:
+        """
+        Empty the statement cache. The dropped cursors are closed, which
+        deallocates their server-side statements, when their connection is
+        next checked out: a connection in use on another thread is never
+        touched, and an idle one keeps at most the statements it already had.
+        """
+        with cls._statements_lock:
+            dropped, cls._statements = cls._statements, weakref.WeakKeyDictionary()
+            for cnx, per_conn in dropped.items():
+                if per_conn:
+                    cls._retired.setdefault(cnx, []).append(per_conn)
+
+    @classmethod
+    def cursor(cls, conn, template: QueryTemplate, raw: bool = False):
+        """
+        Return the cursor cached for this template on this pooled connection,
+        creating (and, for prepared templates, preparing on first execute) it once.
+        Cached cursors live as long as the underlying connection; do not close them.
+
+        raw=True returns an undecoded (bytes) text-protocol cursor for bulk
+        scans where the caller does its own conversion.
+        """
+        cnx = _raw_connection(conn)
+        per_conn = cls._statements.get(cnx)
+        if per_conn is None:
+            with cls._statements_lock:
+                per_conn = cls._statements.setdefault(cnx, {})
+
+        key = template.name + "#raw" if raw else template.name
+        cur = per_conn.get(key)
+        if cur is None:
+            if raw:
+                cur = conn.cursor(raw=True)
+            elif template.prepared and cls._prepared:
+                cur = conn.cursor(prepared=True)
+            else:
+                cur = conn.cursor()
+            per_conn[key] = cur
+        return cur
+
+    @classmethod
+    def execute(cls, conn, template: QueryTemplate, params=(), raw: bool = False):
+        """Execute a registered template and return its (cached) cursor."""
+        cur = cls.cursor(conn, template, raw=raw)
+        started = time.perf_counter()
+        try:
+            with tracing.span("db.sql", template.name):
+                cur.execute(template.sql, tuple(params))
+        finally:
+            DBStats.record_query(template, time.perf_counter() - started, params)
+        return cur
+
+    @classmethod
+    def executemany(cls, conn, template: QueryTemplate, seq_params):
+        """executemany for a registered template (uses a plain cursor)."""
+        cur = cls.cursor(conn, template)
+        started = time.perf_counter()
+        try:
+            with tracing.span("db.sql", template.name, rows=len(seq_params)):
+                cur.executemany(template.sql, seq_params)
+        finally:
+            DBStats.record_query(
+                template, time.perf_counter() - started, f"<{len(seq_params)} rows>"
+            )
+        return cur
+
+
+class _UnitOfWork:
+    """Connection shared by every DB.get_connection() inside DB.unit_of_work()."""
+
+    def __init__(self, conn) -> None:
+        self.conn = conn
+        self._names = itertools.count(1)
+
+    def savepoint(self) -> "_Savepoint":
+        return _Savepoint(self.conn, f"uow_{next(self._names)}")
+
+
+class _Savepoint:
+    """
+    Stands in for a pooled connection inside a unit of work:
+    commit/rollback/close act on a savepoint instead of the transaction.
+    """
+
+    def __init__(self, conn, name: str) -> None:
+        self._conn = conn
+        self._cnx = _raw_connection(conn)  # statement cache key
+        self._name = name
+        self._open = True
+        self._control(f"SAVEPOINT {name}")
+
+    def _control(self, sql: str) -> None:
+        cur = self._conn.cursor()
+        try:
+            cur.execute(sql)
+        finally:
+            cur.close()
+
+    def cursor(self, *args, **kwargs):
+        return self._conn.cursor(*args, **kwargs)
+
+    @property
+    def in_transaction(self) -> bool:
+        return True
+
+    def start_transaction(self, *args, **kwargs) -> None:  # noqa: ARG002
+        pass  # already inside the unit's transaction
+
+    def commit(self) -> None:
+        if self._open:
+            self._control(f"RELEASE SAVEPOINT {self._name}")
+            self._open = False
+
+    def rollback(self) -> None:
+        if self._open:
+            self._control(f"ROLLBACK TO SAVEPOINT {self._name}")
+            self._control(f"RELEASE SAVEPOINT {self._name}")
+            self._open = False
+
+    def close(self) -> None:
+        # reads never commit; keep whatever the savepoint holds
+        self.commit()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def _raw_connection(conn):
+    """The physical connection behind a PooledMySQLConnection."""
+    return getattr(conn, "_cnx", conn)
+
+
+def _close_cursors(per_conn: dict) -> None:
+    """Close cached cursors; a prepared cursor deallocates its statement."""
+    for cur in per_conn.values():
+        try:
+            cur.close()
+        except Exception:
+            pass  # connection already gone or reset: nothing left to free
+
+
+def fetch_one(cursor):
+    """
+    Fetch the first row and drain the rest, so a reused (prepared)
+    cursor never leaves an unread result on the connection.
+    """
+    rows = cursor.fetchall()
+    return rows[0] if rows else None
 
 
 def row_to_dict(cursor, row):
@@ -41,6 +378,59 @@ def row_to_dict(cursor, row):
         return None
     return {desc[0]: value for desc, value in zip(cursor.description, row)}
 
+
+def rows_to_dicts(cursor, rows) -> List[dict]:
+    """Convert fetched rows to dicts, reading cursor.description once."""
+    names = [desc[0] for desc in cursor.description]
+    return [dict(zip(names, row)) for row in rows]
+
+
+# A read projection: the columns a DAO read returns, in order
+Fields = Tuple[str, ...]
+
+
+def select_list(table: str, columns: Fields, fields: Fields, alias: str = "") -> str:
+    """
+    The SELECT list for a projection. Field names are interpolated into
+    SQL, so each must be one of the table's columns.
+    """
+    unknown = [f for f in fields if f not in columns]
+    if unknown or not fields:
+        raise ValueError(
+            f"unknown {table} field(s): {', '.join(unknown) or '(none given)'} "
+            f"(expected some of: {', '.join(columns)})"
+        )
+    prefix = f"{alias}." if alias else ""
+    return ", ".join(prefix + f for f in fields)
+
+
+def projection_key(columns: Fields, fields: Fields) -> str:
+    """QUERIES.variant key for a projection ('' for every column)."""
+    return "" if tuple(fields) == tuple(columns) else ",".join(fields)
+
+
+IN_CHUNK = 512
+
+
+def in_chunks(ids: Iterable[int], size: int = IN_CHUNK) -> Iterator[Tuple[list, int]]:
+    """
+    Split ids (deduplicated) into chunks for "col IN (...)" queries.
+    Yields (params, placeholders): each chunk is padded with its last id
+    to a power-of-two length, so lists of any length share a handful of
+    templates (and prepared statements) instead of one per length.
+    """
+    unique = sorted(set(ids))
+    for i in range(0, len(unique), size):
+        chunk = unique[i:i + size]
+        n = 1
+        while n < len(chunk):
+            n *= 2
+        yield chunk + [chunk[-1]] * (n - len(chunk)), n
+
+
+def in_placeholders(n: int) -> str:
+    return ", ".join(["%s"] * n)
+
 """ def upsert_campaign_daily_metrics(campaign_id, metric_date, impressions, clicks, cost_cents):
     conn = get_connection()
     try:
@@ -0,0 +1,49 @@
+"""
+MySQL driver selection shared by every connection pool in the app.
+
+Both DB.init_pool and MySQLPersistenceWrapper read the same setting,
+so the protocol parser (pure Python vs the C extension) is chosen in
+exactly one place:
+
+    cfg["database"]["driver"] = "cext" | "pure" | "auto"
+
+"cext" requires the C extension, "pure" forces the pure-Python parser,
+and "auto" uses the C extension when it is installed. When "driver" is
+absent the legacy cfg["database"]["pool"]["use_pure"] flag is honored.
+"""
+
+DRIVERS = ("cext", "pure", "auto")
+
+
+def have_cext() -> bool:
+    """True if the mysql-connector C extension can be loaded."""
+    import mysql.connector
+
+    return bool(getattr(mysql.connector, "HAVE_CEXT", False))
+
+
+def driver_name(database_cfg: dict) -> str:
+    """Configured driver name, mapping the legacy use_pure flag."""
+    name = database_cfg.get("driver")
+    if name is None:
+        use_pure = database_cfg.get("pool", {}).get("use_pure")
+        if use_pure is None:
+            return "auto"
+        return "pure" if use_pure else "cext"
+    if name not in DRIVERS:
+        raise ValueError(
+            f"Invalid database driver '{name}'. Must be one of: {', '.join(DRIVERS)}"
+        )
+    return name
+
+
+def resolve_use_pure(database_cfg: dict) -> bool:
+    """The use_pure value to pass to MySQLConnectionPool."""
+    name = driver_name(database_cfg)
+    if name == "pure":
+        return True
+    if name == "cext" and not have_cext():
+        raise RuntimeError(
+            "database driver 'cext' requested but the MySQL C extension is not installed"
+        )
+    return not have_cext()
@@ -0,0 +1,334 @@
+"""
+Hot-path instrumentation for database access.
+
+Collects, in memory and with bounded cost per call:
+  - latency histograms per query template (see QueryTemplate.histogram)
+  - latency histograms and rows returned per DAO method (@instrument_dao)
+  - pool checkout count, checkout wait time and pool-exhausted errors
+  - a slow-query log with the template name and parameters
+  - per-command query auditing (see query_audit.QueryAudit)
+
+Everything is exposed through DBStats for the stats:db command.
+"""
+
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List
+
+from .. import tracing
+from ..config import CONFIG
+from .query_audit import QueryAudit
+
+
+def _bucket_bounds() -> List[float]:
+    """Upper bounds in seconds: 10us .. ~100s, ~12% apart."""
+    bounds = []
+    b = 0.00001
+    while b < 100.0:
+        bounds.append(b)
+        b *= 1.12
+    return bounds
+
+
+_BOUNDS = _bucket_bounds()
+
+
+class LatencyHistogram:
+    """Fixed log-spaced bucket histogram; percentiles are bucket upper bounds."""
+
+    __slots__ = ("counts", "count", "total", "max", "_lock")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        i = bisect_left(_BOUNDS, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, p: float) -> float:
+        """Approximate p-th percentile (0-100) in seconds."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = max(1, int(round(self.count * p / 100.0)))
+            seen = 0
+            for i, n in enumerate(self.counts):
+                seen += n
+                if seen >= target:
+                    return min(_BOUNDS[i], self.max) if i < len(_BOUNDS) else self.max
+            return self.max
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.count,
+            "avg_ms": (self.total / self.count * 1000.0) if self.count else 0.0,
+            "p50_ms": self.percentile(50) * 1000.0,
+            "p95_ms": self.percentile(95) * 1000.0,
+            "p99_ms": self.percentile(99) * 1000.0,
+            "max_ms": self.max * 1000.0,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts = [0] * (len(_BOUNDS) + 1)
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
+
+
+class _MethodStats:
+    __slots__ = ("histogram", "rows", "errors")
+
+    def __init__(self) -> None:
+        self.histogram = LatencyHistogram()
+        self.rows = 0
+        self.errors = 0
+
+
+class DBStats:
+    """Process-wide DB counters (class-level, like DB itself)."""
+
+    enabled: bool = True
+    slow_query_seconds: float = 0.25
+    log_params: bool = True
+    log_prefix: str = "db"
+
+    checkouts: int = 0
+    pool_exhausted: int = 0
+    pool_wait = LatencyHistogram()
+    slow_queries: int = 0
+
+    _methods: Dict[str, _MethodStats] = {}
+    _lock = threading.Lock()
+    _logger = None
+    _config: dict = None  # config dict last applied by configure()
+    # Per-thread [queries, seconds] while a scope is open (see begin_scope)
+    _scope = threading.local()
+
+    @classmethod
+    def configure(cls, cfg: dict) -> None:
+        """
+        Read optional settings:
+        cfg["database"]["instrumentation"] -> {enabled, slow_query_ms, log_params}
+        cfg["meta"]["log_prefix"]          -> slow-query log file prefix
+        Re-applied when the instrumentation section is hot-reloaded.
+        """
+        cls._config = cfg
+        inst = cfg.get("database", {}).get("instrumentation", {})
+        cls.enabled = bool(inst.get("enabled", True))
+        cls.slow_query_seconds = float(inst.get("slow_query_ms", 250)) / 1000.0
+        cls.log_params = bool(inst.get("log_params", True))
+        cls.log_prefix = cfg.get("meta", {}).get("log_prefix", "db")
+
+    # ---------------------------------------------------------- #
+    # RECORDING
+    # ---------------------------------------------------------- #
+    @classmethod
+    def record_checkout(cls, seconds: float) -> None:
+        with cls._lock:
+            cls.checkouts += 1
+        cls.pool_wait.record(seconds)
+
+    @classmethod
+    def record_pool_exhausted(cls) -> None:
+        with cls._lock:
+            cls.pool_exhausted += 1
+
+    @classmethod
+    def record_query(cls, template, seconds: float, params) -> None:
+        template.record(seconds)
+        scope = getattr(cls._scope, "stats", None)
+        if scope is not None:
+            scope[0] += 1
+            scope[1] += seconds
+        QueryAudit.record(template, params)
+        if cls.enabled and seconds >= cls.slow_query_seconds:
+            with cls._lock:
+                cls.slow_queries += 1
+            cls._log_slow(template, seconds, params)
+
+    @classmethod
+    def record_method(cls, name: str, seconds: float, rows: int, failed: bool) -> None:
+        stats = cls._methods.get(name)
+        if stats is None:
+            with cls._lock:
+                stats = cls._methods.setdefault(name, _MethodStats())
+        stats.histogram.record(seconds)
+        with cls._lock:
+            stats.rows += rows
+            if failed:
+                stats.errors += 1
+
+    @classmethod
+    def _log_slow(cls, template, seconds: float, params) -> None:
+        shown = params if cls.log_params else "<hidden>"
+        try:
+            if cls._logger is None:
+                # imported lazily: logging reads settings from disk
+                from ..logging import LoggingService
+                cls._logger = LoggingService("SlowQueryLog", cls.log_prefix)
+            cls._logger.log_warning(
+                "slow query %s took %.1f ms (threshold %.0f ms): %s params=%s trace=%s",
+                template.name, seconds * 1000, cls.slow_query_seconds * 1000,
+                template.sql, shown, tracing.current_trace_id(),
+            )
+        except Exception:
+            # the slow-query log must never fail the query itself
+            pass
+
+    # ---------------------------------------------------------- #
+    # PER-THREAD SCOPES (e.g. one HTTP request)
+    # ---------------------------------------------------------- #
+    @classmethod
+    def begin_scope(cls) -> None:
+        """Start counting queries and DB time issued by this thread."""
+        cls._scope.stats = [0, 0.0]
+
+    @classmethod
+    def end_scope(cls) -> tuple:
+        """Stop counting; returns (queries, seconds) since begin_scope()."""
+        stats = getattr(cls._scope, "stats", None)
+        cls._scope.stats = None
+        return (stats[0], stats[1]) if stats else (0, 0.0)
+
+    # ---------------------------------------------------------- #
+    # REPORTING
+    # ---------------------------------------------------------- #
+    @classmethod
+    def method_stats(cls) -> List[Dict]:
+        out = []
+        with cls._lock:
+            counts = [
+                (name, stats, stats.rows, stats.errors)
+                for name, stats in sorted(cls._methods.items())
+            ]
+        for name, stats, rows, errors in counts:
+            row = {"method": name, "rows": rows, "errors": errors}
+            row.update(stats.histogram.summary())
+            out.append(row)
+        return out
+
+    @classmethod
+    def pool_stats(cls) -> Dict:
+        with cls._lock:
+            out = {
+                "checkouts": cls.checkouts,
+                "pool_exhausted": cls.pool_exhausted,
+                "slow_queries": cls.slow_queries,
+            }
+        out.update({f"wait_{k}": v for k, v in cls.pool_wait.summary().items()})
+        return out
+
+    @classmethod
+    def reset(cls) -> None:
+        from .query_registry import QUERIES
+        with cls._lock:
+            cls._methods = {}
+            cls.checkouts = 0
+            cls.pool_exhausted = 0
+            cls.slow_queries = 0
+        cls.pool_wait.reset()
+        QUERIES.reset_stats()
+
+
+def _rows_of(result) -> int:
+    if result is None:
+        return 0
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    if isinstance(result, dict):
+        return 1
+    return 0
+
+
+def instrument_dao(cls):
+    """
+    Class decorator: time every public method of a DAO and count the rows
+    it returns, under "<ClassName>.<method>". Generator methods (streaming
+    reads) are timed while they produce rows, not while the caller consumes them.
+    """
+    for attr, fn in list(vars(cls).items()):
+        if attr.startswith("_") or not callable(fn):
+            continue
+
+        def wrap_generator(fn, name):
+            @functools.wraps(fn)
+            def timed(*args, **kwargs):
+                if not DBStats.enabled:
+                    yield from fn(*args, **kwargs)
+                    return
+                gen = fn(*args, **kwargs)
+                spent = 0.0
+                rows = 0
+                failed = True
+                first = None
+                try:
+                    while True:
+                        started = time.perf_counter()
+                        if first is None:
+                            first = started
+                        try:
+                            item = next(gen)
+                        except StopIteration:
+                            failed = False
+                            return
+                        finally:
+                            spent += time.perf_counter() - started
+                        rows += 1
+                        yield item
+                except GeneratorExit:
+                    failed = False  # caller stopped early
+                    gen.close()
+                    raise
+                finally:
+                    DBStats.record_method(name, spent, rows, failed)
+                    if first is not None:
+                        # time inside the generator only, not the caller's loop body
+                        tracing.add_span("dao." + name, first, spent, rows=rows)
+            return timed
+
+        def wrap(fn, name):
+            span_name = "dao." + name
+
+            @functools.wraps(fn)
+            def timed(*args, **kwargs):
+                with tracing.span(span_name):
+                    if not DBStats.enabled:
+                        return fn(*args, **kwargs)
+                    started = time.perf_counter()
+                    failed = True
+                    result = None
+                    try:
+                        result = fn(*args, **kwargs)
+                        failed = False
+                        return result
+                    finally:
+                        DBStats.record_method(
+                            name, time.perf_counter() - started, _rows_of(result), failed
+                        )
+            return timed
+
+        wrapper = wrap_generator if inspect.isgeneratorfunction(fn) else wrap
+        setattr(cls, attr, wrapper(fn, f"{cls.__name__}.{attr}"))
+    return cls
+
+
+def _on_config_reload(source, changed, doc):
+    if source == "config" and doc is DBStats._config \
+            and any(k.startswith("database.instrumentation") for k in changed):
+        DBStats.configure(doc)
+
+
+CONFIG.subscribe(_on_config_reload)
@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from ..config import CONFIG
+from .campaign_channel_xref_dao import CampaignChannelXrefDAO
+from .instrumentation import DBStats
+
+
+METRIC_FIELDS = ("impressions", "clicks", "spend_cents", "revenue_cents")
+
+# DB-API error classes (mysql.connector and sqlite3 share the names) that say
+# the server or connection failed, not the rows: the batch is kept as is
+_TRANSIENT_ERRORS = ("OperationalError", "InterfaceError", "InternalError", "PoolError")
+
+
+def _transient(exc: Exception) -> bool:
+    return any(cls.__name__ in _TRANSIENT_ERRORS for cls in type(exc).__mro__)
+
+
+class MetricsWriteBuffer:
+    """
+    In-memory write-behind buffer in front of CampaignChannelXrefDAO.
+
+    Daily metric upserts are coalesced per (campaign_id, metric_date) and
+    written to campaign_daily_metrics in one batch when:
+      - the number of pending keys reaches max_pending,
+      - flush_interval_seconds elapse (background flusher thread), or
+      - flush() / close() is called (e.g. on process shutdown).
+
+    Modes:
+      - "overwrite": last write wins, both in memory and in SQL.
+      - "additive":  values are summed in memory and added to the stored row.
+
+    Failed flushes never raise to the caller (reads flush first, and so
+    does process exit). They are logged. When the server or connection
+    failed, the whole batch is re-queued for the next flush. Otherwise
+    the rows are retried one at a time: good rows are written, and a row
+    that keeps failing is re-queued until it has failed max_attempts
+    flushes, then dropped to the in-memory dead letters (dead_letters())
+    and logged with its values.
+    """
+
+    MODES = ("overwrite", "additive")
+    DEAD_LETTER_LIMIT = 1000
+
+    def __init__(
+        self,
+        xref: Optional[CampaignChannelXrefDAO] = None,
+        mode: str = "overwrite",
+        max_pending: int = 500,
+        flush_interval_seconds: float = 5.0,
+        max_attempts: int = 3,
+    ) -> None:
+        if mode not in self.MODES:
+            raise ValueError(
+                f"Invalid metrics buffer mode '{mode}'. Must be one of: {', '.join(self.MODES)}"
+            )
+        self.xref = xref or CampaignChannelXrefDAO()
+        self.mode = mode
+        self.max_pending = max(1, int(max_pending))
+        self.flush_interval_seconds = float(flush_interval_seconds)
+        self.max_attempts = max(1, int(max_attempts))
+
+        self._pending: Dict[Tuple[int, date], Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._closed = False
+        # failed flushes per pending key, and the rows given up on
+        self._attempts: Dict[Tuple[int, date], int] = {}
+        self._dead_letters: deque = deque(maxlen=self.DEAD_LETTER_LIMIT)
+        self._logger = None
+
+        self._stats = {
+            "writes_received": 0,
+            "writes_coalesced": 0,
+            "flushes": 0,
+            "rows_flushed": 0,
+            "flush_errors": 0,
+            "rows_retried": 0,
+            "rows_dropped": 0,
+            "last_flush_seconds": 0.0,
+            "max_flush_seconds": 0.0,
+            "total_flush_seconds": 0.0,
+        }
+
+        self._cfg: Optional[dict] = None
+        self._thread: Optional[threading.Thread] = None
+        if self.flush_interval_seconds > 0:
+            self._thread = threading.Thread(
+                target=self._run, name="metrics-write-behind", daemon=True
+            )
+            self._thread.start()
+
+    @classmethod
+    def from_config(cls, cfg: Optional[dict], xref: Optional[CampaignChannelXrefDAO] = None):
+        """
+        Build a buffer from the optional "metrics_buffer" config section.
+        Returns None when the section is missing or not enabled.
+        """
+        if not cfg or not cfg.get("enabled", False):
+            return None
+        buffer = cls(
+            xref=xref,
+            mode=cfg.get("mode", "overwrite"),
+            max_pending=cfg.get("max_pending", 500),
+            flush_interval_seconds=cfg.get("flush_interval_seconds", 5.0),
+            max_attempts=cfg.get("max_attempts", 3),
+        )
+        # pick up max_pending / flush_interval_seconds edits (config.CONFIG.watch)
+        buffer._cfg = cfg
+        CONFIG.subscribe(buffer._on_config_reload)
+        return buffer
+
+    def _on_config_reload(self, source: str, changed: list, doc: dict) -> None:
+        if source != "config" or doc.get("metrics_buffer") is not self._cfg:
+            return
+        self.max_pending = max(1, int(self._cfg.get("max_pending", self.max_pending)))
+        self.max_attempts = max(1, int(self._cfg.get("max_attempts", self.max_attempts)))
+        interval = float(self._cfg.get("flush_interval_seconds", self.flush_interval_seconds))
+        # the flusher thread is only started at construction: retune it, never stop it
+        if interval > 0 and self._thread is not None:
+            self.flush_interval_seconds = interval
+
+    # ---------------------------------------------------------- #
+    # WRITE
+    # ---------------------------------------------------------- #
+    def add(
+        self,
+        campaign_id: int,
+        metric_date: date,
+        impressions: int = 0,
+        clicks: int = 0,
+        spend_cents: int = 0,
+        revenue_cents: int = 0,
+    ) -> None:
+        """
+        Queue one daily metrics write. Flushes synchronously when full.
+        """
+        if self._closed:
+            raise RuntimeError("metrics buffer is closed")
+
+        values = {
+            "impressions": impressions,
+            "clicks": clicks,
+            "spend_cents": spend_cents,
+            "revenue_cents": revenue_cents,
+        }
+        with self._lock:
+            self._stats["writes_received"] += 1
+            self._merge(self._pending, (campaign_id, metric_date), values)
+            full = len(self._pending) >= self.max_pending
+
+        if full:
+            self.flush()
+
+    def _merge(self, target: dict, key: Tuple[int, date], values: Dict[str, int]) -> None:
+        current = target.get(key)
+        if current is None:
+            target[key] = dict(values)
+            return
+
+        self._stats["writes_coalesced"] += 1
+        if self.mode == "additive":
+            for f in METRIC_FIELDS:
+                current[f] += values[f]
+        else:
+            target[key] = dict(values)
+
+    # ---------------------------------------------------------- #
+    # FLUSH
+    # ---------------------------------------------------------- #
+    def flush(self) -> int:
+        """
+        Write all pending rows in one batch. Returns the number of rows written.
+
+        Does not raise: a failed batch is logged and handled as described
+        in the class docstring (stats(): flush_errors, rows_retried,
+        rows_dropped).
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch = self._pending
+                self._pending = {}
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                self._write(list(batch.items()))
+                written = len(batch)
+                with self._lock:
+                    for key in batch:
+                        self._attempts.pop(key, None)
+            except Exception as exc:
+                with self._lock:
+                    self._stats["flush_errors"] += 1
+                if _transient(exc):
+                    self._log("warning", "metrics buffer: flush of %d rows failed, "
+                              "re-queued for the next flush: %s", len(batch), exc)
+                    self._requeue(batch)
+                    return 0
+                self._log("warning", "metrics buffer: flush of %d rows failed, "
+                          "retrying them one at a time: %s", len(batch), exc)
+                written = self._flush_rows(batch)
+
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._stats["flushes"] += 1
+                self._stats["rows_flushed"] += written
+                self._stats["last_flush_seconds"] = elapsed
+                self._stats["total_flush_seconds"] += elapsed
+                if elapsed > self._stats["max_flush_seconds"]:
+                    self._stats["max_flush_seconds"] = elapsed
+            return written
+
+    def _write(self, items) -> None:
+        rows: List[tuple] = [
+            (cid, d, v["impressions"], v["clicks"], v["spend_cents"], v["revenue_cents"])
+            for (cid, d), v in items
+        ]
+        self.xref.upsert_campaign_daily_metrics_many(
+            rows, additive=(self.mode == "additive")
+        )
+
+    def _flush_rows(self, batch: Dict[Tuple[int, date], Dict[str, int]]) -> int:
+        """Retry a failed batch row by row; returns the rows written."""
+        written = 0
+        failed: Dict[Tuple[int, date], Dict[str, int]] = {}
+        for i, (key, values) in enumerate(batch.items()):
+            try:
+                self._write([(key, values)])
+            except Exception as exc:
+                if _transient(exc):
+                    # the server went away mid-retry: keep this row and the rest
+                    failed.update(list(batch.items())[i:])
+                    self._log("warning", "metrics buffer: retry stopped, %d rows "
+                              "re-queued: %s", len(batch) - i, exc)
+                    break
+                attempts = self._attempts.get(key, 0) + 1
+                if attempts < self.max_attempts:
+                    self._attempts[key] = attempts
+                    failed[key] = values
+                    continue
+                with self._lock:
+                    self._attempts.pop(key, None)
+                    self._stats["rows_dropped"] += 1
+                    self._dead_letters.append({
+                        "campaign_id": key[0], "metric_date": key[1], **values,
+                        "error": str(exc),
+                    })
+                self._log("error", "metrics buffer: dropped row campaign_id=%s "
+                          "metric_date=%s %s after %d failed flushes: %s",
+                          key[0], key[1], values, attempts, exc)
+            else:
+                written += 1
+                with self._lock:
+                    self._attempts.pop(key, None)
+        with self._lock:
+            self._stats["rows_retried"] += len(batch)
+        if failed:
+            self._requeue(failed)
+        return written
+
+    def _requeue(self, batch: Dict[Tuple[int, date], Dict[str, int]]) -> None:
+        """Merge unwritten rows back; newer pending writes keep priority in overwrite mode."""
+        with self._lock:
+            newer = self._pending
+            self._pending = batch
+            for key, values in newer.items():
+                if self.mode == "additive" and key in self._pending:
+                    for f in METRIC_FIELDS:
+                        self._pending[key][f] += values[f]
+                else:
+                    self._pending[key] = values
+
+    def _log(self, level: str, message: str, *args) -> None:
+        try:
+            if self._logger is None:
+                # imported lazily: logging reads settings from disk
+                from ..logging import LoggingService
+                self._logger = LoggingService("MetricsWriteBuffer", DBStats.log_prefix)
+            getattr(self._logger, f"log_{level}")(message, *args)
+        except Exception:
+            # logging must never turn a handled flush failure into a new one
+            pass
+
+    def dead_letters(self) -> List[Dict]:
+        """Rows dropped after max_attempts failed flushes (most recent DEAD_LETTER_LIMIT)."""
+        with self._lock:
+            return list(self._dead_letters)
+
+    def close(self) -> int:
+        """
+        Stop the background flusher and flush what is left.
+        Safe to call more than once.
+        """
+        if self._closed:
+            return 0
+        self._closed = True
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_interval_seconds + 1)
+        written = self.flush()
+        with self._lock:
+            left = len(self._pending)
+        if left:
+            self._log("error", "metrics buffer: closed with %d unwritten rows", left)
+        return written
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval_seconds):
+            try:
+                self.flush()
+            except Exception as exc:
+                # flush() handles write errors itself; keep the flusher alive regardless
+                self._log("error", "metrics buffer: background flush failed: %s", exc)
+
+    # ---------------------------------------------------------- #
+    # STATS
+    # ---------------------------------------------------------- #
+    def stats(self) -> Dict:
+        """
+        Snapshot of buffer counters, including flush latency and how many
+        writes were coalesced away before reaching the database.
+        """
+        with self._lock:
+            out = dict(self._stats)
+            out["pending"] = len(self._pending)
+            out["dead_letters"] = len(self._dead_letters)
+        out["mode"] = self.mode
+        flushes = out["flushes"]
+        out["avg_flush_seconds"] = (out["total_flush_seconds"] / flushes) if flushes else 0.0
+        return out
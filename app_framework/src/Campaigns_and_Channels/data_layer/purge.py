@@ -0,0 +1,486 @@
+"""
+Chunked purge and archival of old campaign data (db:purge).
+
+Two jobs, each walking its table in primary-key order in chunks of at
+most chunk_rows rows, one short transaction per chunk:
+
+  - campaigns   campaigns with status 'archived' that ended before the
+                cutoff, in campaign_id order. Each campaign's daily rows
+                and channel links go chunk by chunk first, so the final
+                DELETE FROM campaign has nothing left to cascade.
+  - metrics     campaign_daily_metrics rows dated before the cutoff, in
+                (campaign_id, metric_date) order.
+
+A chunk locks its rows (SELECT ... FOR UPDATE), copies them to the
+matching *_archive table in mode "archive", deletes them and adds their
+metrics to campaign_purged_metrics, all in one transaction. The lifetime
+totals are left alone, so all-time performance still counts purged days;
+campaign:metrics:verify checks them against the daily plus purged rows.
+throttle_ms is slept between chunks to leave room for foreground writes.
+
+Every chunk also records the job's position in purge_checkpoint. A run
+that stops part way (error, Ctrl-C) resumes after its last committed
+chunk when started again with the same cutoff and mode; a finished job
+clears its checkpoint.
+
+Config (optional): "purge": {"retention_days": 730, "mode": "delete",
+"chunk_rows": 1000, "throttle_ms": 50}, read at the start of every run.
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .campaign_dao import COLUMNS as CAMPAIGN_COLUMNS
+from .campaign_channel_xref_dao import METRIC_COLUMNS
+from .db import DB, fetch_one, row_to_dict
+from .instrumentation import instrument_dao
+from .query_registry import QUERIES
+from .schema import ensure_table
+
+
+_DAILY_COLUMNS = ("campaign_id", "metric_date", *METRIC_COLUMNS)
+_LINK_COLUMNS = ("campaign_id", "channel_id")
+_MIN_DATE = date(1000, 1, 1)  # lowest MySQL DATE: the metrics job's starting key
+
+
+# Every statement a chunk runs is registered paged=True: a long run issues
+# each of them once per chunk, which the query audit must not report as n+1.
+def _mover(name: str, table: str, columns: tuple, key: tuple, where: str):
+    """(archive, delete) templates for the rows of table matching where."""
+    cols = ", ".join(columns)
+    updates = "".join(f"{c} = VALUES({c}), " for c in columns if c not in key)
+    archive = QUERIES.register(f"purge.archive_{name}", f"""
+        INSERT INTO {table}_archive ({cols})
+        SELECT {cols} FROM {table} WHERE {where}
+        ON DUPLICATE KEY UPDATE {updates}archived_at = NOW()
+    """, paged=True)
+    delete = QUERIES.register(
+        f"purge.delete_{name}", f"DELETE FROM {table} WHERE {where}", paged=True
+    )
+    return archive, delete
+
+
+# metrics job: keyset after the last committed (campaign_id, metric_date)
+_OLD_METRICS_AFTER = """
+    metric_date < %s
+    AND (campaign_id > %s OR (campaign_id = %s AND metric_date > %s))
+"""
+_OLD_METRICS_CHUNK = QUERIES.register("purge.old_metrics_chunk", f"""
+    SELECT {', '.join(_DAILY_COLUMNS)}
+    FROM campaign_daily_metrics
+    WHERE {_OLD_METRICS_AFTER}
+    ORDER BY campaign_id, metric_date
+    LIMIT %s
+    FOR UPDATE
+""", paged=True)
+# ...up to and including the last key the chunk locked
+_ARCHIVE_OLD_METRICS, _DELETE_OLD_METRICS = _mover(
+    "old_metrics", "campaign_daily_metrics", _DAILY_COLUMNS, _DAILY_COLUMNS[:2],
+    _OLD_METRICS_AFTER + "AND (campaign_id < %s OR (campaign_id = %s AND metric_date <= %s))",
+)
+_COUNT_OLD_METRICS = QUERIES.register("purge.count_old_metrics", """
+    SELECT COUNT(*) FROM campaign_daily_metrics WHERE metric_date < %s
+""")
+
+# campaigns job: everything of one campaign, children first
+_ARCHIVED_WHERE = "status = 'archived' AND COALESCE(end_date, start_date, DATE(created_at)) < %s"
+_ARCHIVED_CAMPAIGN_IDS = QUERIES.register("purge.archived_campaign_ids", f"""
+    SELECT campaign_id FROM campaign
+    WHERE {_ARCHIVED_WHERE} AND campaign_id > %s
+    ORDER BY campaign_id
+    LIMIT %s
+""", paged=True)
+_COUNT_ARCHIVED_CAMPAIGNS = QUERIES.register("purge.count_archived_campaigns", f"""
+    SELECT COUNT(*) FROM campaign WHERE {_ARCHIVED_WHERE}
+""")
+# the parent row lock also holds off new child rows (FK checks share-lock it)
+_LOCK_CAMPAIGN = QUERIES.register("purge.lock_campaign", """
+    SELECT status FROM campaign WHERE campaign_id = %s FOR UPDATE
+""", paged=True)
+_CAMPAIGN_METRICS_CHUNK = QUERIES.register("purge.campaign_metrics_chunk", f"""
+    SELECT {', '.join(_DAILY_COLUMNS)}
+    FROM campaign_daily_metrics
+    WHERE campaign_id = %s
+    ORDER BY metric_date
+    LIMIT %s
+    FOR UPDATE
+""", paged=True)
+_ARCHIVE_CAMPAIGN_METRICS, _DELETE_CAMPAIGN_METRICS = _mover(
+    "campaign_metrics", "campaign_daily_metrics", _DAILY_COLUMNS, _DAILY_COLUMNS[:2],
+    "campaign_id = %s AND metric_date <= %s",
+)
+_CAMPAIGN_LINKS_CHUNK = QUERIES.register("purge.campaign_links_chunk", """
+    SELECT channel_id
+    FROM campaign_channel_xref
+    WHERE campaign_id = %s
+    ORDER BY channel_id
+    LIMIT %s
+    FOR UPDATE
+""", paged=True)
+_ARCHIVE_CAMPAIGN_LINKS, _DELETE_CAMPAIGN_LINKS = _mover(
+    "campaign_links", "campaign_channel_xref", _LINK_COLUMNS, _LINK_COLUMNS,
+    "campaign_id = %s AND channel_id <= %s",
+)
+_ARCHIVE_CAMPAIGN, _DELETE_CAMPAIGN = _mover(
+    "campaign", "campaign", CAMPAIGN_COLUMNS, ("campaign_id",), "campaign_id = %s",
+)
+
+_PURGED_ADD = QUERIES.register("purge.purged_metrics_add", """
+    INSERT INTO campaign_purged_metrics (
+        campaign_id, impressions, clicks, spend_cents, revenue_cents
+    )
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+      impressions = impressions + VALUES(impressions),
+      clicks      = clicks + VALUES(clicks),
+      spend_cents = spend_cents + VALUES(spend_cents),
+      revenue_cents = revenue_cents + VALUES(revenue_cents)
+""", prepared=False, paged=True)
+
+_CHECKPOINT_GET = QUERIES.register("purge.checkpoint_get", """
+    SELECT job, cutoff, mode, last_campaign_id, last_date, done, updated_at
+    FROM purge_checkpoint
+    WHERE job = %s
+""")
+_CHECKPOINT_SAVE = QUERIES.register("purge.checkpoint_save", """
+    INSERT INTO purge_checkpoint (job, cutoff, mode, last_campaign_id, last_date, done, updated_at)
+    VALUES (%s, %s, %s, %s, %s, %s, NOW())
+    ON DUPLICATE KEY UPDATE
+      cutoff = VALUES(cutoff),
+      mode = VALUES(mode),
+      last_campaign_id = VALUES(last_campaign_id),
+      last_date = VALUES(last_date),
+      done = VALUES(done),
+      updated_at = NOW()
+""", paged=True)
+_CHECKPOINT_CLEAR = QUERIES.register("purge.checkpoint_clear", """
+    DELETE FROM purge_checkpoint WHERE job = %s
+""")
+
+
+def _record_purged(conn, rows) -> None:
+    """Add removed daily rows (campaign_id, date, impr, clicks, spend, revenue) to campaign_purged_metrics."""
+    totals: Dict[int, list] = {}
+    for row in rows:
+        acc = totals.setdefault(row[0], [0, 0, 0, 0])
+        for i in range(4):
+            acc[i] += int(row[2 + i] or 0)
+    # campaign order, as the metric writers lock summary rows
+    params = [(cid, *acc) for cid, acc in sorted(totals.items()) if any(acc)]
+    if params:
+        DB.executemany(conn, _PURGED_ADD, params)
+
+
+def _save_checkpoint(conn, checkpoint: Dict, last_campaign_id: int,
+                     last_date: Optional[date], done: int) -> None:
+    DB.execute(conn, _CHECKPOINT_SAVE, (
+        checkpoint["job"], checkpoint["cutoff"], checkpoint["mode"],
+        last_campaign_id, last_date, done,
+    ))
+
+
+@instrument_dao
+class PurgeDAO:
+    """
+    One chunk per call, each in its own transaction. The checkpoint
+    argument ({"job", "cutoff", "mode", "done"}, done counted before the
+    chunk) is written in the chunk's transaction when given.
+    """
+
+    def count_old_metrics(self, cutoff: date) -> int:
+        conn = DB.get_connection()
+        try:
+            cur = DB.execute(conn, _COUNT_OLD_METRICS, (cutoff,))
+            (count,) = fetch_one(cur)
+            return int(count or 0)
+        finally:
+            conn.close()
+
+    def count_archived_campaigns(self, cutoff: date) -> int:
+        conn = DB.get_connection()
+        try:
+            cur = DB.execute(conn, _COUNT_ARCHIVED_CAMPAIGNS, (cutoff,))
+            (count,) = fetch_one(cur)
+            return int(count or 0)
+        finally:
+            conn.close()
+
+    def archived_campaign_ids(self, cutoff: date, after_id: int = 0, limit: int = 1000) -> List[int]:
+        """Purgeable campaign ids after after_id, ascending."""
+        conn = DB.get_connection()
+        try:
+            cur = DB.execute(conn, _ARCHIVED_CAMPAIGN_IDS, (cutoff, after_id, limit))
+            return [r[0] for r in cur.fetchall()]
+        finally:
+            conn.close()
+
+    def purge_old_metrics_chunk(
+        self,
+        cutoff: date,
+        after: Tuple[int, date],
+        limit: int,
+        archive: bool = False,
+        checkpoint: Optional[Dict] = None,
+    ) -> Tuple[int, Optional[Tuple[int, date]]]:
+        """
+        Remove up to limit daily rows dated before cutoff whose key follows
+        after = (campaign_id, metric_date). Returns (rows removed, last key),
+        last key None when nothing is left.
+        """
+        ensure_table("campaign_purged_metrics")
+        if archive:
+            ensure_table("campaign_daily_metrics_archive")
+        if checkpoint is not None:
+            ensure_table("purge_checkpoint")
+        conn = DB.get_connection()
+        try:
+            try:
+                cur = DB.execute(
+                    conn, _OLD_METRICS_CHUNK, (cutoff, after[0], after[0], after[1], limit)
+                )
+                rows = cur.fetchall()
+                if not rows:
+                    conn.rollback()
+                    return 0, None
+                last = (rows[-1][0], rows[-1][1])
+                bounds = (cutoff, after[0], after[0], after[1], last[0], last[0], last[1])
+                if archive:
+                    DB.execute(conn, _ARCHIVE_OLD_METRICS, bounds)
+                cur = DB.execute(conn, _DELETE_OLD_METRICS, bounds)
+                removed = cur.rowcount
+                _record_purged(conn, rows)
+                if checkpoint is not None:
+                    _save_checkpoint(conn, checkpoint, last[0], last[1], checkpoint["done"] + removed)
+                conn.commit()
+                return removed, last
+            except Exception:
+                conn.rollback()
+                raise
+        finally:
+            conn.close()
+
+    def purge_campaign_chunk(
+        self,
+        campaign_id: int,
+        limit: int,
+        archive: bool = False,
+        archived_only: bool = True,
+        checkpoint: Optional[Dict] = None,
+    ) -> Tuple[Optional[str], int]:
+        """
+        Remove the next chunk of one campaign: up to limit daily rows, else
+        up to limit channel links, else the campaign row itself. Returns
+        (table, rows removed); table is None when the campaign is gone or,
+        with archived_only, no longer archived. The checkpoint is written
+        with the campaign row.
+        """
+        ensure_table("campaign_purged_metrics")
+        if archive:
+            for name in ("campaign_archive", "campaign_channel_xref_archive",
+                         "campaign_daily_metrics_archive"):
+                ensure_table(name)
+        if checkpoint is not None:
+            ensure_table("purge_checkpoint")
+        conn = DB.get_connection()
+        try:
+            try:
+                status = fetch_one(DB.execute(conn, _LOCK_CAMPAIGN, (campaign_id,)))
+                if status is None or (archived_only and status[0] != "archived"):
+                    conn.rollback()
+                    return None, 0
+
+                rows = DB.execute(conn, _CAMPAIGN_METRICS_CHUNK, (campaign_id, limit)).fetchall()
+                if rows:
+                    table, params = "campaign_daily_metrics", (campaign_id, rows[-1][1])
+                    archive_t, delete_t = _ARCHIVE_CAMPAIGN_METRICS, _DELETE_CAMPAIGN_METRICS
+                else:
+                    links = DB.execute(conn, _CAMPAIGN_LINKS_CHUNK, (campaign_id, limit)).fetchall()
+                    if links:
+                        table, params = "campaign_channel_xref", (campaign_id, links[-1][0])
+                        archive_t, delete_t = _ARCHIVE_CAMPAIGN_LINKS, _DELETE_CAMPAIGN_LINKS
+                    else:
+                        table, params = "campaign", (campaign_id,)
+                        archive_t, delete_t = _ARCHIVE_CAMPAIGN, _DELETE_CAMPAIGN
+
+                if archive:
+                    DB.execute(conn, archive_t, params)
+                removed = DB.execute(conn, delete_t, params).rowcount
+                if rows:
+                    _record_purged(conn, rows)
+                if table == "campaign" and checkpoint is not None:
+                    _save_checkpoint(conn, checkpoint, campaign_id, None, checkpoint["done"] + 1)
+                conn.commit()
+                return table, removed
+            except Exception:
+                conn.rollback()
+                raise
+        finally:
+            conn.close()
+
+    def get_checkpoint(self, job: str) -> Optional[Dict]:
+        ensure_table("purge_checkpoint")
+        conn = DB.get_connection()
+        try:
+            cur = DB.execute(conn, _CHECKPOINT_GET, (job,))
+            return row_to_dict(cur, fetch_one(cur))
+        finally:
+            conn.close()
+
+    def clear_checkpoint(self, job: str) -> None:
+        ensure_table("purge_checkpoint")
+        conn = DB.get_connection()
+        try:
+            DB.execute(conn, _CHECKPOINT_CLEAR, (job,))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+class Purger:
+    """
+    Runs the purge jobs chunk by chunk: throttling, checkpoints, progress.
+
+    progress, when given, is called after every chunk with the job's
+    running result plus "total" (rows for the metrics job, campaigns for
+    the campaigns job, including what a resumed run had already done).
+    """
+
+    JOBS = ("campaigns", "metrics")
+    MODES = ("delete", "archive")
+    DEFAULTS = {"retention_days": 730, "mode": "delete", "chunk_rows": 1000, "throttle_ms": 50}
+
+    def __init__(self, dao: Optional[PurgeDAO] = None, config: Optional[dict] = None) -> None:
+        self.dao = dao or PurgeDAO()
+        # the "purge" config section, read per run so reloads apply to the next one
+        self._cfg = config if config is not None else {}
+
+    def settings(self, **overrides) -> Dict:
+        """DEFAULTS, then the config section, then the non-None overrides."""
+        out = dict(self.DEFAULTS)
+        out.update({k: v for k, v in self._cfg.items() if k in out})
+        out.update({k: v for k, v in overrides.items() if k in out and v is not None})
+        if out["mode"] not in self.MODES:
+            raise ValueError(f"mode must be one of {', '.join(self.MODES)}, got {out['mode']!r}")
+        if int(out["retention_days"]) < 1:
+            raise ValueError("retention_days must be at least 1")
+        if int(out["chunk_rows"]) < 1:
+            raise ValueError("chunk_rows must be at least 1")
+        if float(out["throttle_ms"]) < 0:
+            raise ValueError("throttle_ms cannot be negative")
+        return out
+
+    @staticmethod
+    def cutoff(retention_days: int, today: Optional[date] = None) -> date:
+        """Rows dated before this day are past the retention window."""
+        return (today or date.today()) - timedelta(days=int(retention_days))
+
+    def pending(self, cutoff: date, jobs: Iterable[str] = JOBS) -> List[Dict]:
+        """What a run would remove, without touching anything."""
+        counts = {
+            "campaigns": self.dao.count_archived_campaigns,
+            "metrics": self.dao.count_old_metrics,
+        }
+        return [{"job": job, "cutoff": cutoff, "pending": counts[job](cutoff)}
+                for job in self._jobs(jobs)]
+
+    def run(
+        self,
+        cutoff: date,
+        jobs: Iterable[str] = JOBS,
+        mode: str = "delete",
+        chunk_rows: int = 1000,
+        throttle_ms: float = 0,
+        restart: bool = False,
+        progress: Optional[Callable[[Dict], None]] = None,
+    ) -> List[Dict]:
+        """Run the jobs in JOBS order; one result dict per job."""
+        return [
+            self._run_job(job, cutoff, mode, int(chunk_rows), float(throttle_ms) / 1000.0,
+                          restart, progress)
+            for job in self._jobs(jobs)
+        ]
+
+    def delete_campaign(self, campaign_id: int, chunk_rows: int = 1000) -> bool:
+        """
+        Delete one campaign of any status, its daily rows and links first in
+        chunks (no throttle, no checkpoint). True when the campaign row went.
+        """
+        while True:
+            table, _ = self.dao.purge_campaign_chunk(
+                campaign_id, chunk_rows, archived_only=False
+            )
+            if table is None:
+                return False
+            if table == "campaign":
+                return True
+
+    # ---------------------------------------------------------- #
+    def _jobs(self, jobs: Iterable[str]) -> List[str]:
+        wanted = set(jobs)
+        unknown = wanted.difference(self.JOBS)
+        if unknown:
+            raise ValueError(f"unknown purge job(s): {', '.join(sorted(unknown))}")
+        # archived campaigns first: their metrics go with them
+        return [job for job in self.JOBS if job in wanted]
+
+    def _run_job(self, job, cutoff, mode, chunk_rows, throttle_s, restart, progress) -> Dict:
+        archive = mode == "archive"
+        cp = None if restart else self.dao.get_checkpoint(job)
+        if cp is not None and (cp["cutoff"] != cutoff or cp["mode"] != mode):
+            cp = None  # a different run's position: start over
+        result = {
+            "job": job, "mode": mode, "cutoff": cutoff, "resumed": cp is not None,
+            "done": int(cp["done"]) if cp else 0, "rows": 0, "chunks": 0, "elapsed_s": 0.0,
+        }
+        count = self.dao.count_archived_campaigns if job == "campaigns" else self.dao.count_old_metrics
+        total = result["done"] + count(cutoff)
+        checkpoint = {"job": job, "cutoff": cutoff, "mode": mode, "done": result["done"]}
+        started = time.perf_counter()
+
+        def chunk_done(removed: int, units: int) -> None:
+            result["rows"] += removed
+            result["done"] += units
+            result["chunks"] += 1
+            checkpoint["done"] = result["done"]
+            result["elapsed_s"] = time.perf_counter() - started
+            if progress is not None:
+                progress(dict(result, total=total))
+
+        def throttle() -> None:
+            if result["chunks"] and throttle_s > 0:
+                time.sleep(throttle_s)
+
+        if job == "metrics":
+            after = (cp["last_campaign_id"], cp["last_date"]) if cp else (0, _MIN_DATE)
+            while True:
+                throttle()
+                removed, last = self.dao.purge_old_metrics_chunk(
+                    cutoff, after, chunk_rows, archive, checkpoint
+                )
+                if last is None:
+                    break
+                after = last
+                chunk_done(removed, removed)
+        else:
+            after_id = cp["last_campaign_id"] if cp else 0
+            while True:
+                ids = self.dao.archived_campaign_ids(cutoff, after_id, chunk_rows)
+                if not ids:
+                    break
+                for campaign_id in ids:
+                    table = ""
+                    while table not in ("campaign", None):
+                        throttle()
+                        table, removed = self.dao.purge_campaign_chunk(
+                            campaign_id, chunk_rows, archive, checkpoint=checkpoint
+                        )
+                        if table is not None:
+                            chunk_done(removed, 1 if table == "campaign" else 0)
+                after_id = ids[-1]
+
+        self.dao.clear_checkpoint(job)
+        result["elapsed_s"] = time.perf_counter() - started
+        return result
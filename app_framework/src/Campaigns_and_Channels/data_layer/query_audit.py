@@ -0,0 +1,217 @@
+"""
+Query auditing: per-command N+1 and redundant-query detection.
+
+While a scope is open on a thread (the UI opens one per command), every
+statement that goes through DB.execute / DB.executemany is grouped by its
+normalized template (the registry name, without any variant key). When the
+scope closes, two kinds of finding are reported:
+
+  - n+1        one template ran more than max_per_template times, e.g. a
+               lookup issued once per ID inside a loop
+  - repeated   the same template ran twice with identical parameters, e.g.
+               an existence check followed by a second get of the same row
+
+Templates registered with paged=True (keyset pages, IN chunks, purge
+chunks) run once per page or chunk by design, a purge chunk with the same
+parameters each time, so neither rule applies to them.
+
+Each finding carries the call-site stack (application frames only) of the
+statement that triggered it, so the loop or the second caller can be found
+without a profiler.
+
+mode "warn" prints the summary; mode "fail" also fails the command with a
+QueryAuditError, for test and CI runs (main.py --audit-queries fail).
+
+Config (optional): "database": {"query_audit": {"enabled": false,
+"mode": "warn", "max_per_template": 5, "stack_depth": 6}}.
+"""
+
+import os
+import sys
+import threading
+from typing import Dict, List, Optional
+
+from ..config import CONFIG
+
+# frames from these files are plumbing, not call sites
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SKIP_FILES = {
+    os.path.join(_PACKAGE_DIR, "data_layer", name)
+    for name in ("db.py", "instrumentation.py", "query_audit.py")
+} | {os.path.join(_PACKAGE_DIR, "tracing.py")}
+
+
+class QueryAuditError(AssertionError):
+    """Raised in "fail" mode when a command's queries have findings."""
+
+
+def _normalize(name: str) -> str:
+    # "campaign.list[active]" and "campaign.list[all]" are one logical query
+    return name.split("[", 1)[0]
+
+
+def _call_site(depth: int) -> List[str]:
+    """The innermost `depth` application frames as 'path:line in func'."""
+    out = []
+    frame = sys._getframe(2)
+    while frame is not None and len(out) < depth:
+        path = frame.f_code.co_filename
+        if path.startswith(_PACKAGE_DIR) and path not in _SKIP_FILES:
+            rel = os.path.relpath(path, _PACKAGE_DIR)
+            out.append(f"{rel}:{frame.f_lineno} in {frame.f_code.co_name}")
+        frame = frame.f_back
+    return out
+
+
+class _Audit:
+    """Statements recorded during one scope."""
+
+    __slots__ = ("label", "total", "templates", "identical", "depth")
+
+    def __init__(self, label: str, depth: int) -> None:
+        self.label = label
+        self.depth = depth
+        self.total = 0
+        # normalized name -> [count, stack of the first call, paged]
+        self.templates: Dict[str, list] = {}
+        # (template name, params) -> [count, stack of the first call, stack of the first repeat]
+        self.identical: Dict[tuple, list] = {}
+
+    def record(self, template, params) -> None:
+        self.total += 1
+        name = _normalize(template.name)
+        site = None
+        entry = self.templates.get(name)
+        if entry is None:
+            site = _call_site(self.depth)
+            self.templates[name] = [1, site, template.paged]
+        else:
+            entry[0] += 1
+
+        if isinstance(params, str) or template.paged:
+            return  # executemany passes a row-count summary, not parameters
+        key = (template.name, repr(params))
+        seen = self.identical.get(key)
+        if seen is None:
+            self.identical[key] = [1, site or _call_site(self.depth), None]
+        else:
+            seen[0] += 1
+            if seen[2] is None:
+                seen[2] = _call_site(self.depth)
+
+    def findings(self, max_per_template: int) -> List[dict]:
+        out = []
+        for name, (count, stack, paged) in self.templates.items():
+            if count > max_per_template and not paged:
+                out.append({"kind": "n+1", "template": name, "count": count,
+                            "limit": max_per_template, "stack": stack})
+        for (name, params), (count, first, again) in self.identical.items():
+            if count > 1:
+                out.append({"kind": "repeated", "template": name, "count": count,
+                            "params": params, "stack": first, "again": again})
+        return out
+
+    def report(self, findings: List[dict]) -> str:
+        lines = [
+            f"query audit: {self.label}: {self.total} queries, "
+            f"{len(self.templates)} templates, {len(findings)} finding(s)"
+        ]
+        for f in findings:
+            if f["kind"] == "n+1":
+                lines.append(f"  n+1       {f['template']} ran {f['count']} times (limit {f['limit']})")
+                lines.extend(_stack_lines("first", f["stack"]))
+            else:
+                lines.append(f"  repeated  {f['template']} ran {f['count']} times with params {f['params']}")
+                lines.extend(_stack_lines("first", f["stack"]))
+                lines.extend(_stack_lines("again", f["again"]))
+        return "\n".join(lines)
+
+
+def _stack_lines(tag: str, stack: List[str]) -> List[str]:
+    if not stack:
+        return [f"      {tag:<5}  <no application frames>"]
+    return [f"      {tag if i == 0 else '':<5}  {site}" for i, site in enumerate(stack)]
+
+
+class _Scope:
+    __slots__ = ("label", "audit")
+
+    def __init__(self, label: str) -> None:
+        self.label = label
+        self.audit = None
+
+    def __enter__(self) -> Optional[_Audit]:
+        if QueryAudit.enabled:
+            self.audit = QueryAudit.begin(self.label)
+        return self.audit
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.audit is not None:
+            QueryAudit.end()
+
+
+class QueryAudit:
+    """Process-wide audit settings plus the per-thread open scope."""
+
+    enabled: bool = False
+    mode: str = "warn"
+    max_per_template: int = 5
+    stack_depth: int = 6
+
+    _config: dict = None  # config dict last applied by configure()
+    _forced_mode: Optional[str] = None  # --audit-queries, survives reloads
+    _local = threading.local()
+
+    @classmethod
+    def configure(cls, cfg: dict, mode: Optional[str] = None) -> None:
+        """
+        Read cfg["database"]["query_audit"]. A mode given here (from the
+        command line) turns auditing on regardless of the config.
+        """
+        if mode is not None:
+            cls._forced_mode = mode
+        cls._config = cfg
+        qcfg = (cfg or {}).get("database", {}).get("query_audit", {})
+        cls.enabled = cls._forced_mode is not None or bool(qcfg.get("enabled", False))
+        cls.mode = cls._forced_mode or qcfg.get("mode", "warn")
+        cls.max_per_template = int(qcfg.get("max_per_template", 5))
+        cls.stack_depth = int(qcfg.get("stack_depth", 6))
+
+    @classmethod
+    def scope(cls, label: str) -> _Scope:
+        """Context manager auditing this thread's queries; yields the _Audit or None."""
+        return _Scope(label)
+
+    @classmethod
+    def begin(cls, label: str) -> _Audit:
+        cls._local.audit = _Audit(label, cls.stack_depth)
+        return cls._local.audit
+
+    @classmethod
+    def end(cls) -> Optional[_Audit]:
+        audit = getattr(cls._local, "audit", None)
+        cls._local.audit = None
+        return audit
+
+    @classmethod
+    def record(cls, template, params) -> None:
+        audit = getattr(cls._local, "audit", None)
+        if audit is not None:
+            audit.record(template, params)
+
+    @classmethod
+    def check(cls, audit: Optional[_Audit]) -> Optional[str]:
+        """The report for a finished audit, or None when it found nothing."""
+        if audit is None:
+            return None
+        findings = audit.findings(cls.max_per_template)
+        return audit.report(findings) if findings else None
+
+
+def _on_config_reload(source, changed, doc):
+    if source == "config" and doc is QueryAudit._config \
+            and any(k.startswith("database.query_audit") for k in changed):
+        QueryAudit.configure(doc)
+
+
+CONFIG.subscribe(_on_config_reload)
@@ -0,0 +1,131 @@
+"""
+Registry of named SQL templates used by the DAOs.
+
+Each statement is built once (at import time, or once per variant for
+statements with optional clauses) and executed through DB.execute, which
+keeps one cursor per template per pooled connection. That lets
+server-side prepared statements be reused across calls, and gives every
+template its own call count and latency counters.
+"""
+
+import threading
+from typing import Callable, Dict, Hashable, List
+
+from .instrumentation import LatencyHistogram
+
+
+class QueryTemplate:
+    """A named SQL statement plus its execution counters."""
+
+    __slots__ = (
+        "name", "sql", "prepared", "paged", "calls", "total_seconds", "max_seconds",
+        "histogram", "_lock",
+    )
+
+    def __init__(self, name: str, sql: str, prepared: bool = True, paged: bool = False) -> None:
+        self.name = name
+        self.sql = sql
+        # executemany/DDL templates should use a plain cursor
+        self.prepared = prepared
+        # run once per page/chunk by design: exempt from the query audit's n+1 rule
+        self.paged = paged
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.histogram = LatencyHistogram()
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.total_seconds += seconds
+            if seconds > self.max_seconds:
+                self.max_seconds = seconds
+        self.histogram.record(seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls = 0
+            self.total_seconds = 0.0
+            self.max_seconds = 0.0
+        self.histogram.reset()
+
+    def __repr__(self) -> str:
+        return f"QueryTemplate({self.name!r})"
+
+
+class QueryRegistry:
+    """Holds every QueryTemplate by name."""
+
+    def __init__(self) -> None:
+        self._templates: Dict[str, QueryTemplate] = {}
+        self._lock = threading.Lock()
+
+    def register(
+        self, name: str, sql: str, prepared: bool = True, paged: bool = False
+    ) -> QueryTemplate:
+        """
+        Register a template once. Registering the same name again returns
+        the existing template (modules may be re-imported).
+
+        paged=True marks a statement that runs once per keyset page or IN
+        chunk of a single logical read or write (see query_audit).
+        """
+        with self._lock:
+            tpl = self._templates.get(name)
+            if tpl is None:
+                tpl = QueryTemplate(name, " ".join(sql.split()), prepared=prepared, paged=paged)
+                self._templates[name] = tpl
+            return tpl
+
+    def variant(
+        self,
+        name: str,
+        key: Hashable,
+        builder: Callable[[], str],
+        prepared: bool = True,
+        paged: bool = False,
+    ) -> QueryTemplate:
+        """
+        Return the template for one variant of a statement, e.g. a list
+        query with or without a search filter. builder() runs only the
+        first time a given key is seen.
+        """
+        full_name = f"{name}[{key}]" if key not in (None, "") else name
+        tpl = self._templates.get(full_name)
+        if tpl is not None:
+            return tpl
+        return self.register(full_name, builder(), prepared=prepared, paged=paged)
+
+    def get(self, name: str) -> QueryTemplate:
+        return self._templates[name]
+
+    def all(self) -> List[QueryTemplate]:
+        with self._lock:
+            return list(self._templates.values())
+
+    def stats(self) -> List[Dict]:
+        """Per-template call counts and latency, busiest first."""
+        out = []
+        for tpl in self.all():
+            if not tpl.calls:
+                continue
+            out.append({
+                "template": tpl.name,
+                "calls": tpl.calls,
+                "total_ms": tpl.total_seconds * 1000.0,
+                "avg_ms": tpl.total_seconds * 1000.0 / tpl.calls,
+                "p50_ms": tpl.histogram.percentile(50) * 1000.0,
+                "p95_ms": tpl.histogram.percentile(95) * 1000.0,
+                "p99_ms": tpl.histogram.percentile(99) * 1000.0,
+                "max_ms": tpl.max_seconds * 1000.0,
+            })
+        out.sort(key=lambda r: r["total_ms"], reverse=True)
+        return out
+
+    def reset_stats(self) -> None:
+        for tpl in self.all():
+            tpl.reset()
+
+
+QUERIES = QueryRegistry()
@@ -0,0 +1,177 @@
+"""
+Supporting tables created on demand by the data layer.
+
+The core schema (campaign, channel, campaign_channel_xref,
+campaign_daily_metrics) is built by the SQL scripts in database/mysql.
+Tables that only back optional features, or that are derived from the
+core tables, are declared here and created with CREATE TABLE IF NOT
+EXISTS the first time a DAO needs them; derived tables are filled from
+the core tables at the same step (BACKFILL).
+"""
+
+import threading
+
+from .db import DB
+from .query_registry import QUERIES
+
+
+SUPPORT_TABLES = {
+    # Idempotency keys for replay-safe metric increments
+    "metrics_idempotency_key": """
+        CREATE TABLE IF NOT EXISTS metrics_idempotency_key (
+            idempotency_key VARCHAR(191) NOT NULL PRIMARY KEY,
+            rows_applied    INT NOT NULL DEFAULT 0,
+            applied_at      TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    # Running per-campaign totals of campaign_daily_metrics, maintained by
+    # every metrics write; filled from the daily rows when created (BACKFILL).
+    # db:purge leaves them alone: they equal the daily rows plus
+    # campaign_purged_metrics
+    "campaign_lifetime_metrics": """
+        CREATE TABLE IF NOT EXISTS campaign_lifetime_metrics (
+            campaign_id   INT NOT NULL PRIMARY KEY,
+            impressions   BIGINT NOT NULL DEFAULT 0,
+            clicks        BIGINT NOT NULL DEFAULT 0,
+            spend_cents   BIGINT NOT NULL DEFAULT 0,
+            revenue_cents BIGINT NOT NULL DEFAULT 0,
+            CONSTRAINT fk_campaign_lifetime_metrics_campaign
+                FOREIGN KEY (campaign_id) REFERENCES campaign (campaign_id)
+                ON DELETE CASCADE
+        )
+    """,
+    # Per-campaign sums of the daily rows db:purge removed (either mode), so
+    # the lifetime totals can still be checked against the daily rows
+    "campaign_purged_metrics": """
+        CREATE TABLE IF NOT EXISTS campaign_purged_metrics (
+            campaign_id   INT NOT NULL PRIMARY KEY,
+            impressions   BIGINT NOT NULL DEFAULT 0,
+            clicks        BIGINT NOT NULL DEFAULT 0,
+            spend_cents   BIGINT NOT NULL DEFAULT 0,
+            revenue_cents BIGINT NOT NULL DEFAULT 0,
+            CONSTRAINT fk_campaign_purged_metrics_campaign
+                FOREIGN KEY (campaign_id) REFERENCES campaign (campaign_id)
+                ON DELETE CASCADE
+        )
+    """,
+    # Rows moved out by db:purge in archive mode. No foreign keys: the
+    # archived rows outlive the campaigns they belonged to.
+    "campaign_archive": """
+        CREATE TABLE IF NOT EXISTS campaign_archive (
+            campaign_id  INT NOT NULL PRIMARY KEY,
+            name         VARCHAR(255) NOT NULL,
+            start_date   DATE,
+            end_date     DATE,
+            status       VARCHAR(16) NOT NULL,
+            budget_cents BIGINT NOT NULL DEFAULT 0,
+            created_at   TIMESTAMP NULL,
+            archived_at  TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    "campaign_channel_xref_archive": """
+        CREATE TABLE IF NOT EXISTS campaign_channel_xref_archive (
+            campaign_id INT NOT NULL,
+            channel_id  INT NOT NULL,
+            archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (campaign_id, channel_id)
+        )
+    """,
+    "campaign_daily_metrics_archive": """
+        CREATE TABLE IF NOT EXISTS campaign_daily_metrics_archive (
+            campaign_id   INT NOT NULL,
+            metric_date   DATE NOT NULL,
+            impressions   INT DEFAULT 0,
+            clicks        INT DEFAULT 0,
+            spend_cents   BIGINT DEFAULT 0,
+            revenue_cents BIGINT DEFAULT 0,
+            archived_at   TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (campaign_id, metric_date)
+        )
+    """,
+    # Last committed key of each db:purge job, written with every chunk
+    "purge_checkpoint": """
+        CREATE TABLE IF NOT EXISTS purge_checkpoint (
+            job              VARCHAR(32) NOT NULL PRIMARY KEY,
+            cutoff           DATE NOT NULL,
+            mode             VARCHAR(16) NOT NULL,
+            last_campaign_id INT NOT NULL DEFAULT 0,
+            last_date        DATE NULL,
+            done             BIGINT NOT NULL DEFAULT 0,
+            updated_at       TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+}
+
+# Statements that fill a supporting table from the core tables. ensure_table
+# runs one whenever it finds its table empty (just created, or created
+# empty by an older version). A row another process's writer added after
+# the CREATE holds only that writer's delta, so the backfill overwrites it
+# with the full sum of the daily (and purged) rows. INSERT ... SELECT
+# share-locks the daily rows it reads: a write still in flight either
+# commits first (its daily row is in the sum) or waits and adds its delta
+# on top.
+BACKFILL = {
+    "campaign_lifetime_metrics": """
+        INSERT INTO campaign_lifetime_metrics (
+            campaign_id, impressions, clicks, spend_cents, revenue_cents
+        )
+        SELECT campaign_id,
+               COALESCE(SUM(impressions), 0), COALESCE(SUM(clicks), 0),
+               COALESCE(SUM(spend_cents), 0), COALESCE(SUM(revenue_cents), 0)
+        FROM (
+            SELECT campaign_id, impressions, clicks, spend_cents, revenue_cents
+            FROM campaign_daily_metrics
+            UNION ALL
+            SELECT campaign_id, impressions, clicks, spend_cents, revenue_cents
+            FROM campaign_purged_metrics
+        ) m
+        GROUP BY campaign_id
+        ON DUPLICATE KEY UPDATE
+          impressions = VALUES(impressions),
+          clicks      = VALUES(clicks),
+          spend_cents = VALUES(spend_cents),
+          revenue_cents = VALUES(revenue_cents)
+    """,
+}
+
+# Tables a BACKFILL statement reads besides the core tables
+BACKFILL_REQUIRES = {
+    "campaign_lifetime_metrics": ("campaign_purged_metrics",),
+}
+
+_ensured: set = set()
+_lock = threading.Lock()
+
+
+def ensure_table(name: str) -> None:
+    """Create a supporting table once per process (DDL commits implicitly)."""
+    if name in _ensured:
+        return
+    for required in BACKFILL_REQUIRES.get(name, ()):
+        ensure_table(required)
+    with _lock:
+        if name in _ensured:
+            return
+        ddl = QUERIES.register(f"schema.{name}", SUPPORT_TABLES[name], prepared=False)
+        conn = DB.get_connection()
+        try:
+            DB.execute(conn, ddl)
+            conn.commit()
+            if name in BACKFILL:
+                _backfill(conn, name)
+        finally:
+            conn.close()
+        _ensured.add(name)
+
+
+def _backfill(conn, name: str) -> None:
+    probe = QUERIES.register(f"schema.{name}.probe", f"SELECT 1 FROM {name} LIMIT 1")
+    cur = DB.execute(conn, probe)
+    if cur.fetchall():
+        return
+    try:
+        DB.execute(conn, QUERIES.register(f"schema.{name}.backfill", BACKFILL[name]))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
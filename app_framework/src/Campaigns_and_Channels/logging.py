@@ -1,82 +1,253 @@
-"""Provides LoggingService convenience class for application logging."""
+"""Provides LoggingService convenience class for application logging.
 
+Records are not written on the calling thread. Each logger gets a
+QueueHandler that puts the record, still unformatted, on one bounded
+queue; a single QueueListener thread formats it and writes it to the
+console and the logger's rotating file. Settings (app_settings.json):
+
+    log_queue_size         queue capacity (default 10000)
+    log_queue_policy       'drop'  - when full, drop debug/info records and
+                                     wait up to log_queue_block_ms for
+                                     warnings and above (default)
+                           'block' - every record waits up to
+                                     log_queue_block_ms (backpressure)
+    log_queue_block_ms     longest a caller waits for room (default 100)
+    log_debug_sample_rate  fraction of log_debug_sampled() calls kept
+                           (default 1.0; hot-reloadable)
+
+Pass values as arguments (log_debug('took %s ms', ms)) so the string is
+only built on the writer thread, and only if the level is enabled.
+"""
+
+import atexit
 import logging
 import logging.handlers
+import queue
+import threading
+import weakref
+from .config import CONFIG
+from .sampling import RateSampler
 from .settings import Settings
 import os
 
+# settings log_level -> logging level (unknown names log errors only)
+_LEVELS = {
+    'notset': logging.NOTSET,
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+    'critical': logging.CRITICAL,
+}
+
+# Live LoggingService instances, re-leveled when app_settings.json changes
+_services = weakref.WeakSet()
+
+
+def _on_settings_reload(source, changed, doc):
+    if source == 'settings' and 'log_level' in changed:
+        for service in list(_services):
+            service.set_level(doc['log_level'])
+
+
+class _Router(logging.Handler):
+    """Runs on the writer thread: hands each record to its logger's handlers."""
+
+    def __init__(self)->None:
+        super().__init__()
+        self.targets = {}
+
+    def handle(self, record):
+        for key in record.log_targets:
+            handler = self.targets.get(key)
+            if handler is not None and record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+
+    def flush(self):
+        for handler in list(self.targets.values()):
+            handler.flush()
+
+    def close(self):
+        for handler in list(self.targets.values()):
+            handler.close()
+        super().close()
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # the queue may be full: wait for room instead of raising queue.Full
+        self.queue.put(self._sentinel)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records for the writer thread without formatting them."""
+
+    def __init__(self, pipeline:'_Pipeline', targets:tuple)->None:
+        super().__init__(pipeline.queue)
+        self.pipeline = pipeline
+        self.targets = targets
+
+    def prepare(self, record):
+        # Keep msg and args apart: getMessage() runs on the writer thread.
+        # Tracebacks are rendered now, while their frames are still valid.
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.log_targets = self.targets
+        return record
+
+    def enqueue(self, record):
+        self.pipeline.put(record)
+
+
+class _Pipeline:
+    """The process-wide queue, its writer thread and the shared handlers."""
+
+    def __init__(self, settings:dict)->None:
+        self.settings = settings
+        self.queue = queue.Queue(maxsize=max(1, int(settings.get('log_queue_size', 10000))))
+        self.formatter = \
+                logging.Formatter('%(levelname)s:%(name)s:%(asctime)s:%(message)s')
+        self.router = _Router()
+        self.listener = _Listener(self.queue, self.router)
+        self.dropped = 0
+        self.sampled_out = 0
+        self._lock = threading.Lock()
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def target(self, key:str, factory)->str:
+        """Register (once) the handler for key; returns key."""
+        with self._lock:
+            if key not in self.router.targets:
+                handler = factory()
+                handler.setLevel(logging.DEBUG)
+                handler.setFormatter(self.formatter)
+                self.router.targets[key] = handler
+        return key
+
+    def put(self, record)->None:
+        policy = self.settings.get('log_queue_policy', 'drop')
+        try:
+            if policy == 'drop' and record.levelno < logging.WARNING:
+                self.queue.put_nowait(record)
+            else:
+                self.queue.put(record, timeout=self.settings.get('log_queue_block_ms', 100) / 1000.0)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def count_sampled_out(self)->None:
+        with self._lock:
+            self.sampled_out += 1
+
+    def stats(self)->dict:
+        return {
+            'queued': self.queue.qsize(),
+            'capacity': self.queue.maxsize,
+            'dropped': self.dropped,
+            'sampled_out': self.sampled_out,
+        }
+
+    def stop(self)->None:
+        """Drain the queue and close the handlers (runs at exit)."""
+        if self.listener._thread is not None:
+            self.listener.stop()
+            if self.dropped:
+                record = logging.LogRecord('logging', logging.WARNING, __file__, 0,
+                            '%d log records dropped (queue full)', (self.dropped,), None)
+                record.log_targets = tuple(self.router.targets)
+                self.router.handle(record)
+            self.router.close()
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def _get_pipeline(settings:dict)->_Pipeline:
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = _Pipeline(settings)
+    return _pipeline
+
+
+def logging_stats()->dict:
+    """Queue depth and dropped/sampled-out counts of the logging pipeline."""
+    return _pipeline.stats() if _pipeline is not None else {}
+
+
 class LoggingService():
     """Provides logging services."""
 
     def __init__(self, class_name:str, logfile_prefix_name:str=None)->None:
         """Initialize instance."""
-        
+
         self._logger = logging.getLogger(class_name)
         self._logger.propagate = False
         self._settings_dict = Settings().read_settings_file_from_location()
         self._logfile_prefix_name = logfile_prefix_name
-        self.log_level = logging.ERROR
-        
-        if self._settings_dict['log_level'] == 'notset':
-            self._logger.setLevel(logging.NOTSET)
-            self.log_level = logging.NOTSET
-        elif self._settings_dict['log_level'] == 'debug':
-            self._logger.setLevel(logging.DEBUG)
-            self.log_level = logging.debug
-        elif self._settings_dict['log_level'] == 'info':
-            self._logger.setLevel(logging.INFO)
-            self.log_level = logging.INFO
-        elif self._settings_dict['log_level'] == 'warning':
-            self._logger.setLevel(logging.WARNING)
-            self.log_level = logging.WARNING
-        elif self._settings_dict['log_level'] == 'error':
-            self._logger.setLevel(logging.ERROR)
-            self.log_level = logging.ERROR
-        elif self._settings_dict['log_level'] == 'critical':
-            self._logger.setLevel(logging.CRITICAL)
-            self.log_level = logging.CRITICAL
-        else:
-            self._logger.setLevel(logging.ERROR)
-            self.log_level = logging.ERROR
-
-        self._formatter = \
-                logging.Formatter('%(levelname)s:%(name)s:%(asctime)s:%(message)s')
+        self.set_level(self._settings_dict['log_level'])
+        self._sampler = RateSampler()
+        _services.add(self)
 
         if not self._logger.handlers:
+            pipeline = _get_pipeline(self._settings_dict)
+            targets = []
             if self._settings_dict['log_to_console']:
-                self._ch = logging.StreamHandler()
-                self._ch.setLevel(logging.DEBUG)
-                self._ch.setFormatter(self._formatter)
-                self._logger.addHandler(self._ch)
+                targets.append(pipeline.target('console', logging.StreamHandler))
 
             if self._settings_dict['log_to_file']:
-                log_file = os.path.join(self._settings_dict['logs_dir'], 
+                log_file = os.path.join(self._settings_dict['logs_dir'],
                             f"{self._logfile_prefix_name}_" \
                             f"{self._settings_dict['log_filename']}")
-                self._fh = logging.handlers.TimedRotatingFileHandler(log_file, 
-                            when='midnight', backupCount=20)
-                self._fh.setLevel(logging.DEBUG)
-                self._fh.setFormatter(self._formatter)
-                self._logger.addHandler(self._fh)
-        
-
-    
-    def log_debug(self, message):
+                targets.append(pipeline.target(log_file,
+                            lambda: logging.handlers.TimedRotatingFileHandler(log_file,
+                                when='midnight', backupCount=20)))
+
+            if targets:
+                self._logger.addHandler(_QueueHandler(pipeline, tuple(targets)))
+
+
+
+    def set_level(self, name:str)->None:
+        """Set the logger level from a settings log_level name."""
+        self.log_level = _LEVELS.get(name, logging.ERROR)
+        self._logger.setLevel(self.log_level)
+
+    def log_debug(self, message, *args):
         """Log to debug."""
-        self._logger.debug(message)
+        self._logger.debug(message, *args)
+
+    def log_debug_sampled(self, message, *args):
+        """Log to debug, keeping only log_debug_sample_rate of calls (hot paths)."""
+        if not self._logger.isEnabledFor(logging.DEBUG):
+            return
+        if not self._sampler.sample(self._settings_dict.get('log_debug_sample_rate', 1.0)):
+            if _pipeline is not None:
+                _pipeline.count_sampled_out()
+            return
+        self._logger.debug(message, *args)
 
-    def log_error(self, message):
+    def log_error(self, message, *args):
         """Log to error."""
-        self._logger.error(message)
+        self._logger.error(message, *args)
 
-    def log_info(self, message):
+    def log_info(self, message, *args):
         """Log to info."""
-        self._logger.info(message)
+        self._logger.info(message, *args)
 
-    def log_warning(self, message):
+    def log_warning(self, message, *args):
         """Log to warning."""
-        self._logger.warning(message)
+        self._logger.warning(message, *args)
 
-    def log_critical(self, message):
+    def log_critical(self, message, *args):
         """Log to critical."""
-        self._logger.critical(message)
+        self._logger.critical(message, *args)
+
+
+CONFIG.subscribe(_on_settings_reload)
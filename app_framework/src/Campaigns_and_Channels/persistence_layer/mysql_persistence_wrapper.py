@@ -1,6 +1,7 @@
 """Defines the MySQLPersistenceWrapper class."""
 
 from ..application_base import ApplicationBase
+from ..data_layer.driver import driver_name, resolve_use_pure
 from mysql import connector
 from mysql.connector.pooling import (MySQLConnectionPool)
 import inspect
@@ -16,7 +17,7 @@ class MySQLPersistenceWrapper(ApplicationBase):
 		self.DATABASE = config["database"]
 		super().__init__(subclass_name=self.__class__.__name__, 
 				   logfile_prefix_name=self.META["log_prefix"])
-		self._logger.log_debug(f'{inspect.currentframe().f_code.co_name}:It works!')
+		self._logger.log_debug_sampled('%s:It works!', inspect.currentframe().f_code.co_name)
 
 		# Database Configuration Constants
 		self.DB_CONFIG = {}
@@ -26,7 +27,7 @@ class MySQLPersistenceWrapper(ApplicationBase):
 		self.DB_CONFIG['host'] = self.DATABASE["connection"]["config"]["host"]
 		self.DB_CONFIG['port'] = self.DATABASE["connection"]["config"]["port"]
 
-		self._logger.log_debug(f'{inspect.currentframe().f_code.co_name}: DB Connection Config Dict: {self.DB_CONFIG}')
+		self._logger.log_debug_sampled('%s: DB Connection Config Dict: %s', inspect.currentframe().f_code.co_name, self.DB_CONFIG)
 
 		# Database Connection
 		self._connection_pool = \
@@ -50,14 +51,15 @@ class MySQLPersistenceWrapper(ApplicationBase):
 	def _initialize_database_connection_pool(self, config:dict)->MySQLConnectionPool:
 		"""Initializes database connection pool."""
 		try:
-			self._logger.log_debug(f'Creating connection pool...')
+			use_pure = resolve_use_pure(self.DATABASE)
+			self._logger.log_debug_sampled('Creating connection pool (driver=%s, use_pure=%s)...', driver_name(self.DATABASE), use_pure)
 			cnx_pool = \
 				MySQLConnectionPool(pool_name = self.DATABASE["pool"]["name"],
 					pool_size=self.DATABASE["pool"]["size"],
 					pool_reset_session=self.DATABASE["pool"]["reset_session"],
-					use_pure=self.DATABASE["pool"]["use_pure"],
+					use_pure=use_pure,
 					**config)
-			self._logger.log_debug(f'{inspect.currentframe().f_code.co_name}: Connection pool successfully created!')
+			self._logger.log_debug_sampled('%s: Connection pool successfully created!', inspect.currentframe().f_code.co_name)
 			return cnx_pool
 		except connector.Error as err:
 			self._logger.log_error(f'{inspect.currentframe().f_code.co_name}: Problem creating connection pool: {err}')
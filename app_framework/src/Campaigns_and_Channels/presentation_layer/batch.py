@@ -0,0 +1,246 @@
+"""
+Non-interactive command execution for main.py --script / --exec.
+
+Commands are the same lines the REPL accepts. Each one produces a JSON
+result line on stdout (NDJSON) instead of message boxes:
+
+    {"index": 0, "command": "...", "ok": true, "elapsed_ms": 1.9,
+     "messages": [{"level": "success", "message": "..."}], "output": "..."}
+
+followed by one {"summary": {...}} line. "output" holds whatever the
+command printed (listings, reports), in the --format chosen for the run.
+
+Modes:
+  - transactional: every command runs inside one DB.unit_of_work(); the
+    first failing command rolls back the whole batch.
+  - parallel N: independent commands run on N threads (capped at the DB
+    pool size); results are still emitted in input order.
+"""
+
+import io
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ..data_layer.db import DB
+from ..data_layer.schema import SUPPORT_TABLES, ensure_table
+from .user_interface import UserInterface
+
+
+def split_commands(text: str) -> list[str]:
+    """
+    Split text into commands on newlines and ';' outside quotes.
+    Blank lines and lines starting with '#' are skipped.
+    """
+    commands, current, quote = [], [], None
+    for ch in text:
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in ("'", '"'):
+            quote = ch
+        elif ch in (";", "\n"):
+            commands.append("".join(current))
+            current = []
+            continue
+        current.append(ch)
+    commands.append("".join(current))
+    return [c.strip() for c in commands if c.strip() and not c.strip().startswith("#")]
+
+
+def read_script(path: str) -> list[str]:
+    """Commands from a script file ('-' reads stdin)."""
+    if path == "-":
+        return split_commands(sys.stdin.read())
+    with open(path, "r") as f:
+        return split_commands(f.read())
+
+
+class _ThreadOutput(io.TextIOBase):
+    """sys.stdout stand-in that sends each thread's writes to its own buffer."""
+
+    def __init__(self, fallback) -> None:
+        self._fallback = fallback
+        self._local = threading.local()
+
+    def write(self, s: str) -> int:
+        buf = getattr(self._local, "buf", None)
+        (buf if buf is not None else self._fallback).write(s)
+        return len(s)
+
+    def flush(self) -> None:
+        self._fallback.flush()
+
+    def begin(self) -> None:
+        self._local.buf = io.StringIO()
+
+    def end(self) -> str:
+        text = self._local.buf.getvalue()
+        self._local.buf = None
+        return text
+
+
+class BatchUserInterface(UserInterface):
+    """UserInterface that records messages per command instead of drawing boxes."""
+
+    _current = threading.local()
+
+    def _record(self, level: str, msg: str) -> None:
+        messages = getattr(self._current, "messages", None)
+        if messages is not None:
+            messages.append({"level": level, "message": msg})
+
+    def print_error(self, msg: str):
+        self._record("error", msg)
+
+    def print_success(self, msg: str):
+        self._record("success", msg)
+
+    def print_info(self, msg: str):
+        self._record("info", msg)
+
+    def run_command(self, index: int, line: str, output: _ThreadOutput) -> dict:
+        """Run one command line and return its result record."""
+        self._current.messages = []
+        output.begin()
+        started = time.perf_counter()
+        try:
+            self.handle(line)
+        finally:
+            elapsed = time.perf_counter() - started
+            text = output.end()
+            messages = self._current.messages
+            self._current.messages = None
+
+        return {
+            "index": index,
+            "command": line,
+            "ok": not any(m["level"] == "error" for m in messages),
+            "elapsed_ms": round(elapsed * 1000.0, 3),
+            "messages": messages,
+            "output": text,
+        }
+
+
+class _Abort(Exception):
+    """A command failed inside a transactional batch."""
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        ui: BatchUserInterface,
+        transactional: bool = False,
+        parallel: int = 1,
+        stop_on_error: bool = False,
+        out=None,
+    ) -> None:
+        if transactional and parallel > 1:
+            raise ValueError("a transactional batch cannot run in parallel")
+        pool_size = ui.config.get("database", {}).get("pool", {}).get("size", parallel)
+        self.ui = ui
+        self.transactional = transactional
+        self.parallel = max(1, min(parallel, pool_size))
+        self.stop_on_error = stop_on_error or transactional
+        self.out = out or sys.stdout
+
+    def _emit(self, record: dict) -> None:
+        self.out.write(json.dumps(record, default=str) + "\n")
+
+    def run(self, commands: list[str]) -> dict:
+        """Run commands, streaming one JSON line per result; returns the summary."""
+        real_stdout = sys.stdout
+        output = _ThreadOutput(real_stdout)
+        sys.stdout = output
+        started = time.perf_counter()
+        results = []
+        transaction = None
+        try:
+            if self.transactional:
+                transaction = self._run_transactional(commands, output, results)
+            elif self.parallel > 1:
+                self._run_parallel(commands, output, results)
+            else:
+                self._run_sequential(commands, output, results)
+            if transaction is None:
+                self.ui.svc.flush_metrics()
+        finally:
+            sys.stdout = real_stdout
+
+        failed = sum(1 for r in results if not r["ok"])
+        summary = {
+            "commands": len(commands),
+            "ok": len(results) - failed,
+            "failed": failed,
+            "skipped": len(commands) - len(results),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000.0, 3),
+            "parallel": self.parallel,
+            "transaction": transaction,
+        }
+        self._emit({"summary": summary})
+        self.out.flush()
+        return summary
+
+    def _run_sequential(self, commands, output, results) -> None:
+        for i, line in enumerate(commands):
+            if line in ("quit", "exit"):
+                break
+            r = self.ui.run_command(i, line, output)
+            results.append(r)
+            self._emit(r)
+            if not r["ok"] and self.stop_on_error:
+                break
+
+    def _run_transactional(self, commands, output, results) -> str:
+        # DDL would commit the unit implicitly: create support tables up front
+        for name in SUPPORT_TABLES:
+            ensure_table(name)
+        try:
+            with DB.unit_of_work():
+                self._run_sequential(commands, output, results)
+                if any(not r["ok"] for r in results):
+                    raise _Abort()
+                # buffered metrics must land inside the unit too
+                self.ui.svc.flush_metrics()
+        except _Abort:
+            return "rolled_back"
+        return "committed"
+
+    def _run_parallel(self, commands, output, results) -> None:
+        failed = threading.Event()
+
+        def run(item):
+            i, line = item
+            if self.stop_on_error and failed.is_set():
+                return None
+            r = self.ui.run_command(i, line, output)
+            if not r["ok"]:
+                failed.set()
+            return r
+
+        with ThreadPoolExecutor(max_workers=self.parallel) as pool:
+            for r in pool.map(run, enumerate(commands)):
+                if r is not None:
+                    results.append(r)
+                    self._emit(r)
+
+
+def run_batch(
+    config: dict,
+    commands: list[str],
+    transactional: bool = False,
+    parallel: int = 1,
+    stop_on_error: bool = False,
+    output_format: str = "table",
+    trace: bool = False,
+    profiler=None,
+) -> int:
+    """Entry point for main.py; returns the process exit status."""
+    ui = BatchUserInterface(config, output_format, trace=trace, profiler=profiler)
+    try:
+        summary = BatchRunner(ui, transactional, parallel, stop_on_error).run(commands)
+    finally:
+        ui.svc.close()
+    return 0 if summary["failed"] == 0 and summary["transaction"] != "rolled_back" else 1
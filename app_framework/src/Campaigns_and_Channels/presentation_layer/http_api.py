@@ -0,0 +1,528 @@
+"""
+HTTP/JSON API over CampaignService (main.py --serve).
+
+Endpoints (JSON bodies in and out):
+
+    GET    /health
+    GET    /campaigns?limit=&offset=&q=&include_channels=1
+    GET    /campaigns?ids=1,2,3              batched lookup; unknown ids listed in "missing"
+    POST   /campaigns                       {name, start_date, end_date, budget_cents}
+    GET    /campaigns/{id}?detail=1         detail=1 adds channels and all-time performance
+    PATCH  /campaigns/{id}                  {name, start_date, end_date, budget_cents, status}
+    DELETE /campaigns/{id}?force=1
+    GET    /campaigns/{id}/channels
+    PUT    /campaigns/{id}/channels/{channel_id}      link
+    DELETE /campaigns/{id}/channels/{channel_id}      unlink
+    GET    /campaigns/{id}/performance?start=&end=
+    GET    /performance/compare?start=&end=&ids=&prior_start=
+                                            this vs the prior period; all campaigns without ids
+    POST   /campaigns/{id}/metrics          {date, impressions, clicks, spend_cents,
+                                             revenue_cents, mode: upsert|increment,
+                                             idempotency_key (<= 191 chars)}
+    GET    /channels?limit=&offset=
+    POST   /channels                        {name, type}
+    PATCH  /channels/{id}                   {name, type}
+    GET    /channels/{id}/campaigns?after=&limit=
+                                            pages by campaign_id; pass "next_after" as after
+    DELETE /channels/{id}?force=1
+    GET    /stats/db
+
+Serving model:
+  - requests run on a fixed worker pool sized to the DB connection pool
+    (config["http"]["workers"] overrides), so load queues in the listen
+    backlog instead of failing with pool-exhausted errors
+  - HTTP/1.1 keep-alive; idle connections are dropped after
+    config["http"]["keepalive_timeout"] seconds (default 5) so they do not
+    pin workers
+  - every response carries Server-Timing (db, app, total), X-Response-Time-ms
+    and X-DB-Queries
+  - GET endpoints send a weak ETag derived from the service's change
+    counters (not from the data), so If-None-Match is answered with 304
+    before any query runs. Writes made through other processes are not
+    seen by the counters; the ETag also rolls over every
+    config["http"]["etag_ttl_seconds"] (default 5) to bound that staleness.
+
+Runs against whatever pool DB holds, so it can be exercised locally with
+the benchmarks SQLite stand-in (see make_server).
+"""
+
+import hashlib
+import json
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from .. import tracing
+from ..data_layer.db import DB
+from ..data_layer.instrumentation import DBStats
+from ..data_layer.query_audit import QueryAudit
+from ..service_layer.campaign_service import CampaignService
+from .output import json_default
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str, **extra) -> None:
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+
+class Request:
+    __slots__ = ("method", "path", "params", "query", "body")
+
+    def __init__(self, method, path, params, query, body) -> None:
+        self.method = method
+        self.path = path
+        self.params = params
+        self.query = query
+        self.body = body
+
+    def arg(self, name: str, default=None, cast=str):
+        """Query-string value, converted with cast (400 on bad input)."""
+        if name not in self.query:
+            return default
+        try:
+            return cast(self.query[name])
+        except ValueError:
+            raise HttpError(400, f"invalid value for '{name}'")
+
+    def field(self, name: str, default=None, cast=None, required: bool = False):
+        """JSON body value, converted with cast (400 on bad input)."""
+        if name not in self.body or self.body[name] is None:
+            if required:
+                raise HttpError(400, f"'{name}' is required")
+            return default
+        value = self.body[name]
+        try:
+            return cast(value) if cast is not None else value
+        except (TypeError, ValueError):
+            raise HttpError(400, f"invalid value for '{name}'")
+
+
+def _date(value) -> date:
+    return date.fromisoformat(str(value))
+
+
+def _flag(value) -> bool:
+    return str(value).lower() in ("1", "true", "yes")
+
+
+def _ids(value) -> list:
+    ids = [int(v) for v in str(value).split(",") if v.strip()]
+    if len(ids) > 1000:
+        raise ValueError("too many ids")
+    return ids
+
+
+def _campaign_resources(query: dict) -> tuple:
+    # ?detail=1 adds the campaign's channels and lifetime KPIs
+    if _flag(query.get("detail", "")):
+        return ("campaigns", "links", "channels", "metrics")
+    return ("campaigns",)
+
+
+class Api:
+    """Routes requests to CampaignService; independent of the HTTP plumbing."""
+
+    def __init__(self, svc: CampaignService, etag_ttl_seconds: float = 5.0) -> None:
+        self.svc = svc
+        self.etag_ttl_seconds = etag_ttl_seconds
+        # (method, pattern, handler, resources the response depends on -> ETag);
+        # resources may be a callable(query) for responses shaped by the query
+        routes = [
+            ("GET", r"/health", self.health, None),
+            ("GET", r"/campaigns", self.list_campaigns, ("campaigns", "links", "channels")),
+            ("POST", r"/campaigns", self.create_campaign, None),
+            ("GET", r"/campaigns/(\d+)", self.get_campaign, _campaign_resources),
+            ("PATCH", r"/campaigns/(\d+)", self.update_campaign, None),
+            ("DELETE", r"/campaigns/(\d+)", self.delete_campaign, None),
+            ("GET", r"/campaigns/(\d+)/channels", self.campaign_channels, ("campaigns", "links", "channels")),
+            ("PUT", r"/campaigns/(\d+)/channels/(\d+)", self.link, None),
+            ("DELETE", r"/campaigns/(\d+)/channels/(\d+)", self.unlink, None),
+            ("GET", r"/campaigns/(\d+)/performance", self.performance, ("campaigns", "metrics")),
+            ("POST", r"/campaigns/(\d+)/metrics", self.write_metrics, None),
+            ("GET", r"/performance/compare", self.compare_performance, ("campaigns", "metrics")),
+            ("GET", r"/channels", self.list_channels, ("channels",)),
+            ("POST", r"/channels", self.create_channel, None),
+            ("PATCH", r"/channels/(\d+)", self.update_channel, None),
+            ("GET", r"/channels/(\d+)/campaigns", self.channel_campaigns, ("campaigns", "links", "channels")),
+            ("DELETE", r"/channels/(\d+)", self.delete_channel, None),
+            ("GET", r"/stats/db", self.db_stats, None),
+        ]
+        self.routes = [(m, re.compile(p + r"/?$"), h, r) for m, p, h, r in routes]
+
+    # ---------------------------------------------------------- #
+    # DISPATCH
+    # ---------------------------------------------------------- #
+    def etag(self, resources: tuple, path: str, query: str) -> str:
+        bucket = int(time.time() // self.etag_ttl_seconds) if self.etag_ttl_seconds > 0 else 0
+        key = f"{path}?{query}|{self.svc.data_version(*resources)}|{bucket}"
+        return 'W/"' + hashlib.sha1(key.encode()).hexdigest()[:20] + '"'
+
+    def handle(self, method: str, target: str, if_none_match: str, body: bytes):
+        """Returns (status, json_body_or_None, extra_headers)."""
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+        allowed = []
+        for m, pattern, handler, resources in self.routes:
+            match = pattern.match(path)
+            if not match:
+                continue
+            if m != method and not (method == "HEAD" and m == "GET"):
+                allowed.append(m)
+                continue
+
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            if callable(resources):
+                resources = resources(query)
+            headers = {}
+            if resources is not None:
+                tag = self.etag(resources, path, url.query)
+                headers["ETag"] = tag
+                headers["Cache-Control"] = "no-cache"
+                if if_none_match and tag in (t.strip() for t in if_none_match.split(",")):
+                    return 304, None, headers
+
+            try:
+                payload = json.loads(body) if body else {}
+            except ValueError:
+                raise HttpError(400, "request body must be JSON")
+            if not isinstance(payload, dict):
+                raise HttpError(400, "request body must be a JSON object")
+            req = Request(method, path, [int(g) for g in match.groups()], query, payload)
+            status, result = handler(req)
+            if status >= 400:
+                headers.pop("ETag", None)
+            return status, result, headers
+
+        if allowed:
+            raise HttpError(405, f"method {method} not allowed", allow=", ".join(sorted(set(allowed))))
+        raise HttpError(404, f"no route for {path}")
+
+    # ---------------------------------------------------------- #
+    # HANDLERS
+    # ---------------------------------------------------------- #
+    def health(self, req):  # noqa: ARG002
+        return 200, {"status": "ok"}
+
+    def list_campaigns(self, req):
+        ids = req.arg("ids", None, _ids)
+        if ids is not None:
+            found = self.svc.get_campaigns(ids)
+            return 200, {
+                "campaigns": [c for c in found.values() if c is not None],
+                "missing": [cid for cid, c in found.items() if c is None],
+            }
+        limit = min(req.arg("limit", 50, int), 1000)
+        items = self.svc.list_campaigns(
+            limit=limit,
+            offset=req.arg("offset", 0, int),
+            q=req.arg("q"),
+            include_channels=req.arg("include_channels", False, _flag),
+        )
+        return 200, {"campaigns": items}
+
+    def create_campaign(self, req):
+        cid = self.svc.create_campaign(
+            req.field("name", required=True, cast=str),
+            req.field("start_date", cast=_date),
+            req.field("end_date", cast=_date),
+            req.field("budget_cents", 0, cast=int),
+        )
+        return 201, {"campaign_id": cid}
+
+    def _campaign_or_404(self, cid: int) -> dict:
+        campaign = self.svc.get_campaign(cid)
+        if not campaign:
+            raise HttpError(404, f"campaign {cid} not found")
+        return campaign
+
+    def get_campaign(self, req):
+        if req.arg("detail", False, _flag):
+            detail = self.svc.get_campaign_detail(req.params[0])
+            if not detail:
+                raise HttpError(404, f"campaign {req.params[0]} not found")
+            return 200, detail
+        return 200, self._campaign_or_404(req.params[0])
+
+    def update_campaign(self, req):
+        cid = req.params[0]
+        updated = self.svc.update_campaign(
+            cid,
+            name=req.field("name", cast=str),
+            start_date=req.field("start_date", cast=_date),
+            end_date=req.field("end_date", cast=_date),
+            budget_cents=req.field("budget_cents", cast=int),
+        )
+        status = req.field("status", cast=str)
+        if status is not None:
+            updated = self.svc.set_campaign_status(cid, status) or updated
+        if not updated:
+            self._campaign_or_404(cid)
+        return 200, {"updated": updated}
+
+    def delete_campaign(self, req):
+        cid = req.params[0]
+        force = req.arg("force", False, _flag)
+        deleted, linked = self.svc.delete_campaign_safe(cid, force=force)
+        if not deleted and linked and not force:
+            raise HttpError(409, f"campaign {cid} is linked to {linked} channel(s); use ?force=1", linked=linked)
+        if not deleted:
+            raise HttpError(404, f"campaign {cid} not found")
+        return 200, {"deleted": True, "unlinked": linked}
+
+    def campaign_channels(self, req):
+        return 200, {"channels": self.svc.list_channels_for_campaign(req.params[0])}
+
+    def link(self, req):
+        added = self.svc.attach_channel(*req.params)
+        return (201 if added else 200), {"linked": True, "created": added}
+
+    def unlink(self, req):
+        if not self.svc.detach_channel(*req.params):
+            raise HttpError(404, "no such link")
+        return 200, {"unlinked": True}
+
+    def performance(self, req):
+        perf = self.svc.get_campaign_performance(
+            req.params[0], req.arg("start", None, _date), req.arg("end", None, _date)
+        )
+        return 200, perf
+
+    def compare_performance(self, req):
+        start, end = req.arg("start", None, _date), req.arg("end", None, _date)
+        if start is None or end is None:
+            raise HttpError(400, "start and end are required")
+        results = self.svc.compare_campaign_performance(
+            start, end,
+            campaign_ids=req.arg("ids", None, _ids),
+            prior_start=req.arg("prior_start", None, _date),
+        )
+        return 200, {"campaigns": results}
+
+    def write_metrics(self, req):
+        cid = req.params[0]
+        values = dict(
+            impressions=req.field("impressions", 0, cast=int),
+            clicks=req.field("clicks", 0, cast=int),
+            spend_cents=req.field("spend_cents", 0, cast=int),
+            revenue_cents=req.field("revenue_cents", 0, cast=int),
+        )
+        metric_date = req.field("date", required=True, cast=_date)
+        mode = req.field("mode", "upsert", cast=str)
+        if mode == "upsert":
+            self.svc.upsert_campaign_daily_metrics(cid, metric_date, **values)
+            return 200, {"written": True}
+        if mode == "increment":
+            applied = self.svc.increment_campaign_daily_metrics(
+                cid, metric_date, idempotency_key=req.field("idempotency_key", cast=str), **values
+            )
+            return 200, {"applied": applied}
+        raise HttpError(400, "mode must be 'upsert' or 'increment'")
+
+    def list_channels(self, req):
+        limit = min(req.arg("limit", 100, int), 1000)
+        return 200, {"channels": self.svc.list_channels(limit=limit, offset=req.arg("offset", 0, int))}
+
+    def create_channel(self, req):
+        chid = self.svc.create_channel(
+            req.field("name", required=True, cast=str), req.field("type", "Other", cast=str)
+        )
+        return 201, {"channel_id": chid}
+
+    def update_channel(self, req):
+        chid = req.params[0]
+        updated = self.svc.update_channel(
+            chid, name=req.field("name", cast=str), ch_type=req.field("type", cast=str)
+        )
+        return 200, {"updated": updated}
+
+    def channel_campaigns(self, req):
+        limit = min(req.arg("limit", 100, int), 1000)
+        page = self.svc.list_campaigns_for_channel(
+            req.params[0], after_id=req.arg("after", 0, int), limit=limit
+        )
+        next_after = page[-1]["campaign_id"] if len(page) == limit else None
+        return 200, {"campaigns": page, "next_after": next_after}
+
+    def delete_channel(self, req):
+        chid = req.params[0]
+        force = req.arg("force", False, _flag)
+        deleted, linked = self.svc.delete_channel_safe(chid, force=force)
+        if not deleted and linked and not force:
+            raise HttpError(409, f"channel {chid} is linked to {linked} campaign(s); use ?force=1", linked=linked)
+        if not deleted:
+            raise HttpError(404, f"channel {chid} not found")
+        return 200, {"deleted": True, "unlinked": linked}
+
+    def db_stats(self, req):  # noqa: ARG002
+        return 200, self.svc.database_stats()
+
+
+def _trace_id(traceparent):
+    """Trace id from a W3C traceparent header (version-traceid-spanid-flags)."""
+    parts = (traceparent or "").split("-")
+    if len(parts) == 4 and len(parts[1]) == 32:
+        return parts[1]
+    return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    server_version = "CampaignsAPI/1.0"
+
+    def setup(self) -> None:
+        self.timeout = self.server.keepalive_timeout
+        super().setup()
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_HEAD(self):
+        self._dispatch("HEAD")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str) -> None:
+        started = time.perf_counter()
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+
+        headers = {}
+        trace = tracing.start_trace("request", trace_id=_trace_id(self.headers.get("traceparent")),
+                                    method=method, path=self.path)
+        with trace, QueryAudit.scope(f"{method} {self.path}") as audit:
+            DBStats.begin_scope()
+            try:
+                status, result, headers = self.server.api.handle(
+                    method, self.path, self.headers.get("If-None-Match"), body
+                )
+            except HttpError as e:
+                status, result = e.status, {"error": str(e), **e.extra}
+                if "allow" in e.extra:
+                    headers["Allow"] = e.extra["allow"]
+            except ValueError as e:
+                # service-layer validation ("end_date cannot be before start_date", "... not found")
+                status = 404 if "not found" in str(e) else 400
+                result = {"error": str(e)}
+            except Exception as e:
+                if type(e).__name__ == "PoolError":
+                    status, result = 503, {"error": "database busy, retry"}
+                    headers["Retry-After"] = "1"
+                else:
+                    status, result = 500, {"error": "internal error"}
+                    self.log_error("%s %s failed: %r", method, self.path, e)
+            finally:
+                queries, db_seconds = DBStats.end_scope()
+            trace.set_attribute("status", status)
+
+        # findings are only reported here: a request is never failed for them
+        report = QueryAudit.check(audit)
+        if report:
+            sys.stderr.write(report + "\n")
+        payload = b"" if result is None else json.dumps(result, default=json_default).encode()
+        total_ms = (time.perf_counter() - started) * 1000.0
+        db_ms = db_seconds * 1000.0
+
+        self.send_response(status)
+        if result is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header(
+            "Server-Timing",
+            f'db;dur={db_ms:.3f};desc="{queries} queries", '
+            f"app;dur={max(total_ms - db_ms, 0.0):.3f}, total;dur={total_ms:.3f}",
+        )
+        self.send_header("X-Response-Time-ms", f"{total_ms:.3f}")
+        self.send_header("X-DB-Queries", str(queries))
+        if trace.trace_id is not None:
+            self.send_header("X-Trace-Id", trace.trace_id)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if payload and method != "HEAD":
+            self.wfile.write(payload)
+
+    def log_message(self, format, *args):  # noqa: A002
+        if self.server.access_log:
+            sys.stderr.write(f"{self.address_string()} - {format % args}\n")
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that hands connections to a fixed-size worker pool."""
+
+    request_queue_size = 128
+
+    def __init__(self, address, api: Api, workers: int, keepalive_timeout: float = 5.0,
+                 access_log: bool = False) -> None:
+        self.api = api
+        self.workers = workers
+        self.keepalive_timeout = keepalive_timeout
+        self.access_log = access_log
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="http")
+        super().__init__(address, _Handler)
+
+    def process_request(self, request, client_address):
+        self._executor.submit(self._work, request, client_address)
+
+    def _work(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=True)
+
+
+def make_server(svc: CampaignService, config: dict, host: str = None, port: int = None) -> PooledHTTPServer:
+    """
+    Build (but do not start) the API server for an initialized DB pool.
+    config["http"]: {host, port, workers, keepalive_timeout, etag_ttl_seconds, access_log}
+    port=0 picks a free port (server.server_address has the real one).
+    """
+    http_cfg = config.get("http", {})
+    workers = int(http_cfg.get("workers") or config["database"]["pool"]["size"])
+    return PooledHTTPServer(
+        (host or http_cfg.get("host", "127.0.0.1"), http_cfg.get("port", 8080) if port is None else port),
+        Api(svc, float(http_cfg.get("etag_ttl_seconds", 5))),
+        workers=workers,
+        keepalive_timeout=float(http_cfg.get("keepalive_timeout", 5)),
+        access_log=bool(http_cfg.get("access_log", False)),
+    )
+
+
+def serve(config: dict, host: str = None, port: int = None) -> None:
+    """Entry point for main.py --serve; runs until interrupted."""
+    DB.init_pool(config)
+    DB.warm_up(background=True)  # connect while the socket comes up
+    tracing.configure(config)
+    QueryAudit.configure(config)
+    svc = CampaignService(config.get("metrics_buffer"), config.get("purge"))
+    server = make_server(svc, config, host, port)
+    h, p = server.server_address[:2]
+    print(f"serving on http://{h}:{p} with {server.workers} workers (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        svc.close()
@@ -0,0 +1,179 @@
+"""
+Machine-readable output for listing and report commands (--format).
+
+A command opens one writer, then for each result set calls
+begin(name, columns), row(dict) per row and end(); single-object
+reports use record(name, dict). close() finishes the document.
+
+Rows are written as they arrive and collected into chunks of
+buffer_rows before each write, so exporting a large table never holds
+more than one chunk of formatted text in memory.
+
+  json    one document per command: {"campaigns": [{...}, ...], ...}
+  ndjson  one object per line; rows from multi-section commands carry
+          "_section" (begin(..., tag=True))
+  csv     header + rows per section; sections after the first are
+          preceded by a "# <name>" line
+"""
+
+import csv
+import io
+import json
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+
+
+FORMATS = ("table", "json", "ndjson", "csv")
+
+
+def json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", "replace")
+    return str(value)
+
+
+class RowWriter:
+    """Base class: buffers formatted text and writes it in chunks."""
+
+    def __init__(self, stream=None, buffer_rows: int = 500) -> None:
+        self.stream = stream or sys.stdout
+        self.buffer_rows = buffer_rows
+        self._chunks: list = []
+        self._pending = 0
+
+    def _put(self, text: str, rows: int = 1) -> None:
+        self._chunks.append(text)
+        self._pending += rows
+        if self._pending >= self.buffer_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._chunks:
+            self.stream.write("".join(self._chunks))
+            self._chunks = []
+            self._pending = 0
+        self.stream.flush()
+
+    def begin(self, name: str, columns: list, tag: bool = False) -> None:
+        raise NotImplementedError
+
+    def row(self, values: dict) -> None:
+        raise NotImplementedError
+
+    def end(self) -> None:
+        pass
+
+    def record(self, name: str, values: dict) -> None:
+        """A single-object report (e.g. campaign performance)."""
+        self.begin(name, list(values))
+        self.row(values)
+        self.end()
+
+    def rows(self, name: str, columns: list, iterable, tag: bool = False) -> int:
+        """begin/row.../end over an iterable; returns the row count."""
+        self.begin(name, columns, tag=tag)
+        n = 0
+        for values in iterable:
+            self.row(values)
+            n += 1
+        self.end()
+        return n
+
+    def close(self) -> None:
+        self.flush()
+
+
+class JsonWriter(RowWriter):
+    def __init__(self, stream=None, buffer_rows: int = 500) -> None:
+        super().__init__(stream, buffer_rows)
+        self._opened = False
+        self._first_row = True
+
+    def begin(self, name, columns, tag=False):  # noqa: ARG002
+        self._put(("{" if not self._opened else ",") + json.dumps(name) + ":[", rows=0)
+        self._opened = True
+        self._first_row = True
+
+    def row(self, values):
+        self._put(("" if self._first_row else ",") + json.dumps(values, default=json_default))
+        self._first_row = False
+
+    def end(self):
+        self._put("]", rows=0)
+
+    def record(self, name, values):
+        self._put(("{" if not self._opened else ",") + json.dumps(name) + ":"
+                  + json.dumps(values, default=json_default), rows=0)
+        self._opened = True
+
+    def close(self):
+        self._put(("}" if self._opened else "{}") + "\n", rows=0)
+        super().close()
+
+
+class NdjsonWriter(RowWriter):
+    def __init__(self, stream=None, buffer_rows: int = 500) -> None:
+        super().__init__(stream, buffer_rows)
+        self._section = None
+
+    def begin(self, name, columns, tag=False):  # noqa: ARG002
+        self._section = name if tag else None
+
+    def row(self, values):
+        if self._section is not None:
+            values = {"_section": self._section, **values}
+        self._put(json.dumps(values, default=json_default) + "\n")
+
+    def record(self, name, values):  # noqa: ARG002
+        self._put(json.dumps(values, default=json_default) + "\n")
+
+
+class CsvWriter(RowWriter):
+    def __init__(self, stream=None, buffer_rows: int = 500) -> None:
+        super().__init__(stream, buffer_rows)
+        self._buf = io.StringIO()
+        self._csv = csv.writer(self._buf, lineterminator="\n")
+        self._columns: list = []
+        self._sections = 0
+
+    def _take(self) -> str:
+        text = self._buf.getvalue()
+        self._buf.seek(0)
+        self._buf.truncate()
+        return text
+
+    def begin(self, name, columns, tag=False):  # noqa: ARG002
+        if self._sections:
+            self._put(f"\n# {name}\n", rows=0)
+        self._sections += 1
+        self._columns = list(columns)
+        self._csv.writerow(self._columns)
+        self._put(self._take(), rows=0)
+
+    def row(self, values):
+        self._csv.writerow(
+            ["" if values.get(c) is None else _csv_value(values.get(c)) for c in self._columns]
+        )
+        self._put(self._take())
+
+
+def _csv_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+_WRITERS = {"json": JsonWriter, "ndjson": NdjsonWriter, "csv": CsvWriter}
+
+
+def make_writer(fmt: str, stream=None) -> RowWriter:
+    """Writer for a machine-readable format ('table' is rendered by the UI)."""
+    try:
+        return _WRITERS[fmt](stream)
+    except KeyError:
+        raise ValueError(f"unknown format '{fmt}' (expected one of: {', '.join(FORMATS)})")
@@ -0,0 +1,189 @@
+"""
+Buffered ASCII table rendering for the CLI listings.
+
+TableRenderer takes any iterable of row dicts (lists or the streaming
+service iterators) and:
+  - sizes columns from the header and the first sample_rows rows only;
+    later cells that do not fit are cut with '…'
+  - formats rows into chunks of chunk_rows lines, each sent with one
+    write() instead of one print() per row
+  - stops after max_rows rows and says so (truncation for huge outputs)
+  - optionally pipes through a less-style pager ($PAGER, default
+    'less -FRX'), chosen automatically when stdout is a terminal and the
+    sample alone is taller than the screen
+
+The look matches the hand-drawn tables it replaced:
+
+    +-----+-------------+
+    | ID  | NAME        |
+    +-----+-------------+
+    |   1 | Spring Sale |
+    +-----+-------------+
+"""
+
+import itertools
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+from typing import Callable, Iterable, List, Optional
+
+
+class Column:
+    """
+    One table column.
+      key     : row dict key (ignored when value is given)
+      header  : header text
+      align   : '<' left, '>' right
+      fmt     : format spec applied to non-None values (e.g. '.2f')
+      width   : fixed width (skips sampling)
+      max_width: cap for the sampled width
+      value   : callable(row) -> value, for computed columns
+    """
+
+    __slots__ = ("key", "header", "align", "fmt", "width", "max_width", "value")
+
+    def __init__(
+        self,
+        key: str,
+        header: str,
+        align: str = "<",
+        fmt: str = "",
+        width: Optional[int] = None,
+        max_width: Optional[int] = 40,
+        value: Optional[Callable] = None,
+    ) -> None:
+        self.key = key
+        self.header = header
+        self.align = align
+        self.fmt = fmt
+        self.width = width
+        self.max_width = max_width
+        self.value = value
+
+    def text(self, row: dict) -> str:
+        v = self.value(row) if self.value is not None else row.get(self.key)
+        if v is None:
+            return ""
+        return format(v, self.fmt) if self.fmt else str(v)
+
+
+def _fit(text: str, width: int, align: str) -> str:
+    if len(text) > width:
+        text = text[: width - 1] + "…" if width > 1 else text[:width]
+    return text.rjust(width) if align == ">" else text.ljust(width)
+
+
+class _Pager:
+    """less-style pager process fed through its stdin."""
+
+    def __init__(self) -> None:
+        cmd = os.environ.get("PAGER") or "less -FRX"
+        self.proc = subprocess.Popen(shlex.split(cmd), stdin=subprocess.PIPE, text=True)
+        self.stream = self.proc.stdin
+
+    def close(self) -> None:
+        try:
+            self.stream.close()
+        except BrokenPipeError:
+            pass
+        self.proc.wait()
+
+
+class TableRenderer:
+    def __init__(
+        self,
+        columns: List[Column],
+        title: Optional[str] = None,
+        sample_rows: int = 200,
+        chunk_rows: int = 500,
+        max_rows: Optional[int] = None,
+        pager: str = "never",
+        empty_message: Optional[str] = None,
+        stream=None,
+    ) -> None:
+        """pager: 'auto' | 'always' | 'never'."""
+        self.columns = columns
+        self.title = title
+        self.sample_rows = sample_rows
+        self.chunk_rows = chunk_rows
+        self.max_rows = max_rows
+        self.pager = pager
+        self.empty_message = empty_message
+        self.stream = stream
+
+    def _widths(self, sample: List[dict]) -> List[int]:
+        widths = []
+        for col in self.columns:
+            if col.width is not None:
+                widths.append(col.width)
+                continue
+            w = max([len(col.header)] + [len(col.text(r)) for r in sample])
+            if col.max_width is not None:
+                w = min(w, max(col.max_width, len(col.header)))
+            widths.append(w)
+        return widths
+
+    def _use_pager(self, out, sample_len: int) -> bool:
+        if self.pager == "always":
+            return True
+        if self.pager != "auto" or not getattr(out, "isatty", lambda: False)():
+            return False
+        return sample_len + 6 > shutil.get_terminal_size().lines
+
+    def render(self, rows: Iterable[dict]) -> int:
+        """Render rows; returns the number of rows shown."""
+        out = self.stream or sys.stdout
+        it = iter(rows)
+        limit = self.max_rows
+        sample = list(itertools.islice(it, self.sample_rows if limit is None else min(self.sample_rows, limit + 1)))
+
+        widths = self._widths(sample)
+        border = "+" + "+".join("-" * (w + 2) for w in widths) + "+"
+        cols = list(zip(self.columns, widths))
+
+        def line(row: dict) -> str:
+            return "| " + " | ".join(_fit(c.text(row), w, c.align) for c, w in cols) + " |"
+
+        pager = None
+        if self._use_pager(out, len(sample)):
+            try:
+                pager = _Pager()
+                out = pager.stream
+            except OSError:
+                pager = None
+
+        shown = 0
+        truncated = False
+        try:
+            head = []
+            if self.title:
+                head.append(f"\n{self.title}\n")
+            head += [border, "| " + " | ".join(_fit(c.header, w, "<") for c, w in cols) + " |", border]
+            buf = head
+            for row in itertools.chain(sample, it):
+                if limit is not None and shown >= limit:
+                    truncated = True
+                    break
+                buf.append(line(row))
+                shown += 1
+                if len(buf) >= self.chunk_rows:
+                    out.write("\n".join(buf) + "\n")
+                    buf = []
+            buf.append(border)
+            if truncated:
+                buf.append(f"(showing first {limit} rows; use --all, --limit N or --format csv for more)")
+            elif shown == 0 and self.empty_message:
+                buf.append(self.empty_message)
+            out.write("\n".join(buf) + "\n")
+            out.flush()
+        except BrokenPipeError:
+            pass  # pager quit early
+        finally:
+            close = getattr(it, "close", None)
+            if close is not None:
+                close()  # stop a streaming iterator we did not finish
+            if pager is not None:
+                pager.close()
+        return shown
@@ -1,13 +1,134 @@
 import sys
+import csv
 import shlex
+import threading
+import time
 from datetime import date
 
+from .. import tracing
 from ..data_layer.db import DB
+from ..data_layer.query_audit import QueryAudit, QueryAuditError
 from ..service_layer.campaign_service import CampaignService
 from ..data_layer.channel_dao import ChannelDAO
 from ..data_layer.campaign_dao import CampaignDAO
 from ..data_layer.campaign_channel_xref_dao import CampaignChannelXrefDAO
+from .output import FORMATS, make_writer
+from .table import Column, TableRenderer
 from datetime import date as _date
+
+# Columns of the machine-readable (--format json|ndjson|csv) listings
+CAMPAIGN_COLUMNS = ["campaign_id", "name", "start_date", "end_date", "status", "budget_cents", "created_at"]
+CHANNEL_COLUMNS = ["channel_id", "name", "type", "created_at"]
+MAPPING_COLUMNS = ["campaign_id", "campaign_name", "channel_id", "channel_name"]
+
+# Table layouts for --format table
+CAMPAIGN_TABLE = [
+    Column("campaign_id", "ID", ">"),
+    Column("name", "NAME", max_width=40),
+    Column("status", "STATUS"),
+    Column("budget_cents", "BUDGET_CENTS", ">"),
+    Column("budget_usd", "BUDGET_USD", ">", ".2f", value=lambda r: (r.get("budget_cents") or 0) / 100.0),
+    Column("created_at", "CREATED_AT"),
+]
+CHANNEL_TABLE = [
+    Column("channel_id", "ID", ">"),
+    Column("name", "NAME", max_width=40),
+    Column("type", "TYPE"),
+    Column("created_at", "CREATED_AT"),
+]
+MAPPING_TABLE = [
+    Column("campaign_id", "CAMPAIGN_ID", ">"),
+    Column("campaign_name", "CAMPAIGN", max_width=40),
+    Column("channel_id", "CHANNEL_ID", ">"),
+    Column("channel_name", "CHANNEL", max_width=40),
+]
+_LATENCY = [
+    Column(k, k.upper(), ">", ".3f") for k in ("p50_ms", "p95_ms", "p99_ms", "max_ms")
+]
+METHOD_STATS_TABLE = [
+    Column("method", "DAO METHOD", max_width=60),
+    Column("count", "CALLS", ">"),
+    Column("rows", "ROWS", ">"),
+] + _LATENCY
+TEMPLATE_STATS_TABLE = [
+    Column("template", "QUERY TEMPLATE", max_width=60),
+    Column("calls", "CALLS", ">"),
+] + _LATENCY
+PERF_COMPARE_TABLE = [
+    Column("campaign_id", "ID", ">"),
+    Column("name", "NAME", max_width=30),
+    Column("impressions", "IMPR", ">"),
+    Column("impressions_change_pct", "IMPR_%", ">", "+.1f"),
+    Column("clicks", "CLICKS", ">"),
+    Column("clicks_change_pct", "CLICKS_%", ">", "+.1f"),
+    Column("spend_usd", "SPEND_USD", ">", ".2f", value=lambda r: r["spend_cents"] / 100.0),
+    Column("spend_cents_change_pct", "SPEND_%", ">", "+.1f"),
+    Column("revenue_usd", "REVENUE_USD", ">", ".2f", value=lambda r: r["revenue_cents"] / 100.0),
+    Column("revenue_cents_change_pct", "REVENUE_%", ">", "+.1f"),
+    Column("roas", "ROAS", ">", ".2f"),
+    Column("roas_change_pct", "ROAS_%", ">", "+.1f"),
+]
+LIFETIME_DRIFT_TABLE = [
+    Column("campaign_id", "CAMPAIGN_ID", ">"),
+    Column("metric", "METRIC"),
+    Column("stored", "STORED", ">"),
+    Column("actual", "ACTUAL", ">"),
+    Column("diff", "DIFF", ">", value=lambda r: r["stored"] - r["actual"]),
+]
+PURGE_COLUMNS = ["job", "mode", "cutoff", "resumed", "done", "rows", "chunks", "elapsed_s"]
+PURGE_TABLE = [
+    Column("job", "JOB"),
+    Column("mode", "MODE"),
+    Column("cutoff", "CUTOFF"),
+    Column("resumed", "RESUMED", value=lambda r: "yes" if r["resumed"] else "no"),
+    Column("done", "DONE", ">"),
+    Column("rows", "ROWS", ">"),
+    Column("chunks", "CHUNKS", ">"),
+    Column("elapsed_s", "SECONDS", ">", ".1f"),
+]
+PURGE_PLAN_TABLE = [
+    Column("job", "JOB"),
+    Column("mode", "MODE"),
+    Column("cutoff", "CUTOFF"),
+    Column("pending", "PENDING", ">"),
+]
+class _PurgeProgress:
+    """
+    db:purge progress on stderr (stdout stays parseable): one line redrawn
+    in place on a terminal, else a line every PLAIN_INTERVAL seconds.
+    """
+
+    PLAIN_INTERVAL = 5.0
+
+    def __init__(self, stream) -> None:
+        self.stream = stream
+        self.tty = stream.isatty()
+        self._last = 0.0
+        self._drawn = False
+
+    def __call__(self, r: dict) -> None:
+        now = time.monotonic()
+        if not self.tty and now - self._last < self.PLAIN_INTERVAL:
+            return
+        self._last = now
+        unit = "campaigns" if r["job"] == "campaigns" else "rows"
+        pct = f" ({r['done'] * 100.0 / r['total']:.1f}%)" if r["total"] else ""
+        line = (f"purge {r['job']}: {r['done']}/{r['total']} {unit}{pct}, "
+                f"{r['rows']} rows in {r['chunks']} chunks, {r['elapsed_s']:.1f}s")
+        if self.tty:
+            self.stream.write(f"\r{line}\033[K")
+            self._drawn = True
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+
+    def close(self) -> None:
+        if self._drawn:
+            self.stream.write("\n")
+            self.stream.flush()
+            self._drawn = False
+
+
 # Optional: simple pretty printer for messages (E2)
 class UIPrinter:
     RESET = "\033[0m"
@@ -22,12 +143,13 @@ class UIPrinter:
         width = max(len(line) for line in content_lines)
         border = "+" + "-" * (width + 2) + "+"
 
-        print(color + border)
+        out = [color + border]
         for i, line in enumerate(content_lines):
-            print(f"| {line.ljust(width)} |")
+            out.append(f"| {line.ljust(width)} |")
             if i == 0 and len(content_lines) > 1:
-                print("|" + "-" * (width + 2) + "|")
-        print(border + cls.RESET)
+                out.append("|" + "-" * (width + 2) + "|")
+        out.append(border + cls.RESET)
+        print("\n".join(out))
 
     @classmethod
     def info(cls, title: str, *lines: str) -> None:
@@ -47,11 +169,24 @@ class UIPrinter:
 
 
 class UserInterface:
-    def __init__(self, config):
+    def __init__(self, config, output_format: str = "table", trace: bool = False, profiler=None):
+        if output_format not in FORMATS:
+            raise ValueError(f"unknown format '{output_format}' (expected one of: {', '.join(FORMATS)})")
         self.config = config
+        self.default_format = output_format
+        # trace every command and print its timing waterfall to stderr
+        self.show_trace = trace
+        tracing.configure(config)
+        # profiling.CommandProfiler for sampled commands (a command's own
+        # --profile option always profiles it)
+        self.profiler = profiler
+        # N+1 / repeated-query findings per command (database.query_audit, --audit-queries)
+        QueryAudit.configure(config)
+        # per-command '--format X' override (thread-local: batch mode runs commands in parallel)
+        self._local = threading.local()
         DB.init_pool(config)
 
-        self.svc = CampaignService()
+        self.svc = CampaignService(config.get("metrics_buffer"), config.get("purge"))
         self.campaigns = CampaignDAO()
         self.channels = ChannelDAO()
         # -------------------------------------------------------------- #
@@ -69,67 +204,190 @@ class UserInterface:
             
             "campaign:channels": self.cmd_campaign_channels,
             "campaign:perf": self.cmd_campaign_perf,
+            "campaign:perf:compare": self.cmd_campaign_perf_compare,
             "campaign:metrics:upsert": self.cmd_campaign_metrics_upsert,
+            "campaign:metrics:increment": self.cmd_campaign_metrics_increment,
+            "campaign:metrics:increment:bulk": self.cmd_campaign_metrics_increment_bulk,
+            "campaign:metrics:flush": self.cmd_campaign_metrics_flush,
+            "campaign:metrics:verify": self.cmd_campaign_metrics_verify,
 
 
             "channel:list": self.cmd_channel_list,
             "channel:add": self.cmd_channel_add,
             "channel:delete": self.cmd_channel_delete,
             "channel:update": self.cmd_channel_update,
+            "channel:campaigns": self.cmd_channel_campaigns,
             "link": self.cmd_link,
             "unlink": self.cmd_unlink,
             "inspect:db": self.cmd_inspect_db,
+            "stats:db": self.cmd_stats_db,
+            "db:purge": self.cmd_db_purge,
         }
 
     # ---------------------------------------------------------- #
     # Small helpers for pretty messages
     # ---------------------------------------------------------- #
+    # In machine-readable formats messages go to stderr so stdout stays parseable
     def print_error(self, msg: str):
+        if self.output_format != "table":
+            print(f"ERROR: {msg}", file=sys.stderr)
+            return
         UIPrinter.error("ERROR", msg)
 
     def print_success(self, msg: str):
+        if self.output_format != "table":
+            print(f"SUCCESS: {msg}", file=sys.stderr)
+            return
         UIPrinter.success("SUCCESS", msg)
 
     def print_info(self, msg: str):
+        if self.output_format != "table":
+            print(f"INFO: {msg}", file=sys.stderr)
+            return
         UIPrinter.info("INFO", msg)
 
+    @property
+    def output_format(self) -> str:
+        """Format for the current command: its --format option, else the global one."""
+        return getattr(self._local, "format", None) or self.default_format
+
+    def _export(self, name: str, columns: list, rows) -> None:
+        """Stream rows (any iterable of dicts) in the current machine-readable format."""
+        with tracing.span("ui.render", self.output_format):
+            writer = make_writer(self.output_format)
+            writer.rows(name, columns, rows)
+            writer.close()
+
+    def _render_table(self, columns: list, rows, title: str = None, empty_message: str = None) -> int:
+        """
+        Render rows with TableRenderer using config["ui"] settings:
+        max_rows (default 1000), pager ("auto" | "always" | "never"),
+        sample_rows, chunk_rows. --limit N / --all / --page / --no-page
+        override them per command.
+        """
+        ui_cfg = self.config.get("ui", {})
+        opts = getattr(self._local, "table", None) or {}
+        with tracing.span("ui.render", "table"):
+            return TableRenderer(
+                columns,
+                title=title,
+                sample_rows=ui_cfg.get("sample_rows", 200),
+                chunk_rows=ui_cfg.get("chunk_rows", 500),
+                max_rows=opts.get("max_rows", ui_cfg.get("max_rows", 1000)),
+                pager=opts.get("pager", ui_cfg.get("pager", "auto")),
+                empty_message=empty_message,
+            ).render(rows)
+
+    def _profiled(self, cmd: str, handler, args: list) -> None:
+        """Run one command under the profiler and say where the report went."""
+        if self.profiler is None:
+            from ..profiling import CommandProfiler  # cProfile/pstats only when used
+            self.profiler = CommandProfiler.from_config(self.config, sample_rate=0)
+        _, report = self.profiler.run(cmd, handler, args)
+        if report is not None:
+            print(f"profile: {report}", file=sys.stderr)
+
+    def _report_query_audit(self, cmd: str, audit) -> None:
+        """Print the audit summary to stderr; in "fail" mode the command fails."""
+        report = QueryAudit.check(audit)
+        if report is None:
+            return
+        print(report, file=sys.stderr)
+        if QueryAudit.mode == "fail":
+            raise QueryAuditError(f"query audit failed for {cmd} (see summary above)")
+
+    @staticmethod
+    def _pop_option(args: list, flag: str):
+        """Remove '<flag> <value>' from args and return value (or None)."""
+        if flag not in args:
+            return None
+        i = args.index(flag)
+        if i + 1 >= len(args):
+            raise ValueError(f"{flag} requires a value")
+        value = args[i + 1]
+        del args[i:i + 2]
+        return value
+
     # ---------------------------------------------------------- #
     # START SCREEN / LOOP
     # ---------------------------------------------------------- #
     def start(self):
         print("Advertisment Campaigns CLI. Type 'help' for commands, 'quit' to exit.")
-        while True:
-            try:
-                line = input("> ").strip()
-            except (EOFError, KeyboardInterrupt):
-                print("\nbye")
-                return
-
-            if not line:
-                continue
-            if line in ("quit", "exit"):
-                return
-
-            self.handle(line)
+        try:
+            while True:
+                try:
+                    line = input("> ").strip()
+                except (EOFError, KeyboardInterrupt):
+                    print("\nbye")
+                    return
+
+                if not line:
+                    continue
+                if line in ("quit", "exit"):
+                    return
+
+                self.handle(line)
+        finally:
+            # durable flush of any write-behind buffers before the process exits
+            self.svc.close()
 
     # ---------------------------------------------------------- #
     # COMMAND DISPATCH
     # ---------------------------------------------------------- #
     def handle(self, line: str):
+        trace = tracing.start_trace("command", force=self.show_trace)
+        with trace:
+            self._handle(line, trace)
+        if self.show_trace and trace.spans:
+            print(tracing.format_waterfall(trace), file=sys.stderr)
+
+    def _handle(self, line: str, trace):
         try:
-            args = shlex.split(line)
+            with tracing.span("ui.parse"):
+                args = shlex.split(line)
             if not args:
                 return
             cmd = args[0]
+            trace.set_attribute("command", cmd)
+
+            fmt = self._pop_option(args, "--format")
+            if fmt is not None and fmt not in FORMATS:
+                self.print_error(f"--format must be one of: {', '.join(FORMATS)}")
+                return
+            self._local.format = fmt
+
+            table_opts = {}
+            limit = self._pop_option(args, "--limit")
+            if limit is not None:
+                table_opts["max_rows"] = int(limit)
+            if "--all" in args:
+                args.remove("--all")
+                table_opts["max_rows"] = None
+            for flag, pager in (("--page", "always"), ("--no-page", "never")):
+                if flag in args:
+                    args.remove(flag)
+                    table_opts["pager"] = pager
+            self._local.table = table_opts
 
             handler = self.commands.get(cmd)
             if not handler:
                 self.print_error(f"Unknown command: {cmd}. Try 'help'.")
                 return
 
-            handler(args)
+            force_profile = "--profile" in args
+            if force_profile:
+                args.remove("--profile")
+            with tracing.span("ui.dispatch", cmd), QueryAudit.scope(cmd) as audit:
+                if force_profile or (self.profiler is not None and self.profiler.sampled()):
+                    self._profiled(cmd, handler, args)
+                else:
+                    handler(args)
+            self._report_query_audit(cmd, audit)
         except Exception as e:
             self.print_error(str(e))
+        finally:
+            self._local.format = None
+            self._local.table = None
 
     # ---------------------------------------------------------- #
     # HELP
@@ -139,25 +397,44 @@ class UserInterface:
         campaign:list                                         - list campaigns      
         campaign:add <name> <start> <end> [budget_cents]      - create a campaign   
         campaign:delete <campaign_id> [--force]               - delete a campaign (safe delete)
-        campaign:get <campaign_id>                            - show a campaign by id
+        campaign:get <campaign_id> [campaign_id ...]          - show campaigns by id
         campaign:update <id> <name> [start] [end] [budget]    - update a campaign
         campaign:set-status <id> <status>                     - set status of a campaign
               
         campaign:channels <campaign_id>                       - list channels for a campaign
         campaign:perf <campaign_id> [start] [end]             - show campaign performance over a date range
+        campaign:perf:compare <start> <end> [campaign_id ...] [--prior-start D]
+                                                              - compare with the prior period (default: all campaigns)
         campaign:metrics:upsert <id> <date> <impr> <clicks> <spend_cents> [revenue_cents]
                                                               - upsert daily metrics row
+        campaign:metrics:increment <id> <date> <impr> <clicks> <spend_cents> [revenue_cents] [--key K]
+                                                              - add deltas to a daily metrics row
+        campaign:metrics:increment:bulk <csv_file> [--key K]  - add deltas from CSV rows in one transaction
+                                                                (campaign_id,date,impr,clicks,spend_cents,revenue_cents)
+        campaign:metrics:flush                                - flush buffered metrics and show buffer stats
+        campaign:metrics:verify [--repair]                    - check lifetime totals against daily rows
               
         channel:list                                          - list channels
         channel:add <name> [type]                             - create a channel
         channel:delete <channel_id> [--force]                 - delete a channel
         channel:update <id> <name> <type>                     - update a channel
+        channel:campaigns <channel_id> [channel_id ...]       - list campaigns for channels
               
         link <campaign_id> <channel_id>                       - link campaign to channel
         unlink <campaign_id> <channel_id>                     - unlink campaign to channel
   
         inspect:db                                            - pretty-print DB tables snapshot
+        stats:db [--templates] [--reset]                      - DB latency p50/p95/p99 per DAO method
+        db:purge [--retention-days N] [--archive] [--only campaigns|metrics]
+                 [--chunk-rows N] [--throttle-ms N] [--dry-run] [--restart]
+                                                              - purge archived campaigns and old metrics in chunks
               
+        Listings and reports (campaign:list, campaign:get, campaign:channels, campaign:perf,
+        campaign:perf:compare, campaign:metrics:flush, campaign:metrics:verify, channel:list,
+        channel:campaigns, inspect:db, stats:db, db:purge) accept --format table|json|ndjson|csv.
+        Tables accept --limit N (default 1000 rows), --all, --page / --no-page.
+        Any command accepts --profile (cProfile report in <logs_dir>/profiles).
+
         quit                                                  - exit
 """)
 
@@ -219,11 +496,19 @@ class UserInterface:
             self.print_info(f"no campaign found with id={cid}")
 
     def cmd_campaign_get(self, args):
+        # campaign:get <campaign_id> [campaign_id ...]
         if len(args) < 2:
-            self.print_error("Usage: campaign:get <campaign_id>")
+            self.print_error("Usage: campaign:get <campaign_id> [campaign_id ...]")
             return
-        cid = int(args[1])
-        self.campaign_get(c_id=cid)
+        try:
+            ids = [int(a) for a in args[1:]]
+        except ValueError:
+            self.print_error("campaign_id must be an integer")
+            return
+        if len(ids) == 1:
+            self.campaign_get(c_id=ids[0])
+        else:
+            self.campaign_get_many(ids)
 
     def cmd_campaign_update(self, args):
         # campaign:update <id> <name> [start_date] [end_date] [budget_cents]
@@ -270,34 +555,26 @@ class UserInterface:
             self.print_error("campaign_id must be an integer")
             return
 
-        campaign = self.svc.get_campaign(cid)
+        campaign = self.svc.get_campaign(cid, fields=CampaignDAO.REF_FIELDS)
         if not campaign:
             self.print_info(f"no campaign found with id={cid}")
             return
         camp_name = campaign.get("name", "")
 
-        try:
-            channels = self.svc.list_channels_for_campaign(cid)
-        except ValueError as e:
-            self.print_error(str(e))
+        # the get above is the existence check
+        channels = self.svc.list_channels_for_campaign(cid, check_exists=False)
+
+        if self.output_format != "table":
+            self._export("channels", CHANNEL_COLUMNS, channels)
             return
 
         if not channels:
             self.print_info(f"No channels linked to campaign '{camp_name}' (id={cid})")
             return
 
-        print(f"\n------- CHANNELS FOR CAMPAIGN {cid}: {camp_name} -------\n")
-        print("+-----+----------------------------+-----------+-----------------------+")
-        print("| ID  | NAME                       | TYPE      | CREATED_AT            |")
-        print("+-----+----------------------------+-----------+-----------------------+")
-        for ch in channels:
-            print(
-                f"|{ch['channel_id']:>4} | "
-                f"{ch['name']:<26.27} | "
-                f"{ch['type']:<9} | "
-                f"{ch.get('created_at')}   |"
-            )
-        print("+-----+----------------------------+-----------+-----------------------+")
+        self._render_table(
+            CHANNEL_TABLE, channels, title=f"------- CHANNELS FOR CAMPAIGN {cid}: {camp_name} -------"
+        )
         print()
 
 
@@ -370,13 +647,74 @@ class UserInterface:
                 self.print_error("end_date must be YYYY-MM-DD or '-'")
                 return
 
+        campaign = self.svc.get_campaign(cid, fields=CampaignDAO.REF_FIELDS)
+        if not campaign:
+            self.print_error(f"campaign_id {cid} not found.")
+            return
+
         try:
-            perf = self.svc.get_campaign_performance(cid, start, end)
+            perf = self.svc.get_campaign_performance(cid, start, end, check_exists=False)
         except ValueError as e:
             self.print_error(str(e))
             return
 
-        self._print_performance_summary(perf)
+        self._print_performance_summary(perf, name=campaign.get("name", ""))
+
+    def cmd_campaign_perf_compare(self, args):
+        # campaign:perf:compare <start> <end> [campaign_id ...] [--prior-start D]
+        usage = "Usage: campaign:perf:compare <start> <end> [campaign_id ...] [--prior-start YYYY-MM-DD]"
+        try:
+            prior_start = self._pop_option(args, "--prior-start")
+            if len(args) < 3:
+                self.print_error(usage)
+                return
+            start = _date.fromisoformat(args[1])
+            end = _date.fromisoformat(args[2])
+            if prior_start is not None:
+                prior_start = _date.fromisoformat(prior_start)
+        except ValueError:
+            self.print_error(f"dates must be YYYY-MM-DD. {usage}")
+            return
+        try:
+            ids = [int(a) for a in args[3:]] or None
+        except ValueError:
+            self.print_error("campaign_id must be an integer")
+            return
+
+        try:
+            results = self.svc.compare_campaign_performance(
+                start, end, campaign_ids=ids, prior_start=prior_start
+            )
+        except ValueError as e:
+            self.print_error(str(e))
+            return
+
+        rows = []
+        for r in results:
+            row = {"campaign_id": r["campaign_id"], "name": r["name"]}
+            for key in r["change"]:
+                row[key] = r["current"][key]
+                row[f"prior_{key}"] = r["prior"][key]
+                row[f"{key}_change"] = r["change"][key]
+                row[f"{key}_change_pct"] = r["change_pct"][key]
+            rows.append(row)
+
+        if self.output_format != "table":
+            columns = list(rows[0]) if rows else ["campaign_id", "name"]
+            self._export("comparison", columns, rows)
+            return
+
+        if results:
+            p = results[0]["prior"]
+            period = f"{start} → {end} vs {p['start_date']} → {p['end_date']}"
+        else:
+            period = f"{start} → {end}"
+        self._render_table(
+            PERF_COMPARE_TABLE, rows,
+            title=f"------- PERFORMANCE {period} -------",
+            empty_message="No campaigns to compare.",
+        )
+        print()
 
     # ---------------------------------------------------------- #
     # CHANNEL COMMANDS
@@ -419,11 +757,61 @@ class UserInterface:
         else:
             self.print_success(f"updated channel_id={chid}")
 
+    def cmd_channel_campaigns(self, args):
+        # channel:campaigns <channel_id> [channel_id ...]
+        if len(args) < 2:
+            self.print_error("Usage: channel:campaigns <channel_id> [channel_id ...]")
+            return
+
+        try:
+            ids = list(dict.fromkeys(int(a) for a in args[1:]))
+        except ValueError:
+            self.print_error("channel_id must be an integer")
+            return
+
+        found = self.svc.get_channels(ids, fields=ChannelDAO.REF_FIELDS)
+        missing = [chid for chid, ch in found.items() if ch is None]
+        if missing:
+            self.print_info(f"no channel found with id={', '.join(map(str, missing))}")
+            return
+        names = {chid: ch["name"] for chid, ch in found.items()}
+
+        # get_channels above is the existence check
+        rows = self.svc.iter_campaigns_for_channels(
+            ids, fields=CampaignDAO.LIST_FIELDS, check_exists=False
+        )
+
+        if self.output_format != "table":
+            self._export("campaigns", ["channel_id", *CampaignDAO.LIST_FIELDS], rows)
+            return
 
-    def _print_performance_summary(self, perf: dict):
+        if len(ids) == 1:
+            columns = CAMPAIGN_TABLE
+            title = f"------- CAMPAIGNS FOR CHANNEL {ids[0]}: {names[ids[0]]} -------"
+            empty = f"No campaigns linked to channel '{names[ids[0]]}' (id={ids[0]})"
+        else:
+            columns = [
+                Column("channel_id", "CHANNEL_ID", ">"),
+                Column("channel", "CHANNEL", max_width=30, value=lambda r: names[r["channel_id"]]),
+            ] + CAMPAIGN_TABLE
+            title = f"------- CAMPAIGNS FOR {len(ids)} CHANNELS -------"
+            empty = "No campaigns linked to these channels."
+        self._render_table(columns, rows, title=title, empty_message=empty)
+        print()
+
+
+    def _print_performance_summary(self, perf: dict, name: str = None):
         cid = perf["campaign_id"]
-        campaign = self.svc.get_campaign(cid)
-        camp_name = campaign.get("name") if campaign else ""
+        if name is None:
+            campaign = self.svc.get_campaign(cid, fields=CampaignDAO.REF_FIELDS)
+            name = campaign.get("name") if campaign else ""
+        camp_name = name
+
+        if self.output_format != "table":
+            writer = make_writer(self.output_format)
+            writer.record("performance", {"campaign_id": cid, "name": camp_name, **perf})
+            writer.close()
+            return
 
         start = perf.get("start_date")
         end = perf.get("end_date")
@@ -510,6 +898,167 @@ class UserInterface:
 
 
 
+    def cmd_campaign_metrics_increment(self, args):
+        # campaign:metrics:increment <id> <date> <impr> <clicks> <spend_cents> [revenue_cents] [--key K]
+        key = self._pop_option(args, "--key")
+        if len(args) < 6:
+            self.print_error(
+                "Usage: campaign:metrics:increment <campaign_id> <date> "
+                "<impressions> <clicks> <spend_cents> [revenue_cents] [--key <idempotency_key>]"
+            )
+            return
+
+        try:
+            cid = int(args[1])
+        except ValueError:
+            self.print_error("campaign_id must be an integer")
+            return
+
+        try:
+            metric_date = _date.fromisoformat(args[2])
+        except ValueError:
+            self.print_error("date must be YYYY-MM-DD")
+            return
+
+        try:
+            impressions = int(args[3])
+            clicks = int(args[4])
+            spend_cents = int(args[5])
+            revenue_cents = int(args[6]) if len(args) > 6 else 0
+        except ValueError:
+            self.print_error("impressions, clicks, spend_cents, revenue_cents must be integers")
+            return
+
+        try:
+            applied = self.svc.increment_campaign_daily_metrics(
+                cid,
+                metric_date,
+                impressions=impressions,
+                clicks=clicks,
+                spend_cents=spend_cents,
+                revenue_cents=revenue_cents,
+                idempotency_key=key,
+            )
+        except ValueError as e:
+            self.print_error(str(e))
+            return
+
+        if not applied:
+            self.print_info(f"idempotency key '{key}' was already applied; nothing changed")
+            return
+        self.print_success(
+            f"Incremented metrics for campaign_id={cid} on {metric_date} "
+            f"(+impr={impressions}, +clicks={clicks}, +spend_cents={spend_cents}, +revenue_cents={revenue_cents})"
+        )
+
+    def cmd_campaign_metrics_increment_bulk(self, args):
+        # campaign:metrics:increment:bulk <csv_file> [--key K]
+        key = self._pop_option(args, "--key")
+        if len(args) < 2:
+            self.print_error(
+                "Usage: campaign:metrics:increment:bulk <csv_file> [--key <idempotency_key>]"
+            )
+            return
+
+        rows = []
+        try:
+            with open(args[1], newline="") as f:
+                for n, rec in enumerate(csv.reader(f), start=1):
+                    if not rec or rec[0].strip().startswith("#"):
+                        continue
+                    if n == 1 and not rec[0].strip().isdigit():
+                        continue  # header row
+                    revenue = int(rec[5]) if len(rec) > 5 and rec[5].strip() else 0
+                    rows.append((
+                        int(rec[0]),
+                        _date.fromisoformat(rec[1].strip()),
+                        int(rec[2]),
+                        int(rec[3]),
+                        int(rec[4]),
+                        revenue,
+                    ))
+        except OSError as e:
+            self.print_error(f"cannot read {args[1]}: {e}")
+            return
+        except (ValueError, IndexError):
+            self.print_error(
+                f"line {n}: expected campaign_id,date,impressions,clicks,spend_cents[,revenue_cents]"
+            )
+            return
+
+        if not rows:
+            self.print_info("no rows to apply")
+            return
+
+        try:
+            applied = self.svc.increment_campaign_daily_metrics_many(rows, idempotency_key=key)
+        except ValueError as e:
+            self.print_error(str(e))
+            return
+
+        if applied == 0:
+            self.print_info(f"idempotency key '{key}' was already applied; nothing changed")
+            return
+        self.print_success(f"Incremented {applied} daily metrics row(s) in one transaction")
+
+    def cmd_campaign_metrics_flush(self, args):  # noqa: ARG002
+        # campaign:metrics:flush
+        stats = self.svc.metrics_buffer_stats()
+        if stats is None:
+            self.print_info("metrics buffer is disabled; upserts are written through")
+            return
+
+        written = self.svc.flush_metrics()
+        stats = self.svc.metrics_buffer_stats()
+        if self.output_format != "table":
+            writer = make_writer(self.output_format)
+            writer.record("flush", {"rows_written": written, **stats})
+            writer.close()
+            return
+        UIPrinter.success(
+            "METRICS FLUSHED",
+            f"rows written now      : {written}",
+            f"mode                  : {stats['mode']}",
+            f"writes received       : {stats['writes_received']}",
+            f"writes coalesced      : {stats['writes_coalesced']}",
+            f"flushes               : {stats['flushes']}",
+            f"rows flushed          : {stats['rows_flushed']}",
+            f"still pending         : {stats['pending']}",
+            f"rows dropped          : {stats['rows_dropped']}",
+            f"last flush            : {stats['last_flush_seconds'] * 1000:.2f} ms",
+            f"avg / max flush       : {stats['avg_flush_seconds'] * 1000:.2f} / "
+            f"{stats['max_flush_seconds'] * 1000:.2f} ms",
+        )
+
+    def cmd_campaign_metrics_verify(self, args):
+        # campaign:metrics:verify [--repair]
+        repair = "--repair" in args[1:]
+        drift = self.svc.verify_lifetime_metrics(repair=repair)
+        rows = [
+            {"campaign_id": d["campaign_id"], "metric": m,
+             "stored": d["stored"][m], "actual": d["actual"][m]}
+            for d in drift
+            for m in d["stored"]
+            if d["stored"][m] != d["actual"][m]
+        ]
+
+        if self.output_format != "table":
+            self._export("drift", ["campaign_id", "metric", "stored", "actual"], rows)
+        elif rows:
+            self._render_table(
+                LIFETIME_DRIFT_TABLE, rows,
+                title="------------ LIFETIME METRICS DRIFT ------------",
+            )
+
+        if not drift:
+            self.print_success("lifetime totals match the daily metrics")
+        elif repair:
+            self.print_success(f"repaired lifetime totals for {len(drift)} campaign(s)")
+        else:
+            self.print_info(
+                f"{len(drift)} campaign(s) drifted; run campaign:metrics:verify --repair"
+            )
+
     # ---------------------------------------------------------- #
     # LINK / UNLINK / INSPECT COMMANDS
     # ---------------------------------------------------------- #
@@ -536,47 +1085,144 @@ class UserInterface:
     def cmd_inspect_db(self, args):  # noqa: ARG002
         self.inspect_db()
 
+    def cmd_stats_db(self, args):
+        # stats:db [--templates] [--reset]
+        stats = self.svc.database_stats(reset=("--reset" in args[1:]))
+        pool = stats["pool"]
+
+        if self.output_format != "table":
+            writer = make_writer(self.output_format)
+            writer.rows("methods", list(stats["methods"][0]) if stats["methods"] else ["method"],
+                        stats["methods"], tag=True)
+            if "--templates" in args[1:]:
+                writer.rows("templates", list(stats["templates"][0]) if stats["templates"] else ["template"],
+                            stats["templates"], tag=True)
+            writer.record("pool", pool)
+            if stats["logging"]:
+                writer.record("logging", stats["logging"])
+            writer.close()
+            return
+
+        self._render_table(
+            METHOD_STATS_TABLE, stats["methods"],
+            title="------------------------------- DB STATS -------------------------------",
+        )
+        if "--templates" in args[1:]:
+            print()
+            self._render_table(TEMPLATE_STATS_TABLE, stats["templates"])
+
+        print()
+        print(f"Connection checkouts     : {pool['checkouts']}")
+        print(f"Pool wait p50/p95/p99    : {pool['wait_p50_ms']:.3f} / "
+              f"{pool['wait_p95_ms']:.3f} / {pool['wait_p99_ms']:.3f} ms")
+        print(f"Pool exhausted errors    : {pool['pool_exhausted']}")
+        print(f"Slow queries logged      : {pool['slow_queries']}")
+        log = stats["logging"]
+        if log:
+            print(f"Log queue depth          : {log['queued']} / {log['capacity']}")
+            print(f"Log records dropped      : {log['dropped']}")
+            print(f"Debug logs sampled out   : {log['sampled_out']}")
+        print()
+
+    def cmd_db_purge(self, args):
+        # db:purge [--retention-days N] [--archive] [--only campaigns|metrics]
+        #          [--chunk-rows N] [--throttle-ms N] [--dry-run] [--restart]
+        args = list(args[1:])
+        retention_days = self._pop_option(args, "--retention-days")
+        chunk_rows = self._pop_option(args, "--chunk-rows")
+        throttle_ms = self._pop_option(args, "--throttle-ms")
+        only = self._pop_option(args, "--only")
+        options = dict(
+            retention_days=int(retention_days) if retention_days is not None else None,
+            mode="archive" if "--archive" in args else None,
+            chunk_rows=int(chunk_rows) if chunk_rows is not None else None,
+            throttle_ms=float(throttle_ms) if throttle_ms is not None else None,
+        )
+        if only is not None:
+            options["jobs"] = (only,)
+
+        if "--dry-run" in args:
+            plan = self.svc.purge(dry_run=True, **options)
+            if self.output_format != "table":
+                self._export("purge_plan", ["job", "mode", "cutoff", "pending"], plan)
+                return
+            self._render_table(
+                PURGE_PLAN_TABLE, plan, title="------------ PURGE (DRY RUN) ------------"
+            )
+            return
+
+        progress = _PurgeProgress(sys.stderr)
+        try:
+            results = self.svc.purge(restart="--restart" in args, progress=progress, **options)
+        except KeyboardInterrupt:
+            progress.close()
+            self.print_info("interrupted: finished chunks are committed; run db:purge again to resume")
+            return
+        progress.close()
+
+        if self.output_format != "table":
+            self._export("purge", PURGE_COLUMNS, results)
+            return
+        self._render_table(PURGE_TABLE, results, title="---------------- PURGE ----------------")
+        self.print_success(
+            f"purged {sum(r['rows'] for r in results)} row(s) in "
+            f"{sum(r['chunks'] for r in results)} chunk(s)"
+        )
+
     # ---------------------------------------------------------- #
     # EXISTING METHODS: LIST / GET / DELETE / UNLINK / INSPECT
     # (these are mostly unchanged, just used by the cmd_* wrappers)
     # ---------------------------------------------------------- #
     def campaign_list(self):
         """Pretty-print campaigns using the service layer."""
-        campaigns = self.svc.list_campaigns(limit=1000, offset=0)
-
-        print("\n--------------- CAMPAIGNS ---------------\n")
-        print("+-----+----------------------------+-----------+---------------+--------------+------------------------+")
-        print("| ID  | NAME                       | STATUS    | BUDGET_CENTS  | BUDGET_USD   | CREATED_AT             |")
-        print("+-----+----------------------------+-----------+---------------+--------------+------------------------+")
-
-        for c in campaigns:
-            cid = c.get("campaign_id")
-            name = c.get("name", "")
-            status = c.get("status", "")
-            budget_cents = c.get("budget_cents") or 0
-            created_at = c.get("created_at")
-
-            budget_usd = budget_cents / 100.0
-
-            print(
-                f"|{cid:>4} | "
-                f"{name:<26.27} | "
-                f"{status:<9} | "
-                f"{budget_cents:>13} | "
-                f"{budget_usd:>12.2f} | "
-                f"{created_at}    |"
-            )
-
-        print("+-----+----------------------------+-----------+---------------+--------------+------------------------+")
+        if self.output_format != "table":
+            self._export("campaigns", CAMPAIGN_COLUMNS, self.svc.iter_campaigns())
+            return
+        self._render_table(
+            CAMPAIGN_TABLE, self.svc.iter_campaigns(fields=CampaignDAO.LIST_FIELDS),
+            title="--------------- CAMPAIGNS ---------------",
+        )
 
 
     def campaign_get(self, c_id: int):
-        """Fetch and pretty-print a single campaign by id using DAO."""
-        campaign = self.campaigns.get(c_id)
-        if not campaign:
+        """Pretty-print a campaign with its channels and all-time performance (one query)."""
+        detail = self.svc.get_campaign_detail(c_id)
+        if not detail:
             self.print_info(f"no campaign found with id={c_id}")
             return
+        channels = detail.pop("channels")
+        perf = detail.pop("performance")
+
+        if self.output_format != "table":
+            writer = make_writer(self.output_format)
+            writer.record("campaign", detail)
+            writer.rows("channels", CHANNEL_COLUMNS, channels)
+            writer.record("performance", perf)
+            writer.close()
+            return
+        self._print_campaign_detail(detail)
+        self._render_table(
+            CHANNEL_TABLE, channels,
+            title="------------ LINKED CHANNELS ------------",
+            empty_message="No channels linked.",
+        )
+        self._print_performance_summary(perf, name=detail.get("name"))
 
+    def campaign_get_many(self, ids: list):
+        """Fetch several campaigns in one query; print each, then report missing ids."""
+        found = self.svc.get_campaigns(ids)
+        campaigns = [c for c in found.values() if c is not None]
+        missing = [str(cid) for cid, c in found.items() if c is None]
+
+        if self.output_format != "table":
+            self._export("campaigns", CAMPAIGN_COLUMNS, campaigns)
+        else:
+            for campaign in campaigns:
+                self._print_campaign_detail(campaign)
+        if missing:
+            self.print_info(f"no campaign found with id={', '.join(missing)}")
+
+    def _print_campaign_detail(self, campaign: dict):
         budget_cents = campaign.get("budget_cents") or 0
         budget_usd = budget_cents / 100.0
 
@@ -592,27 +1238,13 @@ class UserInterface:
 
     def channel_list(self):
         """Pretty-print channels using the service layer."""
-        channels = self.svc.list_channels(limit=1000, offset=0)
-
-        print("\n--------------- CHANNELS ---------------\n")
-        print("+-----+----------------------------+-----------+-----------------------+")
-        print("| ID  | NAME                       | TYPE      | CREATED_AT            |")
-        print("+-----+----------------------------+-----------+-----------------------+")
-
-        for ch in channels:
-            channel_id = ch.get("channel_id")
-            name = ch.get("name", "")
-            ch_type = ch.get("type", "")
-            created_at = ch.get("created_at")
-
-            print(
-                f"|{channel_id:>4} | "
-                f"{name:<26.27} | "
-                f"{ch_type:<9} | "
-                f"{created_at}   | "
-            )
-
-        print("+-----+----------------------------+-----------+-----------------------+")
+        if self.output_format != "table":
+            self._export("channels", CHANNEL_COLUMNS, self.svc.iter_channels())
+            return
+        self._render_table(
+            CHANNEL_TABLE, self.svc.iter_channels(),
+            title="--------------- CHANNELS ---------------",
+        )
         print()
 
 
@@ -637,89 +1269,33 @@ class UserInterface:
 
     def unlink(self, campaign_id: int, channel_id: int):
         """Remove a single campaign ↔ channel mapping."""
-        conn = DB.get_connection()
-        try:
-            cur = conn.cursor()
-            cur.execute(
-                "DELETE FROM campaign_channel_xref "
-                "WHERE campaign_id = %s AND channel_id = %s",
-                (campaign_id, channel_id),
+        if self.svc.detach_channel(campaign_id, channel_id):
+            self.print_success(
+                f"unlinked campaign_id={campaign_id} from channel_id={channel_id}"
             )
-            conn.commit()
-            if cur.rowcount:
-                self.print_success(
-                    f"unlinked campaign_id={campaign_id} from channel_id={channel_id}"
-                )
-            else:
-                self.print_info("no link found to remove")
-        finally:
-            cur.close()
-            conn.close()
+        else:
+            self.print_info("no link found to remove")
 
     def inspect_db(self):
-        """Pretty-print the main tables using a snapshot from the service layer."""
-        snapshot = self.svc.inspect_database()
-        channels = snapshot["channels"]
-        campaigns = snapshot["campaigns"]
-        mappings = snapshot["mappings"]
-
-        # CHANNELS
-        print("\n--------------- CHANNELS ---------------\n")
-        print("------+----------------------------+-----------+------------------------")
-        print("| ID  | NAME                       | TYPE      | CREATED_AT            |")
-        print("------+----------------------------+-----------+------------------------")
-        for ch in channels:
-            channel_id = ch.get("channel_id")
-            name = ch.get("name", "")
-            ch_type = ch.get("type", "")
-            created_at = ch.get("created_at")
-            print(
-                f"|{channel_id:>4} | "
-                f"{name:<26.27} | "
-                f"{ch_type:<9} | "
-                f"{created_at}   | "
-            )
-        print("------+----------------------------+-----------+------------------------")
+        """Print the main tables, streamed table by table from the service layer."""
+        if self.output_format != "table":
+            writer = make_writer(self.output_format)
+            writer.rows("channels", CHANNEL_COLUMNS, self.svc.iter_channels(), tag=True)
+            writer.rows("campaigns", CAMPAIGN_COLUMNS, self.svc.iter_campaigns(), tag=True)
+            writer.rows("mappings", MAPPING_COLUMNS, self.svc.iter_mappings(), tag=True)
+            writer.close()
+            return
+        self._render_table(
+            CHANNEL_TABLE, self.svc.iter_channels(),
+            title="--------------- CHANNELS ---------------",
+        )
         print()
-
-        # CAMPAIGNS
-        print("\n--------------- CAMPAIGNS ---------------\n")
-        print("+-----+----------------------------+-----------+---------------+--------------+------------------------+")
-        print("| ID  | NAME                       | STATUS    | BUDGET_CENTS  | BUDGET_USD   | CREATED_AT             |")
-        print("+-----+----------------------------+-----------+---------------+--------------+------------------------+")
-        for c in campaigns:
-            cid = c.get("campaign_id")
-            name = c.get("name", "")
-            status = c.get("status", "")
-            budget_cents = c.get("budget_cents") or 0
-            created_at = c.get("created_at")
-            budget_usd = budget_cents / 100.0
-
-            print(
-                f"|{cid:>4} | "
-                f"{name:<26.27} | "
-                f"{status:<9} | "
-                f"{budget_cents:>13} | "
-                f"{budget_usd:>12.2f} | "
-                f"{created_at}    |"
-            )
-        print("+-----+----------------------------+-----------+---------------+--------------+------------------------+")
-
-        # MAPPINGS
-        print("\n--------- CAMPAIGN TO CHANNEL MAPPINGS ---------\n")
-        print("+-------------+----------------------------+------------+----------------------------+")
-        print("| CAMPAIGN_ID | CAMPAIGN                   | CHANNEL_ID | CHANNEL                    |")
-        print("+-------------+----------------------------+------------+----------------------------+")
-        for m in mappings:
-            cmp_id = m.get("campaign_id")
-            campaign_name = m.get("campaign_name", "")
-            ch_id = m.get("channel_id")
-            channel_name = m.get("channel_name", "")
-            print(
-                f"|{cmp_id:>11}  | "
-                f"{campaign_name:<26.27} | "
-                f"{ch_id:<10} | "
-                f"{channel_name:<26.27} |"
-            )
-        print("+-------------+----------------------------+------------+----------------------------+")
+        self._render_table(
+            CAMPAIGN_TABLE, self.svc.iter_campaigns(fields=CampaignDAO.LIST_FIELDS),
+            title="--------------- CAMPAIGNS ---------------",
+        )
+        self._render_table(
+            MAPPING_TABLE, self.svc.iter_mappings(),
+            title="--------- CAMPAIGN TO CHANNEL MAPPINGS ---------",
+        )
         print("\n---------------- END OF REPORT ----------------\n")
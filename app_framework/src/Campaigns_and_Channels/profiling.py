@@ -0,0 +1,140 @@
+"""
+Per-command profiling for the CLI (main.py --profile, or a command's own
+--profile option in the REPL).
+
+A profiled command runs under cProfile and, with memory=True, under
+tracemalloc. Each one writes to the profile directory (default
+<logs_dir>/profiles):
+
+    <stamp>_<pid>_<seq>_<command>.pstats   load with pstats / snakeviz
+    <stamp>_<pid>_<seq>_<command>.txt      top functions by cumulative time,
+                                           peak traced memory and the top
+                                           allocation sites still alive at the end
+
+sample_rate profiles that fraction of commands, evenly spread (see
+sampling.RateSampler), so it can be left on for production batch runs;
+commands outside the sample run untouched. Only one command is profiled
+at a time: in parallel batches a sampled command that finds the profiler
+busy runs unprofiled.
+
+Config (optional): "profiling": {"enabled": false, "memory": false,
+"sample_rate": 1.0, "dir": null, "top_n": 25}.
+"""
+
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+
+from .sampling import RateSampler
+
+
+class CommandProfiler:
+    def __init__(
+        self,
+        out_dir: str,
+        memory: bool = False,
+        sample_rate: float = 1.0,
+        top_n: int = 25,
+    ) -> None:
+        self.out_dir = out_dir
+        self.memory = memory
+        self.sample_rate = sample_rate
+        self.top_n = top_n
+        self._sampler = RateSampler()
+        self._seq = itertools.count(1)
+        self._busy = threading.Lock()
+        self.profiled = 0
+        self.skipped_busy = 0
+
+    @classmethod
+    def from_config(cls, cfg: dict, **overrides) -> "CommandProfiler":
+        """Build from cfg["profiling"]; keyword overrides win (None = keep)."""
+        pcfg = dict((cfg or {}).get("profiling", {}))
+        pcfg.update({k: v for k, v in overrides.items() if v is not None})
+        out_dir = pcfg.get("dir")
+        if not out_dir:
+            from .settings import Settings
+            out_dir = os.path.join(Settings().read_settings_file_from_location()["logs_dir"], "profiles")
+        return cls(
+            out_dir,
+            memory=bool(pcfg.get("memory", False)),
+            sample_rate=float(pcfg.get("sample_rate", 1.0)),
+            top_n=int(pcfg.get("top_n", 25)),
+        )
+
+    def sampled(self) -> bool:
+        return self._sampler.sample(self.sample_rate)
+
+    def run(self, name: str, fn, *args, **kwargs):
+        """
+        Call fn(*args, **kwargs) under the profiler and write its reports.
+        Returns (result, report_path); report_path is None when the
+        profiler was busy with another thread's command.
+        """
+        if not self._busy.acquire(blocking=False):
+            self.skipped_busy += 1
+            return fn(*args, **kwargs), None
+        try:
+            return self._run(name, fn, args, kwargs)
+        finally:
+            self._busy.release()
+
+    def _run(self, name: str, fn, args, kwargs):
+        # tracemalloc only runs for the sampled command: it slows every allocation
+        tracing_memory = self.memory and not tracemalloc.is_tracing()
+        if tracing_memory:
+            tracemalloc.start(10)
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        snapshot = None
+        peak = 0
+        try:
+            profile.enable()
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                profile.disable()
+                elapsed = time.perf_counter() - started
+                if tracing_memory:
+                    snapshot = tracemalloc.take_snapshot().filter_traces(
+                        (tracemalloc.Filter(False, tracemalloc.__file__),)
+                    )
+                    peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            if tracing_memory:
+                tracemalloc.stop()
+
+        self.profiled += 1
+        path = self._write(name, profile, elapsed, snapshot, peak)
+        return result, path
+
+    def _write(self, name: str, profile, elapsed: float, snapshot, peak: int) -> str:
+        os.makedirs(self.out_dir, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", name)[:60] or "command"
+        base = os.path.join(
+            self.out_dir, f"{time.strftime('%Y%m%d-%H%M%S')}_{os.getpid()}_{next(self._seq):04d}_{slug}"
+        )
+        profile.dump_stats(base + ".pstats")
+
+        text = io.StringIO()
+        text.write(f"command: {name}\nwall: {elapsed * 1000.0:.3f} ms\n\n")
+        stats = pstats.Stats(profile, stream=text)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(self.top_n)
+        if snapshot is not None:
+            text.write(f"\npeak traced memory: {peak / 1024.0:.1f} KiB\n")
+            text.write(f"top {self.top_n} allocation sites alive at end:\n")
+            for stat in snapshot.statistics("lineno")[: self.top_n]:
+                text.write(f"  {stat}\n")
+        with open(base + ".txt", "w") as f:
+            f.write(text.getvalue())
+        return base + ".txt"
+
+    def stats(self) -> dict:
+        return {"profiled": self.profiled, "skipped_busy": self.skipped_busy, "dir": self.out_dir}
+
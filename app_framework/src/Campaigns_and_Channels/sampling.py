@@ -0,0 +1,34 @@
+"""
+Deterministic rate sampling shared by logging, tracing and profiling.
+
+RateSampler keeps exactly `rate` of its calls, evenly spread: every call
+adds rate to a running credit and a call is kept when the credit reaches
+1. A rate of 0.7 keeps 7 calls in 10, 0.01 keeps 1 in 100. The rate is
+passed per call, so a hot-reloaded setting applies from the next call.
+"""
+
+import threading
+
+
+class RateSampler:
+    """Thread-safe fractional-accumulator sampler."""
+
+    __slots__ = ("_credit", "_lock")
+
+    def __init__(self) -> None:
+        self._credit = 0.0
+        self._lock = threading.Lock()
+
+    def sample(self, rate: float) -> bool:
+        """True when this call is kept at the given rate (0..1)."""
+        if rate >= 1.0:
+            return True
+        if rate <= 0.0:
+            return False
+        with self._lock:
+            self._credit += rate
+            # tolerance: 0.1 added ten times is 0.9999999999999999
+            if self._credit >= 1.0 - 1e-9:
+                self._credit -= 1.0
+                return True
+            return False
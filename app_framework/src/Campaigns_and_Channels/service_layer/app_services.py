@@ -13,4 +13,4 @@ class AppServices(ApplicationBase):
         super().__init__(subclass_name=self.__class__.__name__, 
 				   logfile_prefix_name=self.META["log_prefix"])
         self.DB = MySQLPersistenceWrapper(config)
-        self._logger.log_debug(f'{inspect.currentframe().f_code.co_name}:It works!')
+        self._logger.log_debug_sampled('%s:It works!', inspect.currentframe().f_code.co_name)
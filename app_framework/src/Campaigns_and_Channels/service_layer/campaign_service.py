@@ -1,13 +1,24 @@
 from __future__ import annotations
 
-from datetime import date
-from typing import Optional, Dict, List, Tuple
+import threading
+from datetime import date, timedelta
+from typing import Optional, Dict, Iterable, Iterator, List, Tuple
 
 from ..data_layer.campaign_dao import CampaignDAO
 from ..data_layer.channel_dao import ChannelDAO
-from ..data_layer.campaign_channel_xref_dao import CampaignChannelXrefDAO
-
-
+from ..data_layer.db import Fields
+from ..data_layer.campaign_channel_xref_dao import (
+    IDEMPOTENCY_KEY_MAX_LENGTH, CampaignChannelXrefDAO,
+)
+from ..data_layer.metrics_buffer import MetricsWriteBuffer
+from ..data_layer.purge import Purger
+from ..data_layer.instrumentation import DBStats
+from ..data_layer.query_registry import QUERIES
+from ..logging import logging_stats
+from ..tracing import traced
+
+
+@traced("service")
 class CampaignService:
     """
     Business logic for campaigns and channels.
@@ -21,10 +32,24 @@ class CampaignService:
       - Expose performance/metrics helpers.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        metrics_buffer_config: Optional[dict] = None,
+        purge_config: Optional[dict] = None,
+    ) -> None:
         self.campaigns = CampaignDAO()
         self.channels = ChannelDAO()
         self.xref = CampaignChannelXrefDAO()
+        # Optional write-behind buffer for daily metric upserts (None = write-through)
+        self.metrics_buffer = MetricsWriteBuffer.from_config(
+            metrics_buffer_config, xref=self.xref
+        )
+        # Chunked purge / archival of archived campaigns and old metrics
+        self.purger = Purger(config=purge_config)
+        # Per-resource change counters, bumped after every write made through
+        # this service; cache validators (HTTP ETags) are derived from them.
+        self._versions = {"campaigns": 0, "channels": 0, "links": 0, "metrics": 0}
+        self._versions_lock = threading.Lock()
 
     # ------------------------------------------------------------------ #
     # Validation helpers
@@ -42,6 +67,30 @@ class CampaignService:
         if budget_cents is not None and budget_cents < 0:
             raise ValueError("budget_cents cannot be negative")
 
+    def _validate_idempotency_key(self, key: Optional[str]) -> None:
+        if key is not None and len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise ValueError(
+                f"idempotency_key cannot be longer than {IDEMPOTENCY_KEY_MAX_LENGTH} characters"
+            )
+
+    # ------------------------------------------------------------------ #
+    # Change tracking
+    # ------------------------------------------------------------------ #
+
+    def _changed(self, *resources: str) -> None:
+        with self._versions_lock:
+            for r in resources:
+                self._versions[r] += 1
+
+    def data_version(self, *resources: str) -> Tuple[int, ...]:
+        """
+        Current change counters for the given resources
+        ("campaigns", "channels", "links", "metrics"). Only writes made
+        through this service instance are seen.
+        """
+        with self._versions_lock:
+            return tuple(self._versions[r] for r in resources)
+
     # ------------------------------------------------------------------ #
     # Campaign CRUD
     # ------------------------------------------------------------------ #
@@ -55,15 +104,38 @@ class CampaignService:
     ) -> int:
         self._validate_dates(start_date, end_date)
         self._validate_budget(budget_cents)
-        return self.campaigns.create(
+        campaign_id = self.campaigns.create(
             name=name,
             start_date=start_date,
             end_date=end_date,
             budget_cents=budget_cents,
         )
+        self._changed("campaigns")
+        return campaign_id
 
-    def get_campaign(self, campaign_id: int) -> Optional[Dict]:
-        return self.campaigns.get(campaign_id)
+    def get_campaign(
+        self, campaign_id: int, fields: Fields = CampaignDAO.ALL_FIELDS
+    ) -> Optional[Dict]:
+        return self.campaigns.get(campaign_id, fields=fields)
+
+    def get_campaign_detail(self, campaign_id: int) -> Optional[Dict]:
+        """
+        A campaign with its linked channels and all-time performance, read
+        in one query: the campaign columns plus "channels" and
+        "performance". None if the campaign does not exist.
+        """
+        # read-your-writes: buffered rows must be visible to the totals
+        self.flush_metrics()
+        return self.xref.get_campaign_detail(campaign_id)
+
+    def get_campaigns(
+        self, campaign_ids: Iterable[int], fields: Fields = CampaignDAO.ALL_FIELDS
+    ) -> Dict[int, Optional[Dict]]:
+        """
+        Campaigns by id, batched into IN queries: {campaign_id: row or None},
+        in the order given.
+        """
+        return self.campaigns.get_many(campaign_ids, fields=fields)
 
     def list_campaigns(
         self,
@@ -71,8 +143,9 @@ class CampaignService:
         offset: int = 0,
         q: Optional[str] = None,
         include_channels: bool = False,
+        fields: Fields = CampaignDAO.ALL_FIELDS,
     ) -> List[Dict]:
-        items = self.campaigns.list(limit=limit, offset=offset, q=q)
+        items = self.campaigns.list(limit=limit, offset=offset, q=q, fields=fields)
         if include_channels and items:
             channel_map = self._channels_for_campaigns(
                 [c["campaign_id"] for c in items]
@@ -81,6 +154,12 @@ class CampaignService:
                 c["channels"] = channel_map.get(c["campaign_id"], [])
         return items
 
+    def iter_campaigns(
+        self, batch_size: int = 1000, fields: Fields = CampaignDAO.ALL_FIELDS
+    ) -> Iterator[Dict]:
+        """Stream every campaign (for exports); memory is bounded by batch_size."""
+        return self.campaigns.iter_all(batch_size, fields=fields)
+
     def update_campaign(
         self,
         campaign_id: int,
@@ -106,23 +185,32 @@ class CampaignService:
             return False  # nothing to update
 
         rows = self.campaigns.update(campaign_id, **fields)
+        if rows > 0:
+            self._changed("campaigns")
         return rows > 0
 
     def delete_campaign_safe(self, campaign_id: int, force: bool = False) -> Tuple[bool, int]:
         """
         Safe delete:
           - If campaign has linked channels and not force, do NOT delete.
-          - If force is True, delete the campaign; FK cascade (or cleanup) handles mappings.
+          - If force is True, delete the campaign; its daily metrics and
+            mappings go first in short chunked transactions instead of one
+            long ON DELETE CASCADE.
         Returns (deleted, linked_count).
         """
-        linked_channels = self.xref.list_channels_for_campaign(campaign_id)
-        linked_count = len(linked_channels)
+        # pending buffered metrics must land before the campaign is removed
+        self.flush_metrics()
+        linked_count = self.xref.count_channels_for_campaign(campaign_id)
 
         if linked_count > 0 and not force:
             return False, linked_count
 
-        rows = self.campaigns.delete(campaign_id)
-        return rows > 0, linked_count
+        deleted = self.purger.delete_campaign(
+            campaign_id, chunk_rows=self.purger.settings()["chunk_rows"]
+        )
+        if deleted:
+            self._changed("campaigns", "links", "metrics")
+        return deleted, linked_count
 
 
     def delete_channel_safe(self, channel_id: int, force: bool = False) -> tuple[bool, int]:
@@ -137,6 +225,8 @@ class CampaignService:
             return False, linked_count
 
         rows = self.channels.delete(channel_id)
+        if rows > 0:
+            self._changed("channels", "links")
         return rows > 0, linked_count
 
     # ------------------------------------------------------------------ #
@@ -156,17 +246,39 @@ class CampaignService:
         #         f"Invalid status '{status}'. Must be one of: {', '.join(sorted(allowed))}"
         #     )
 
-        return self.campaigns.set_status(campaign_id, status)
+        updated = self.campaigns.set_status(campaign_id, status)
+        if updated:
+            self._changed("campaigns")
+        return updated
 
     # ------------------------------------------------------------------ #
     # Channel CRUD
     # ------------------------------------------------------------------ #
 
     def create_channel(self, name: str, ch_type: str = "Other") -> int:
-        return self.channels.create(name, ch_type)
+        channel_id = self.channels.create(name, ch_type)
+        self._changed("channels")
+        return channel_id
+
+    def list_channels(
+        self, limit: int = 100, offset: int = 0, fields: Fields = ChannelDAO.ALL_FIELDS
+    ) -> List[Dict]:
+        return self.channels.list(limit=limit, offset=offset, fields=fields)
+
+    def get_channels(
+        self, channel_ids: Iterable[int], fields: Fields = ChannelDAO.ALL_FIELDS
+    ) -> Dict[int, Optional[Dict]]:
+        """
+        Channels by id, batched into IN queries: {channel_id: row or None},
+        in the order given.
+        """
+        return self.channels.get_many(channel_ids, fields=fields)
 
-    def list_channels(self, limit: int = 100, offset: int = 0) -> List[Dict]:
-        return self.channels.list(limit=limit, offset=offset)
+    def iter_channels(
+        self, batch_size: int = 1000, fields: Fields = ChannelDAO.ALL_FIELDS
+    ) -> Iterator[Dict]:
+        """Stream every channel (for exports); memory is bounded by batch_size."""
+        return self.channels.iter_all(batch_size, fields=fields)
 
     def update_channel(
         self,
@@ -185,6 +297,8 @@ class CampaignService:
             return False
 
         rows = self.channels.update(channel_id, **fields)
+        if rows > 0:
+            self._changed("channels")
         return rows > 0
 
     # ------------------------------------------------------------------ #
@@ -197,25 +311,83 @@ class CampaignService:
         Returns True if newly linked, False if it already existed.
         """
         self._ensure_exists(campaign_id=campaign_id, channel_id=channel_id)
-        return self.xref.link(campaign_id, channel_id)
+        added = self.xref.link(campaign_id, channel_id)
+        if added:
+            self._changed("links")
+        return added
 
     def detach_channel(self, campaign_id: int, channel_id: int) -> int:
         """
         Unlink channel from campaign.
         Returns number of rows deleted (0 or 1).
         """
-        return self.xref.unlink(campaign_id, channel_id)
+        removed = self.xref.unlink(campaign_id, channel_id)
+        if removed:
+            self._changed("links")
+        return removed
 
     # ------------------------------------------------------------------ #
     # Channels for a campaign (wrapper used by campaign:channels)
     # ------------------------------------------------------------------ #
 
-    def list_channels_for_campaign(self, campaign_id: int) -> List[Dict]:
+    def list_channels_for_campaign(
+        self,
+        campaign_id: int,
+        fields: Fields = ChannelDAO.ALL_FIELDS,
+        check_exists: bool = True,
+    ) -> List[Dict]:
         """
-        Return list of channel dicts for a campaign.
+        Return list of channel dicts for a campaign. check_exists=False skips
+        the existence query, for callers that have just read the campaign.
         """
-        self._ensure_exists(campaign_id=campaign_id)
-        return self.xref.list_channels_for_campaign(campaign_id)
+        if check_exists:
+            self._ensure_exists(campaign_id=campaign_id)
+        return self.xref.list_channels_for_campaign(campaign_id, fields=fields)
+
+    def list_campaigns_for_channel(
+        self,
+        channel_id: int,
+        fields: Fields = CampaignDAO.ALL_FIELDS,
+        after_id: int = 0,
+        limit: int = 50,
+    ) -> List[Dict]:
+        """
+        One page of the campaigns linked to a channel, by campaign_id;
+        pass the last campaign_id of a page as after_id for the next one.
+        """
+        self._ensure_exists(channel_id=channel_id)
+        return self.xref.list_campaigns_for_channel(
+            channel_id, fields=fields, after_id=after_id, limit=limit
+        )
+
+    def get_campaigns_for_channels(
+        self, channel_ids: Iterable[int], fields: Fields = CampaignDAO.ALL_FIELDS
+    ) -> Dict[int, List[Dict]]:
+        """{channel_id: [campaign rows...]} for every given channel, in batched queries."""
+        channel_ids = list(channel_ids)
+        self._ensure_exists(channel_ids=channel_ids)
+        out: Dict[int, List[Dict]] = {chid: [] for chid in channel_ids}
+        for row in self.xref.iter_campaigns_for_channels(channel_ids, fields=fields):
+            out[row.pop("channel_id")].append(row)
+        return out
+
+    def iter_campaigns_for_channels(
+        self,
+        channel_ids: Iterable[int],
+        fields: Fields = CampaignDAO.ALL_FIELDS,
+        batch_size: int = 1000,
+        check_exists: bool = True,
+    ) -> Iterator[Dict]:
+        """
+        Stream (channel_id + campaign fields) rows for the given channels.
+        check_exists=False skips the existence query (channels already read).
+        """
+        channel_ids = list(channel_ids)
+        if check_exists:
+            self._ensure_exists(channel_ids=channel_ids)
+        return self.xref.iter_campaigns_for_channels(
+            channel_ids, fields=fields, batch_size=batch_size
+        )
 
     # ------------------------------------------------------------------ #
     # Daily metrics: upsert + aggregate performance
@@ -232,8 +404,20 @@ class CampaignService:
     ) -> None:
         """
         Insert or update a daily metrics row for a campaign.
+        Goes through the write-behind buffer when one is configured.
         """
         self._ensure_exists(campaign_id=campaign_id)
+        if self.metrics_buffer is not None:
+            self.metrics_buffer.add(
+                campaign_id,
+                metric_date,
+                impressions,
+                clicks,
+                spend_cents,
+                revenue_cents,
+            )
+            self._changed("metrics")
+            return
         self.xref.upsert_campaign_daily_metrics(
             campaign_id,
             metric_date,
@@ -242,23 +426,188 @@ class CampaignService:
             spend_cents,
             revenue_cents,
         )
+        self._changed("metrics")
+
+    def increment_campaign_daily_metrics(
+        self,
+        campaign_id: int,
+        metric_date: date,
+        impressions: int = 0,
+        clicks: int = 0,
+        spend_cents: int = 0,
+        revenue_cents: int = 0,
+        idempotency_key: Optional[str] = None,
+    ) -> bool:
+        """
+        Add deltas to a daily metrics row (atomic in SQL).
+        Returns False if idempotency_key was already applied.
+        """
+        self._validate_idempotency_key(idempotency_key)
+        self._ensure_exists(campaign_id=campaign_id)
+        # buffered overwrites for the same day must land before the delta
+        self.flush_metrics()
+        applied = self.xref.increment_campaign_daily_metrics(
+            campaign_id,
+            metric_date,
+            impressions,
+            clicks,
+            spend_cents,
+            revenue_cents,
+            idempotency_key=idempotency_key,
+        )
+        if applied:
+            self._changed("metrics")
+        return applied
+
+    def increment_campaign_daily_metrics_many(
+        self,
+        rows: List[tuple],
+        idempotency_key: Optional[str] = None,
+    ) -> int:
+        """
+        Apply a batch of metric deltas in one transaction.
+
+        rows: (campaign_id, metric_date, impressions, clicks, spend_cents, revenue_cents)
+        Returns the number of rows applied (0 if idempotency_key was replayed).
+        """
+        self._validate_idempotency_key(idempotency_key)
+        self._ensure_exists(campaign_ids=[r[0] for r in rows])
+        self.flush_metrics()
+        applied = self.xref.increment_campaign_daily_metrics_many(
+            rows, idempotency_key=idempotency_key
+        )
+        if applied:
+            self._changed("metrics")
+        return applied
+
+    def flush_metrics(self) -> int:
+        """
+        Flush buffered daily metrics. Returns the number of rows written.
+        """
+        if self.metrics_buffer is None:
+            return 0
+        return self.metrics_buffer.flush()
+
+    def metrics_buffer_stats(self) -> Optional[Dict]:
+        if self.metrics_buffer is None:
+            return None
+        return self.metrics_buffer.stats()
+
+    def close(self) -> None:
+        """
+        Release service resources; durably flushes buffered metrics.
+        """
+        if self.metrics_buffer is not None:
+            self.metrics_buffer.close()
 
     def get_campaign_performance(
         self,
         campaign_id: int,
         start_date: Optional[date] = None,
         end_date: Optional[date] = None,
+        check_exists: bool = True,
     ) -> Dict:
         """
         Return aggregated performance for a campaign over an optional date range.
+        check_exists=False skips the existence query (campaign already read).
         """
-        self._ensure_exists(campaign_id=campaign_id)
+        if check_exists:
+            self._ensure_exists(campaign_id=campaign_id)
+        # read-your-writes: buffered rows must be visible to the aggregate
+        self.flush_metrics()
         return self.xref.get_campaign_performance(
             campaign_id,
             start_date=start_date,
             end_date=end_date,
         )
 
+    def compare_campaign_performance(
+        self,
+        start_date: date,
+        end_date: date,
+        campaign_ids: Optional[Iterable[int]] = None,
+        prior_start: Optional[date] = None,
+        prior_end: Optional[date] = None,
+    ) -> List[Dict]:
+        """
+        Period-over-period performance for some campaigns (None = all).
+
+        The prior window defaults to the same number of days immediately
+        before start_date; with only prior_start it keeps that length.
+        """
+        self._validate_dates(start_date, end_date)
+        days = end_date - start_date
+        if prior_start is None:
+            prior_start = start_date - days - timedelta(days=1)
+        if prior_end is None:
+            prior_end = prior_start + days
+        self._validate_dates(prior_start, prior_end)
+
+        if campaign_ids is not None:
+            campaign_ids = list(campaign_ids)
+            self._ensure_exists(campaign_ids=campaign_ids)
+        self.flush_metrics()
+        return self.xref.compare_campaign_performance(
+            campaign_ids, start_date, end_date, prior_start, prior_end
+        )
+
+    def verify_lifetime_metrics(self, repair: bool = False) -> List[Dict]:
+        """
+        Check the stored lifetime totals against the daily rows.
+        Returns the drifted campaigns; repair=True also fixes them.
+        """
+        # buffered rows are not in either table yet
+        self.flush_metrics()
+        drift = self.xref.verify_lifetime_metrics(repair=repair)
+        if repair and drift:
+            self._changed("metrics")
+        return drift
+
+    # ------------------------------------------------------------------ #
+    # Retention
+    # ------------------------------------------------------------------ #
+
+    def purge(
+        self,
+        retention_days: Optional[int] = None,
+        mode: Optional[str] = None,
+        chunk_rows: Optional[int] = None,
+        throttle_ms: Optional[float] = None,
+        jobs: Iterable[str] = Purger.JOBS,
+        dry_run: bool = False,
+        restart: bool = False,
+        progress=None,
+    ) -> List[Dict]:
+        """
+        Delete (mode "delete") or move to the archive tables (mode
+        "archive") archived campaigns that ended, and daily metrics dated,
+        before today - retention_days. Unset options come from the "purge"
+        config section. dry_run only counts what would go. Returns one
+        result dict per job; see data_layer.purge.
+        """
+        settings = self.purger.settings(
+            retention_days=retention_days, mode=mode,
+            chunk_rows=chunk_rows, throttle_ms=throttle_ms,
+        )
+        cutoff = Purger.cutoff(settings["retention_days"])
+        if dry_run:
+            return [
+                {"job": r["job"], "mode": settings["mode"], "cutoff": cutoff, "pending": r["pending"]}
+                for r in self.purger.pending(cutoff, jobs)
+            ]
+
+        # buffered rows for old dates would otherwise land after the purge
+        self.flush_metrics()
+        try:
+            results = self.purger.run(
+                cutoff, jobs, mode=settings["mode"], chunk_rows=settings["chunk_rows"],
+                throttle_ms=settings["throttle_ms"], restart=restart, progress=progress,
+            )
+        finally:
+            # an interrupted run has still committed its finished chunks
+            self._changed("campaigns", "links", "metrics")
+        return results
+
     # ------------------------------------------------------------------ #
     # Internal helpers
     # ------------------------------------------------------------------ #
@@ -267,23 +616,61 @@ class CampaignService:
         self,
         campaign_id: Optional[int] = None,
         channel_id: Optional[int] = None,
+        campaign_ids: Iterable[int] = (),
+        channel_ids: Iterable[int] = (),
     ) -> None:
+        """
+        Raise ValueError naming the lowest missing ID. Existence is checked
+        on the primary key only (no row data), in one query per table for
+        any number of campaign_ids / channel_ids.
+        """
+        wanted = set(campaign_ids)
         if campaign_id is not None:
-            if not self.campaigns.get(campaign_id):
-                raise ValueError(f"campaign_id {campaign_id} not found.")
+            wanted.add(campaign_id)
+        if wanted:
+            missing = wanted - self.campaigns.existing_ids(wanted)
+            if missing:
+                raise ValueError(f"campaign_id {min(missing)} not found.")
+        wanted = set(channel_ids)
         if channel_id is not None:
-            if not self.channels.get(channel_id):
-                raise ValueError(f"channel_id {channel_id} not found.")
+            wanted.add(channel_id)
+        if wanted:
+            missing = wanted - self.channels.existing_ids(wanted)
+            if missing:
+                raise ValueError(f"channel_id {min(missing)} not found.")
 
     def _channels_for_campaigns(self, campaign_ids: List[int]) -> Dict[int, List[Dict]]:
         """
-        Batch helper: returns {campaign_id: [channel_rows...]}.
+        Batch helper: returns {campaign_id: [channel_rows...]}, in IN-chunked
+        queries rather than one per campaign.
         """
         out: Dict[int, List[Dict]] = {cid: [] for cid in campaign_ids}
-        for cid in campaign_ids:
-            out[cid] = self.xref.list_channels_for_campaign(cid)
+        for row in self.xref.iter_channels_for_campaigns(campaign_ids):
+            out[row.pop("campaign_id")].append(row)
         return out
 
+    def database_stats(self, reset: bool = False) -> dict:
+        """
+        Return DB instrumentation: per-DAO-method and per-template latency
+        percentiles, rows returned, and pool checkout counters, plus the
+        log queue's depth and dropped/sampled-out counts ({} before the
+        first log record). reset=True clears the DB counters after taking
+        the snapshot.
+        """
+        snapshot = {
+            "methods": DBStats.method_stats(),
+            "templates": QUERIES.stats(),
+            "pool": DBStats.pool_stats(),
+            "logging": logging_stats(),
+        }
+        if reset:
+            DBStats.reset()
+        return snapshot
+
+    def iter_mappings(self, batch_size: int = 1000) -> Iterator[Dict]:
+        """Stream every campaign ↔ channel mapping with names."""
+        return self.xref.iter_all_mappings(batch_size)
+
     def inspect_database(self) -> dict:
         """
         Return a structured snapshot of the main tables for reporting:
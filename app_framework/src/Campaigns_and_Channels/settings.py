@@ -3,6 +3,7 @@
 import json
 import platform
 from pathlib import Path
+from .config import CONFIG
 
 class Settings():
     """Manage application settings."""
@@ -47,12 +48,8 @@ class Settings():
                                         filename:str='app_settings.json')->dict:
         """Read settings file and return dictionary.
         If settings file does not exist create default settings file.
+        The file is parsed and validated once per process (see config.CONFIG);
+        callers share the result. An invalid file raises ConfigError and is
+        never overwritten.
         """
-        settings = {}
-        try:
-            with open(filename, 'r') as f:
-                settings = json.loads(f.read())
-        except Exception as e:
-            settings = self.create_settings_json_file(filename)
-
-        return settings
+        return CONFIG.settings(filename)
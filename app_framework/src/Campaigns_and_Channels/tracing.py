@@ -0,0 +1,299 @@
+"""
+Request-scoped tracing: one trace per CLI command (or HTTP request).
+
+The presentation layer opens the trace; the service, DAO and DB layers
+add child spans, so a command's time splits into parsing, service
+calls, DAO methods, pool checkout, SQL and rendering:
+
+    with tracing.start_trace("command", line=line) as trace:
+        with tracing.span("ui.parse"):
+            ...
+    print(tracing.format_waterfall(trace))
+
+Spans are only recorded on a thread with an active (sampled) trace;
+elsewhere span() returns a shared no-op, so the hooks cost one
+thread-local lookup when tracing is off.
+
+Trace and span ids follow W3C/OpenTelemetry sizes (32/16 hex chars) and
+the trace id doubles as the correlation id (slow-query log lines,
+X-Trace-Id on HTTP responses). Finished traces go to the configured
+exporters; JsonFileExporter writes one OTLP-JSON-style span per line.
+
+Config (optional): "tracing": {"enabled": false, "file": "logs/traces.jsonl",
+"sample_rate": 1.0}. --trace forces tracing for every command.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from typing import List, Optional
+
+from .sampling import RateSampler
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start", "end", "start_unix_ns",
+                 "attributes", "error", "depth")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: dict) -> None:
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.depth = parent.depth + 1 if parent is not None else 0
+        self.attributes = attributes
+        self.error = None
+        self.start_unix_ns = time.time_ns()
+        self.start = time.perf_counter()
+        self.end = None
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end if self.end is not None else time.perf_counter()) - self.start) * 1000.0
+
+
+class Trace:
+    """A sampled trace; use as a context manager around the whole request."""
+
+    def __init__(self, name: str, attributes: dict, trace_id: Optional[str] = None) -> None:
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.root = Span(name, None, attributes)
+        self.spans: List[Span] = [self.root]
+        self._stack: List[Span] = [self.root]
+
+    def __enter__(self) -> "Trace":
+        _local.trace = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.root.end = time.perf_counter()
+        if exc is not None:
+            self.root.error = repr(exc)
+        _local.trace = None
+        for exporter in list(_exporters):
+            try:
+                exporter.export(self)
+            except Exception:
+                pass  # an exporter must never fail the command
+
+    def set_attribute(self, key: str, value) -> None:
+        self.root.attributes[key] = value
+
+
+class _NoopTrace:
+    trace_id = None
+    spans = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return None
+
+    def set_attribute(self, key, value):
+        pass
+
+
+class _SpanContext:
+    __slots__ = ("trace", "span")
+
+    def __init__(self, trace: Trace, span: Span) -> None:
+        self.trace = trace
+        self.span = span
+
+    def __enter__(self) -> Span:
+        self.trace._stack.append(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.span.end = time.perf_counter()
+        if exc is not None:
+            self.span.error = repr(exc)
+        self.trace._stack.pop()
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc, tb):
+        return None
+
+
+_local = threading.local()
+_NOOP_TRACE = _NoopTrace()
+_NOOP_SPAN = _NoopSpan()
+_exporters: list = []
+
+# set by configure()
+enabled = False
+sample_rate = 1.0
+_sampler = RateSampler()
+
+
+def configure(cfg: dict) -> None:
+    """Read cfg["tracing"]; adds a JsonFileExporter when "file" is set."""
+    global enabled, sample_rate
+    tcfg = (cfg or {}).get("tracing", {})
+    enabled = bool(tcfg.get("enabled", False))
+    sample_rate = float(tcfg.get("sample_rate", 1.0))
+    path = tcfg.get("file")
+    if enabled and path and not any(
+        isinstance(e, JsonFileExporter) and e.path == path for e in _exporters
+    ):
+        add_exporter(JsonFileExporter(path))
+
+
+def add_exporter(exporter) -> None:
+    """exporter.export(trace) is called after each finished trace."""
+    _exporters.append(exporter)
+
+
+def _sampled() -> bool:
+    return enabled and _sampler.sample(sample_rate)
+
+
+def start_trace(name: str, force: bool = False, trace_id: Optional[str] = None, **attributes):
+    """
+    A new Trace if tracing is enabled and sampled (or force is set),
+    else a no-op trace. Nested calls on a thread join the outer trace.
+    """
+    if getattr(_local, "trace", None) is not None:
+        return _NOOP_TRACE
+    if not (force or _sampled()):
+        return _NOOP_TRACE
+    return Trace(name, attributes, trace_id)
+
+
+def span(name: str, detail: Optional[str] = None, **attributes):
+    """Child span of the current span; a no-op outside a trace."""
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        return _NOOP_SPAN
+    if detail is not None:
+        name = f"{name} {detail}"
+    s = Span(name, trace._stack[-1], attributes)
+    trace.spans.append(s)  # in start order, for the waterfall
+    return _SpanContext(trace, s)
+
+
+def add_span(name: str, started: float, seconds: float, **attributes) -> None:
+    """
+    Record an already-finished span under the current one (e.g. time spent
+    inside a generator, which cannot hold a span open across yields).
+    started is a time.perf_counter() value.
+    """
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        return
+    s = Span(name, trace._stack[-1], attributes)
+    s.start_unix_ns -= int((s.start - started) * 1e9)
+    s.start = started
+    s.end = started + seconds
+    trace.spans.append(s)
+
+
+def current_trace_id() -> Optional[str]:
+    trace = getattr(_local, "trace", None)
+    return trace.trace_id if trace is not None else None
+
+
+def traced(prefix: str):
+    """
+    Class decorator: every public method runs in a span named
+    '<prefix>.<method>' (used for the service layer).
+    """
+    def decorate(cls):
+        for attr, fn in list(vars(cls).items()):
+            if attr.startswith("_") or not callable(fn) or isinstance(fn, (staticmethod, classmethod)):
+                continue
+
+            def wrap(fn, name):
+                @functools.wraps(fn)
+                def run(*args, **kwargs):
+                    if getattr(_local, "trace", None) is None:
+                        return fn(*args, **kwargs)
+                    with span(name):
+                        return fn(*args, **kwargs)
+                return run
+
+            setattr(cls, attr, wrap(fn, f"{prefix}.{attr}"))
+        return cls
+    return decorate
+
+
+# ---------------------------------------------------------- #
+# OUTPUT
+# ---------------------------------------------------------- #
+def format_waterfall(trace, width: int = 40) -> str:
+    """Timing waterfall: offset, duration and a bar per span, indented by depth."""
+    if not trace.spans:
+        return ""
+    root = trace.root
+    total = max(root.duration_ms, 1e-6)
+    lines = [
+        f"trace {trace.trace_id}  {root.attributes.get('command', root.name)}  {total:.3f} ms",
+        f"{'START_MS':>10} {'DUR_MS':>10}  {'':<{width}}  SPAN",
+    ]
+    for s in sorted(trace.spans, key=lambda sp: sp.start):
+        offset = (s.start - root.start) * 1000.0
+        dur = s.duration_ms
+        lo = min(width - 1, int(offset / total * width))
+        n = max(1, min(width - lo, round(dur / total * width)))
+        bar = " " * lo + "█" * n + " " * (width - lo - n)
+        mark = " !" if s.error else ""
+        lines.append(f"{offset:>10.3f} {dur:>10.3f}  {bar}  {'  ' * s.depth}{s.name}{mark}")
+    return "\n".join(lines)
+
+
+def _otel_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otel(trace: Trace) -> List[dict]:
+    """Spans in OTLP/JSON field naming."""
+    out = []
+    for s in trace.spans:
+        end = s.end if s.end is not None else s.start
+        item = {
+            "traceId": trace.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": "SPAN_KIND_INTERNAL",
+            "startTimeUnixNano": str(s.start_unix_ns),
+            "endTimeUnixNano": str(s.start_unix_ns + int((end - s.start) * 1e9)),
+            "attributes": [{"key": k, "value": _otel_value(v)} for k, v in s.attributes.items()],
+            "status": {"code": "STATUS_CODE_ERROR", "message": s.error} if s.error
+                      else {"code": "STATUS_CODE_OK"},
+        }
+        if s.parent_id is not None:
+            item["parentSpanId"] = s.parent_id
+        out.append(item)
+    return out
+
+
+class JsonFileExporter:
+    """Appends each finished trace to a file, one JSON span per line."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def export(self, trace: Trace) -> None:
+        text = "".join(json.dumps(s) + "\n" for s in to_otel(trace))
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "a", buffering=1 << 16)
+            self._file.write(text)
+            self._file.flush()
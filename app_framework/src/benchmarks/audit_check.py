@@ -0,0 +1,100 @@
+"""
+Regression check for the query audit on a large dataset.
+
+Loads enough campaigns that every paged read (campaign.page_after,
+channel.page_after, the xref keyset loops) and every chunked job (IN
+chunks, db:purge) runs well past max_per_template, then runs the
+commands below with --audit-queries fail semantics. Each must pass:
+paged and chunked templates run once per page by design. A deliberate
+one-get-per-id loop must still be reported, so the audit is not simply off.
+
+    python -m benchmarks.audit_check --standin
+    python -m benchmarks.audit_check --standin --campaigns 20000
+
+Run from app_framework/src. Exits 1 when a command fails the audit.
+"""
+
+import contextlib
+import io
+import sys
+from argparse import ArgumentParser
+from datetime import date
+
+from Campaigns_and_Channels.data_layer.campaign_dao import CampaignDAO
+from Campaigns_and_Channels.data_layer.db import DB
+from Campaigns_and_Channels.data_layer.instrumentation import DBStats
+from Campaigns_and_Channels.data_layer.query_audit import QueryAudit
+from Campaigns_and_Channels.presentation_layer.batch import BatchUserInterface, _ThreadOutput
+
+from . import generator, standin
+
+COMMANDS = (
+    "campaign:list --all --format ndjson",
+    "campaign:list --all --format csv",
+    "channel:list --all --format ndjson",
+    "inspect:db --format ndjson",
+    "campaign:metrics:verify",
+    "db:purge --retention-days 1 --only metrics --archive --chunk-rows 100 --throttle-ms 0",
+    "db:purge --retention-days 1 --only campaigns --chunk-rows 100 --throttle-ms 0",
+)
+
+
+def run_command(ui: BatchUserInterface, line: str) -> tuple:
+    """(ok, audit report) for one command; its output is discarded."""
+    out, err = _ThreadOutput(io.StringIO()), io.StringIO()
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+        result = ui.run_command(0, line, out)
+    return result["ok"], err.getvalue()
+
+
+def control_finds_n_plus_one(ids) -> bool:
+    """One campaign.get per id must still be an n+1 finding."""
+    dao = CampaignDAO()
+    with QueryAudit.scope("control") as audit:
+        for cid in ids:
+            dao.get(cid)
+    report = QueryAudit.check(audit) or ""
+    return "n+1" in report
+
+
+def main():
+    parser = ArgumentParser(
+        prog="benchmarks.audit_check",
+        description="Check that paged and chunked commands pass the query audit.")
+    parser.add_argument("--standin", nargs="?", const="", metavar="SQLITE_FILE", required=True,
+                        help="Use the SQLite stand-in (temp file unless a path is given).")
+    parser.add_argument("--campaigns", type=int, default=6000)
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--days", type=int, default=3)
+    args = parser.parse_args()
+
+    config = {"database": {"pool": {"name": "standin", "size": 10}}}
+    DBStats.configure(config)
+    standin.install(args.standin or None)
+    # dated in the past so both purge jobs have old rows to remove
+    dataset = generator.generate(
+        campaigns=args.campaigns, channels=args.channels, days=args.days,
+        start=date(2020, 1, 1), reset_first=True,
+    )
+    ui = BatchUserInterface(config)
+    QueryAudit.configure(config, mode="fail")
+
+    failed = 0
+    for line in COMMANDS:
+        ok, report = run_command(ui, line)
+        print(f"{'ok' if ok else 'FAIL':<5} {line}")
+        if not ok:
+            failed += 1
+            print(report, file=sys.stderr)
+
+    control = control_finds_n_plus_one(dataset["campaign_ids"][:QueryAudit.max_per_template + 1])
+    print(f"{'ok' if control else 'FAIL':<5} control: per-id campaign.get reported as n+1")
+    failed += 0 if control else 1
+
+    ui.svc.close()
+    DB.close_pool()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
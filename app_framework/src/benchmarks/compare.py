@@ -0,0 +1,206 @@
+"""
+Performance regression gate: compare two benchmark result files.
+
+For every scenario present in both runs this bootstraps confidence
+intervals for the candidate/baseline ratio of
+  - median latency (p50), and
+  - mean latency (the inverse of throughput),
+estimates run-to-run noise from the baseline's own resampling spread,
+and compares queries per operation so new N+1 patterns are caught.
+
+A scenario regresses when the slowdown is statistically significant (the
+CI excludes "no change") AND the point estimate exceeds the threshold,
+which is raised to noise_multiplier x the measured noise when the
+baseline is noisier than the threshold. Any increase in queries per op
+beyond --query-tolerance also fails.
+
+Run from app_framework/src:
+    python -m benchmarks.compare base.json candidate.json --threshold 0.10
+
+Exits with status 1 when anything regressed.
+"""
+
+import json
+import random
+import statistics
+import sys
+from argparse import ArgumentParser
+
+
+def load(path: str) -> dict:
+    with open(path, "r") as f:
+        return json.loads(f.read())
+
+
+def _median(xs):
+    return statistics.median(xs)
+
+
+def _mean(xs):
+    return statistics.fmean(xs)
+
+
+def bootstrap_ratio(base, cand, stat, resamples: int, confidence: float, rng) -> tuple:
+    """Percentile-bootstrap CI for stat(cand) / stat(base)."""
+    ratios = []
+    nb, nc = len(base), len(cand)
+    for _ in range(resamples):
+        b = stat(rng.choices(base, k=nb))
+        c = stat(rng.choices(cand, k=nc))
+        ratios.append(c / b if b > 0 else 1.0)
+    ratios.sort()
+    alpha = (1.0 - confidence) / 2.0
+    lo = ratios[int(alpha * (resamples - 1))]
+    hi = ratios[int((1.0 - alpha) * (resamples - 1))]
+    point = stat(cand) / stat(base) if stat(base) > 0 else 1.0
+    return point, lo, hi
+
+
+def noise(samples, stat, resamples: int, confidence: float, rng) -> float:
+    """Relative half-width of the bootstrap CI of stat over one run."""
+    values = sorted(stat(rng.choices(samples, k=len(samples))) for _ in range(resamples))
+    alpha = (1.0 - confidence) / 2.0
+    lo = values[int(alpha * (resamples - 1))]
+    hi = values[int((1.0 - alpha) * (resamples - 1))]
+    center = stat(samples)
+    return ((hi - lo) / 2.0 / center) if center > 0 else 0.0
+
+
+def compare(base_doc: dict, cand_doc: dict, threshold: float = 0.10,
+            throughput_threshold: float = None, noise_multiplier: float = 2.0,
+            query_tolerance: float = 0.0, confidence: float = 0.95,
+            resamples: int = 2000, seed: int = 1) -> dict:
+    """Return {"rows": [...], "regressions": [...], "warnings": [...]}."""
+    rng = random.Random(seed)
+    if throughput_threshold is None:
+        throughput_threshold = threshold
+
+    warnings = []
+    for key in ("backend", "dataset"):
+        b = base_doc.get("meta", {}).get(key)
+        c = cand_doc.get("meta", {}).get(key)
+        if b != c:
+            warnings.append(f"meta.{key} differs: {b} vs {c}")
+
+    base = base_doc["scenarios"]
+    cand = cand_doc["scenarios"]
+    for name in sorted(set(base) - set(cand)):
+        warnings.append(f"scenario removed: {name}")
+    for name in sorted(set(cand) - set(base)):
+        warnings.append(f"scenario added: {name}")
+
+    rows, regressions = [], []
+    for name in sorted(set(base) & set(cand)):
+        b, c = base[name], cand[name]
+        bs, cs = b["samples_ms"], c["samples_ms"]
+
+        p50, p50_lo, p50_hi = bootstrap_ratio(bs, cs, _median, resamples, confidence, rng)
+        mean, mean_lo, mean_hi = bootstrap_ratio(bs, cs, _mean, resamples, confidence, rng)
+        run_noise = noise(bs, _median, resamples, confidence, rng)
+
+        lat_limit = max(threshold, noise_multiplier * run_noise)
+        tput_limit = max(throughput_threshold, noise_multiplier * run_noise)
+        reasons = []
+        if p50_lo > 1.0 and p50 > 1.0 + lat_limit:
+            reasons.append(f"p50 latency +{(p50 - 1) * 100:.1f}% (limit {lat_limit * 100:.1f}%)")
+        # throughput = 1 / mean latency
+        tput_change = (1.0 / mean) - 1.0 if mean > 0 else 0.0
+        if mean_lo > 1.0 and -tput_change > tput_limit:
+            reasons.append(f"throughput {tput_change * 100:.1f}% (limit -{tput_limit * 100:.1f}%)")
+
+        bq = b.get("queries_per_op")
+        cq = c.get("queries_per_op")
+        if bq is not None and cq is not None and cq > bq + query_tolerance:
+            reasons.append(f"queries/op {bq:.1f} -> {cq:.1f} (possible N+1)")
+
+        row = {
+            "scenario": name,
+            "base_p50_ms": b["p50_ms"],
+            "cand_p50_ms": c["p50_ms"],
+            "p50_ratio": p50,
+            "p50_ci": [p50_lo, p50_hi],
+            "throughput_change": tput_change,
+            "mean_ci": [mean_lo, mean_hi],
+            "noise": run_noise,
+            "base_queries_per_op": bq,
+            "cand_queries_per_op": cq,
+            "regressed": bool(reasons),
+            "reasons": reasons,
+        }
+        rows.append(row)
+        if reasons:
+            regressions.append(row)
+
+    return {"rows": rows, "regressions": regressions, "warnings": warnings}
+
+
+def print_report(result: dict, base_meta: dict, cand_meta: dict, out=sys.stdout) -> None:
+    print(f"\nbaseline  : {base_meta.get('commit')} ({base_meta.get('timestamp')})", file=out)
+    print(f"candidate : {cand_meta.get('commit')} ({cand_meta.get('timestamp')})\n", file=out)
+    for w in result["warnings"]:
+        print(f"warning: {w}", file=out)
+
+    print(f"\n{'SCENARIO':<44} {'BASE_P50':>9} {'CAND_P50':>9} {'P50 Δ':>8} "
+          f"{'95% CI':>17} {'TPUT Δ':>8} {'NOISE':>7} {'Q/OP':>11}  ", file=out)
+    for r in result["rows"]:
+        q = ""
+        if r["base_queries_per_op"] is not None and r["cand_queries_per_op"] is not None:
+            q = f"{r['base_queries_per_op']:.0f}->{r['cand_queries_per_op']:.0f}"
+        ci = f"[{(r['p50_ci'][0] - 1) * 100:+.0f}%,{(r['p50_ci'][1] - 1) * 100:+.0f}%]"
+        flag = "REGRESSED" if r["regressed"] else ""
+        print(f"{r['scenario']:<44.44} {r['base_p50_ms']:>9.3f} {r['cand_p50_ms']:>9.3f} "
+              f"{(r['p50_ratio'] - 1) * 100:>+7.1f}% {ci:>17} "
+              f"{r['throughput_change'] * 100:>+7.1f}% {r['noise'] * 100:>6.1f}% {q:>11}  {flag}",
+              file=out)
+
+    if result["regressions"]:
+        print(f"\n{len(result['regressions'])} scenario(s) regressed:", file=out)
+        for r in result["regressions"]:
+            print(f"  - {r['scenario']}: {'; '.join(r['reasons'])}", file=out)
+    else:
+        print("\nno regressions", file=out)
+
+
+def main():
+    parser = ArgumentParser(
+        prog="benchmarks.compare",
+        description="Compare two benchmark result files and fail on regressions.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Max tolerated p50 latency increase (fraction, default 0.10).")
+    parser.add_argument("--throughput-threshold", type=float, default=None,
+                        help="Max tolerated throughput drop (fraction, default = --threshold).")
+    parser.add_argument("--noise-multiplier", type=float, default=2.0,
+                        help="Raise limits to this multiple of measured run-to-run noise.")
+    parser.add_argument("--query-tolerance", type=float, default=0.0,
+                        help="Allowed increase in queries per operation.")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--resamples", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Also write the comparison as JSON to this file.")
+    args = parser.parse_args()
+
+    base_doc = load(args.baseline)
+    cand_doc = load(args.candidate)
+    result = compare(
+        base_doc, cand_doc,
+        threshold=args.threshold,
+        throughput_threshold=args.throughput_threshold,
+        noise_multiplier=args.noise_multiplier,
+        query_tolerance=args.query_tolerance,
+        confidence=args.confidence,
+        resamples=args.resamples,
+        seed=args.seed,
+    )
+    print_report(result, base_doc.get("meta", {}), cand_doc.get("meta", {}))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            f.write(json.dumps(result, indent=2))
+
+    sys.exit(1 if result["regressions"] else 0)
+
+
+if __name__ == "__main__":
+    main()
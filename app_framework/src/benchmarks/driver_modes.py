@@ -0,0 +1,123 @@
+"""
+Rows/sec benchmark for MySQL driver and cursor modes.
+
+For each driver (pure Python parser, C extension) and cursor mode
+(text protocol, binary/prepared protocol, raw undecoded rows) this
+rebuilds the pool and times:
+  - CampaignChannelXrefDAO.list_all_mappings
+  - a full campaign_daily_metrics scan
+
+Run from app_framework/src:
+    python -m benchmarks.driver_modes -c ../config/IT566_app_config.json -r 5
+"""
+
+import copy
+import json
+import statistics
+import time
+from argparse import ArgumentParser
+
+from Campaigns_and_Channels.data_layer.db import DB, row_to_dict
+from Campaigns_and_Channels.data_layer.driver import have_cext
+from Campaigns_and_Channels.data_layer.query_registry import QUERIES
+from Campaigns_and_Channels.data_layer.campaign_channel_xref_dao import CampaignChannelXrefDAO
+
+
+_METRICS_SCAN = QUERIES.register("bench.metrics_scan", """
+    SELECT campaign_id, metric_date, impressions, clicks, spend_cents, revenue_cents
+    FROM campaign_daily_metrics
+    ORDER BY campaign_id, metric_date
+""")
+
+CURSOR_MODES = ("text", "prepared", "raw")
+
+
+def scan(template, raw: bool) -> int:
+    """Execute template, materialize every row as a dict, return row count."""
+    conn = DB.get_connection()
+    try:
+        cur = DB.execute(conn, template, raw=raw)
+        rows = cur.fetchall()
+        if not raw:
+            rows = [row_to_dict(cur, r) for r in rows]
+        return len(rows)
+    finally:
+        conn.close()
+
+
+def time_case(fn, repeats: int) -> dict:
+    rates = []
+    rows = 0
+    fn()  # warm-up (prepares statements, fills caches)
+    for _ in range(repeats):
+        started = time.perf_counter()
+        rows = fn()
+        elapsed = time.perf_counter() - started
+        rates.append(rows / elapsed if elapsed > 0 else 0.0)
+    return {
+        "rows": rows,
+        "median_rows_per_sec": statistics.median(rates),
+        "best_rows_per_sec": max(rates),
+    }
+
+
+def bench(config: dict, repeats: int) -> dict:
+    drivers = ["pure"] + (["cext"] if have_cext() else [])
+    xref = CampaignChannelXrefDAO()
+    mappings = QUERIES.get("xref.list_all_mappings")
+    results = {}
+
+    for driver in drivers:
+        cfg = copy.deepcopy(config)
+        cfg["database"]["driver"] = driver
+        cfg["database"]["pool"]["reset_session"] = False
+        DB.close_pool()
+        DB.init_pool(cfg)
+        DB.warm_up()
+
+        for mode in CURSOR_MODES:
+            DB.set_prepared(mode == "prepared")
+            raw = (mode == "raw")
+            if raw:
+                mappings_fn = lambda: scan(mappings, raw=True)
+            else:
+                mappings_fn = lambda: len(xref.list_all_mappings())
+            results[f"{driver}/{mode}/list_all_mappings"] = time_case(mappings_fn, repeats)
+            results[f"{driver}/{mode}/metrics_scan"] = time_case(
+                lambda: scan(_METRICS_SCAN, raw=raw), repeats
+            )
+
+    DB.close_pool()
+    return results
+
+
+def main():
+    parser = ArgumentParser(
+        prog="benchmarks.driver_modes",
+        description="Measure rows/sec per MySQL driver and cursor mode.")
+    parser.add_argument("-c", "--configfile", required=True,
+                        help="Configuration file to load.")
+    parser.add_argument("-r", "--repeats", type=int, default=5)
+    parser.add_argument("-o", "--output", help="Also write results as JSON to this file.")
+    args = parser.parse_args()
+
+    with open(args.configfile, "r") as f:
+        config = json.loads(f.read())
+
+    if not have_cext():
+        print("MySQL C extension not installed: only the pure driver is measured.")
+
+    results = bench(config, args.repeats)
+
+    print(f"\n{'CASE':<40} {'ROWS':>9} {'MEDIAN ROWS/S':>15} {'BEST ROWS/S':>14}")
+    for name, r in results.items():
+        print(f"{name:<40} {r['rows']:>9} "
+              f"{r['median_rows_per_sec']:>15.0f} {r['best_rows_per_sec']:>14.0f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Deterministic synthetic data generator for benchmarks.
+
+generate() creates N campaigns, M channels, links each campaign to about
+density * M channels and writes D days of daily metrics per campaign.
+The same (seed, sizes) always produce the same rows. Everything is loaded
+through bulk paths: multi-row executemany INSERTs for the core tables and
+CampaignChannelXrefDAO.upsert_campaign_daily_metrics_many for metrics.
+
+Rows are tagged with a name prefix ("bench<seed>-") so a run can be
+repeated against an existing database; reset=True wipes the four core
+tables first and must only be used on a dedicated benchmark database.
+"""
+
+import random
+import time
+from datetime import date, timedelta
+
+from Campaigns_and_Channels.data_layer.db import DB
+from Campaigns_and_Channels.data_layer.query_registry import QUERIES
+from Campaigns_and_Channels.data_layer.campaign_channel_xref_dao import CampaignChannelXrefDAO
+
+
+CHANNEL_TYPES = ("search", "social", "display", "email", "video", "Other")
+STATUSES = ("draft", "active", "active", "active", "paused", "archived")
+
+_INSERT_CHANNEL = QUERIES.register(
+    "bench.insert_channel",
+    "INSERT INTO channel (name, type) VALUES (%s, %s)",
+    prepared=False,
+)
+_INSERT_CAMPAIGN = QUERIES.register("bench.insert_campaign", """
+    INSERT INTO campaign (name, start_date, end_date, status, budget_cents)
+    VALUES (%s, %s, %s, %s, %s)
+""", prepared=False)
+_INSERT_LINK = QUERIES.register(
+    "bench.insert_link",
+    "INSERT IGNORE INTO campaign_channel_xref (campaign_id, channel_id) VALUES (%s, %s)",
+    prepared=False,
+)
+_CHANNEL_IDS = QUERIES.register(
+    "bench.channel_ids",
+    "SELECT channel_id FROM channel WHERE name LIKE %s ORDER BY channel_id",
+    prepared=False,
+)
+_CAMPAIGN_IDS = QUERIES.register(
+    "bench.campaign_ids",
+    "SELECT campaign_id FROM campaign WHERE name LIKE %s ORDER BY campaign_id",
+    prepared=False,
+)
+_RESET = [
+    QUERIES.register(f"bench.reset.{t}", f"DELETE FROM {t}", prepared=False)
+    for t in ("campaign_daily_metrics", "campaign_channel_xref", "campaign", "channel")
+]
+
+
+def _chunks(rows, size):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def _bulk_insert(template, rows, chunk: int) -> None:
+    conn = DB.get_connection()
+    try:
+        for part in _chunks(rows, chunk):
+            DB.executemany(conn, template, part)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _ids(template, prefix: str):
+    conn = DB.get_connection()
+    try:
+        cur = DB.execute(conn, template, (prefix + "%",))
+        return [r[0] for r in cur.fetchall()]
+    finally:
+        conn.close()
+
+
+def reset() -> None:
+    """Delete all rows from the core tables (children first)."""
+    conn = DB.get_connection()
+    try:
+        for template in _RESET:
+            DB.execute(conn, template)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def generate(
+    campaigns: int = 200,
+    channels: int = 50,
+    density: float = 0.1,
+    days: int = 90,
+    seed: int = 42,
+    start: date = date(2025, 1, 1),
+    chunk: int = 1000,
+    reset_first: bool = False,
+) -> dict:
+    """
+    Load a synthetic dataset and return a summary:
+      {campaign_ids, channel_ids, links, metric_rows, start, end, seconds}
+    """
+    rng = random.Random(seed)
+    prefix = f"bench{seed}-"
+    started = time.perf_counter()
+
+    if reset_first:
+        reset()
+
+    channel_rows = [
+        (f"{prefix}channel-{i:06d}", rng.choice(CHANNEL_TYPES)) for i in range(channels)
+    ]
+    _bulk_insert(_INSERT_CHANNEL, channel_rows, chunk)
+    channel_ids = _ids(_CHANNEL_IDS, prefix)
+
+    end = start + timedelta(days=max(days, 1) - 1)
+    campaign_rows = [
+        (
+            f"{prefix}campaign-{i:06d}",
+            start,
+            end,
+            rng.choice(STATUSES),
+            rng.randrange(100_000, 10_000_000, 100),
+        )
+        for i in range(campaigns)
+    ]
+    _bulk_insert(_INSERT_CAMPAIGN, campaign_rows, chunk)
+    campaign_ids = _ids(_CAMPAIGN_IDS, prefix)
+
+    per_campaign = max(1, round(density * len(channel_ids))) if channel_ids else 0
+    link_rows = []
+    for cid in campaign_ids:
+        for chid in rng.sample(channel_ids, min(per_campaign, len(channel_ids))):
+            link_rows.append((cid, chid))
+    _bulk_insert(_INSERT_LINK, link_rows, chunk)
+
+    xref = CampaignChannelXrefDAO()
+    metric_rows = 0
+    batch = []
+    for cid in campaign_ids:
+        for d in range(days):
+            impressions = rng.randint(100, 50_000)
+            clicks = int(impressions * rng.uniform(0.002, 0.06))
+            spend = int(clicks * rng.uniform(20, 250))
+            revenue = int(spend * rng.uniform(0.2, 6.0))
+            batch.append((cid, start + timedelta(days=d), impressions, clicks, spend, revenue))
+            if len(batch) >= chunk:
+                metric_rows += xref.upsert_campaign_daily_metrics_many(batch)
+                batch = []
+    if batch:
+        metric_rows += xref.upsert_campaign_daily_metrics_many(batch)
+
+    return {
+        "campaign_ids": campaign_ids,
+        "channel_ids": channel_ids,
+        "links": len(link_rows),
+        "metric_rows": metric_rows,
+        "start": start,
+        "end": end,
+        "seconds": time.perf_counter() - started,
+    }
@@ -0,0 +1,515 @@
+"""
+Concurrent load generator: many simulated CLI operators at once.
+
+Each worker loops for --duration seconds (or --ops operations), picking an
+operation from a weighted mix of categories
+
+    read   campaign:get, campaign:list, channel:list, campaign:channels
+    write  campaign:add, campaign:set-status, campaign:metrics:upsert,
+           campaign:metrics:increment
+    link   link, unlink (random pairs, so workers contend on the same rows)
+    perf   campaign:perf (all time and a 30-day range)
+
+and runs it either through UserInterface.handle() (--target ui, the
+default: parsing, dispatch and rendering included, output discarded) or
+straight against CampaignService (--target service).
+
+Workers are threads sharing one process's connection pool, optionally
+spread over several processes (--processes) to get past the GIL. The
+report covers throughput, latency percentiles per operation and category,
+pool contention (checkout wait, pool-exhausted errors) and lock problems:
+deadlocks and lock-wait timeouts seen by clients, plus InnoDB row-lock
+wait counters when running against MySQL.
+
+Run from app_framework/src:
+    python -m benchmarks.load --standin --workers 16 --duration 20
+    python -m benchmarks.load -c ../config/bench_config.json --processes 4 --workers 8 \\
+        --mix read=60,write=25,link=10,perf=5 -o load.json
+"""
+
+import contextlib
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from argparse import ArgumentParser
+from datetime import date, timedelta
+
+from Campaigns_and_Channels.data_layer.db import DB
+from Campaigns_and_Channels.data_layer.instrumentation import DBStats
+from Campaigns_and_Channels.data_layer.query_registry import QUERIES
+from Campaigns_and_Channels.presentation_layer.user_interface import UserInterface
+
+from . import generator, standin
+from .run import git_commit
+from .scenarios import Context
+
+
+CATEGORIES = ("read", "write", "link", "perf")
+DEFAULT_MIX = "read=60,write=25,link=10,perf=5"
+
+_LOCK_STATUS = QUERIES.register(
+    "bench.lock_status",
+    "SHOW GLOBAL STATUS LIKE 'Innodb_row_lock%'",
+    prepared=False,
+)
+_DEADLOCKS = QUERIES.register(
+    "bench.deadlocks",
+    "SELECT `COUNT` FROM information_schema.INNODB_METRICS WHERE NAME = 'lock_deadlocks'",
+    prepared=False,
+)
+
+
+class Op:
+    """One operation: the CLI line and the equivalent service call."""
+
+    def __init__(self, category: str, name: str, line, call) -> None:
+        self.category = category
+        self.name = name
+        self.line = line  # (ctx, rng) -> command line
+        self.call = call  # (ctx, rng) -> None
+
+
+def _cid(c, r):
+    return r.choice(c.data["campaign_ids"])
+
+
+def _chid(c, r):
+    return r.choice(c.data["channel_ids"])
+
+
+def _day(c, r):
+    return c.day(r.randrange(1 << 16))
+
+
+def _range(c, r):
+    start = _day(c, r)
+    return start, start + timedelta(days=29)
+
+
+OPS = [
+    Op("read", "campaign:get",
+       lambda c, r: f"campaign:get {_cid(c, r)}",
+       lambda c, r: c.svc.get_campaign(_cid(c, r))),
+    Op("read", "campaign:list",
+       lambda c, r: "campaign:list",
+       lambda c, r: c.svc.list_campaigns(limit=50)),
+    Op("read", "channel:list",
+       lambda c, r: "channel:list",
+       lambda c, r: c.svc.list_channels(limit=100)),
+    Op("read", "campaign:channels",
+       lambda c, r: f"campaign:channels {_cid(c, r)}",
+       lambda c, r: c.svc.list_channels_for_campaign(_cid(c, r))),
+
+    Op("write", "campaign:add",
+       lambda c, r: f"campaign:add {c.unique('load')} 2025-01-01 2025-03-31 1000",
+       lambda c, r: c.svc.create_campaign(c.unique("load"), c.data["start"], c.data["end"], 1000)),
+    Op("write", "campaign:set-status",
+       lambda c, r: f"campaign:set-status {_cid(c, r)} {r.choice(('active', 'paused'))}",
+       lambda c, r: c.svc.set_campaign_status(_cid(c, r), r.choice(("active", "paused")))),
+    Op("write", "campaign:metrics:upsert",
+       lambda c, r: f"campaign:metrics:upsert {_cid(c, r)} {_day(c, r)} 100 5 250 900",
+       lambda c, r: c.svc.upsert_campaign_daily_metrics(_cid(c, r), _day(c, r), 100, 5, 250, 900)),
+    Op("write", "campaign:metrics:increment",
+       lambda c, r: f"campaign:metrics:increment {_cid(c, r)} {_day(c, r)} 10 1 25 90",
+       lambda c, r: c.svc.increment_campaign_daily_metrics(_cid(c, r), _day(c, r), 10, 1, 25, 90)),
+
+    Op("link", "link",
+       lambda c, r: f"link {_cid(c, r)} {_chid(c, r)}",
+       lambda c, r: c.svc.attach_channel(_cid(c, r), _chid(c, r))),
+    Op("link", "unlink",
+       lambda c, r: f"unlink {_cid(c, r)} {_chid(c, r)}",
+       lambda c, r: c.svc.detach_channel(_cid(c, r), _chid(c, r))),
+
+    Op("perf", "campaign:perf",
+       lambda c, r: f"campaign:perf {_cid(c, r)}",
+       lambda c, r: c.svc.get_campaign_performance(_cid(c, r))),
+    Op("perf", "campaign:perf.range",
+       lambda c, r: "campaign:perf {} {} {}".format(_cid(c, r), *_range(c, r)),
+       lambda c, r: c.svc.get_campaign_performance(_cid(c, r), *_range(c, r))),
+]
+
+
+def parse_mix(text: str) -> dict:
+    """'read=60,write=25,...' -> {category: weight}; unknown categories are errors."""
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in CATEGORIES:
+            raise ValueError(f"unknown mix category {name!r} (expected one of {', '.join(CATEGORIES)})")
+        mix[name] = float(weight or 1)
+    if not any(w > 0 for w in mix.values()):
+        raise ValueError("mix needs at least one category with a positive weight")
+    return mix
+
+
+def classify(error) -> str:
+    """Bucket an exception (or UI error message) into a contention class."""
+    errno = getattr(error, "errno", None)
+    text = str(error).lower()
+    if "pool exhausted" in text or type(error).__name__ == "PoolError":
+        return "pool_exhausted"
+    if errno == 1213 or "deadlock" in text:
+        return "deadlock"
+    if errno == 1205 or "lock wait timeout" in text or "database is locked" in text:
+        return "lock_wait_timeout"
+    return "error"
+
+
+class _LoadUI(UserInterface):
+    """UserInterface that reports handled errors to the worker instead of printing them."""
+
+    _last_error = threading.local()
+
+    def print_error(self, msg: str):
+        self._last_error.value = msg
+
+    def take_error(self):
+        msg = getattr(self._last_error, "value", None)
+        self._last_error.value = None
+        return msg
+
+
+# ---------------------------------------------------------- #
+# WORKERS
+# ---------------------------------------------------------- #
+def _worker(ctx, ui, target, weights, ops_by_cat, seed, deadline, max_ops, think_ms, barrier, out):
+    rng = random.Random(seed)
+    cats = list(weights)
+    cat_weights = [weights[c] for c in cats]
+    samples = {}
+    errors = {}
+    examples = {}
+    done = 0
+
+    barrier.wait()
+    while (max_ops is None or done < max_ops) and time.perf_counter() < deadline:
+        op = rng.choice(ops_by_cat[rng.choices(cats, cat_weights)[0]])
+        err = None
+        started = time.perf_counter()
+        try:
+            if target == "ui":
+                ui.handle(op.line(ctx, rng))
+                err = ui.take_error()
+            else:
+                op.call(ctx, rng)
+        except Exception as e:
+            err = e
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        done += 1
+
+        if err is None:
+            samples.setdefault(op.name, []).append(elapsed_ms)
+        else:
+            kind = classify(err)
+            errors.setdefault(op.name, {}).setdefault(kind, 0)
+            errors[op.name][kind] += 1
+            examples.setdefault(kind, str(err))
+        if think_ms:
+            time.sleep(rng.uniform(0, 2 * think_ms) / 1000.0)
+
+    out.append({"samples": samples, "errors": errors, "examples": examples})
+
+
+def _setup_process(spec: dict):
+    """Connect this process to the benchmark database."""
+    config = spec["config"]
+    if spec["backend"] == "standin":
+        DBStats.configure(config)
+        standin.install(spec["standin_path"], size=config["database"]["pool"]["size"])
+    else:
+        DB.init_pool(config)
+        DB.warm_up()
+    return _LoadUI(config)
+
+
+def run_process(spec: dict) -> dict:
+    """Run spec["workers"] threads in this process and return raw results."""
+    ui = _setup_process(spec) if spec.get("setup", True) else spec["ui"]
+    ctx = Context(ui.svc, ui, spec["dataset"])
+    weights = {c: w for c, w in spec["mix"].items() if w > 0}
+    ops_by_cat = {c: [op for op in OPS if op.category == c] for c in weights}
+
+    DBStats.reset()
+    barrier = threading.Barrier(spec["workers"] + 1)
+    out = []
+    deadline = time.perf_counter() + spec["duration"]
+    threads = [
+        threading.Thread(
+            target=_worker,
+            args=(ctx, ui, spec["target"], weights, ops_by_cat,
+                  spec["seed"] * 1000 + spec["index"] * 100 + w,
+                  deadline, spec["ops"], spec["think_ms"], barrier, out),
+            daemon=True,
+        )
+        for w in range(spec["workers"])
+    ]
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for t in threads:
+            t.start()
+        started = time.perf_counter()
+        barrier.wait()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+        ui.svc.flush_metrics()
+
+    result = {"elapsed": elapsed, "workers": out, "pool": DBStats.pool_stats()}
+    if spec.get("setup", True):
+        ui.svc.close()
+        DB.close_pool()
+    return result
+
+
+# ---------------------------------------------------------- #
+# SERVER-SIDE LOCK COUNTERS (MySQL only)
+# ---------------------------------------------------------- #
+def lock_counters() -> dict:
+    """InnoDB row-lock wait and deadlock counters, or {} when unavailable."""
+    out = {}
+    conn = DB.get_connection()
+    try:
+        try:
+            for name, value in DB.execute(conn, _LOCK_STATUS).fetchall():
+                out[name if isinstance(name, str) else name.decode()] = int(value)
+        except Exception:
+            pass
+        try:
+            rows = DB.execute(conn, _DEADLOCKS).fetchall()
+            if rows:
+                out["lock_deadlocks"] = int(rows[0][0])
+        except Exception:
+            pass
+    finally:
+        conn.close()
+    return out
+
+
+# ---------------------------------------------------------- #
+# REPORT
+# ---------------------------------------------------------- #
+def _percentiles(samples: list) -> dict:
+    if not samples:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    s = sorted(samples)
+    n = len(s)
+    return {
+        "p50_ms": s[n // 2],
+        "p95_ms": s[min(n - 1, int(n * 0.95))],
+        "p99_ms": s[min(n - 1, int(n * 0.99))],
+        "max_ms": s[-1],
+    }
+
+
+def summarize(results: list, elapsed: float) -> dict:
+    by_op, errs_by_op, examples = {}, {}, {}
+    for proc in results:
+        for w in proc["workers"]:
+            for name, xs in w["samples"].items():
+                by_op.setdefault(name, []).extend(xs)
+            for name, kinds in w["errors"].items():
+                for kind, n in kinds.items():
+                    errs_by_op.setdefault(name, {}).setdefault(kind, 0)
+                    errs_by_op[name][kind] += n
+            for kind, msg in w["examples"].items():
+                examples.setdefault(kind, msg)
+
+    category_of = {op.name: op.category for op in OPS}
+    ops, categories, errors = {}, {}, {}
+    for name in sorted(set(by_op) | set(errs_by_op)):
+        xs = by_op.get(name, [])
+        errs = errs_by_op.get(name, {})
+        ops[name] = {"category": category_of[name], "ok": len(xs), "errors": errs,
+                     "ops_per_sec": len(xs) / elapsed if elapsed else 0.0}
+        ops[name].update(_percentiles(xs))
+        cat = categories.setdefault(category_of[name], {"ok": 0, "errors": 0, "_samples": []})
+        cat["ok"] += len(xs)
+        cat["errors"] += sum(errs.values())
+        cat["_samples"].extend(xs)
+        for kind, n in errs.items():
+            errors[kind] = errors.get(kind, 0) + n
+    for cat in categories.values():
+        cat.update(_percentiles(cat.pop("_samples")))
+        cat["ops_per_sec"] = cat["ok"] / elapsed if elapsed else 0.0
+
+    pools = [p["pool"] for p in results]
+    pool = {
+        "checkouts": sum(p["checkouts"] for p in pools),
+        "pool_exhausted": sum(p["pool_exhausted"] for p in pools),
+        "slow_queries": sum(p["slow_queries"] for p in pools),
+        # histograms are per process; report the worst one
+        "wait_p50_ms": max(p["wait_p50_ms"] for p in pools),
+        "wait_p95_ms": max(p["wait_p95_ms"] for p in pools),
+        "wait_p99_ms": max(p["wait_p99_ms"] for p in pools),
+        "wait_max_ms": max(p["wait_max_ms"] for p in pools),
+    }
+    all_ok = sum(o["ok"] for o in ops.values())
+    everything = [x for xs in by_op.values() for x in xs]
+    return {
+        "elapsed_s": elapsed,
+        "ok": all_ok,
+        "failed": sum(errors.values()),
+        "throughput_ops_per_sec": all_ok / elapsed if elapsed else 0.0,
+        "latency": _percentiles(everything),
+        "categories": categories,
+        "ops": ops,
+        "errors": errors,
+        "error_examples": examples,
+        "pool": pool,
+    }
+
+
+def print_report(summary: dict, out=sys.stderr) -> None:
+    lat = summary["latency"]
+    print(f"\n{summary['ok']} ok, {summary['failed']} failed in {summary['elapsed_s']:.1f}s "
+          f"-> {summary['throughput_ops_per_sec']:.1f} ops/s  "
+          f"(p50 {lat['p50_ms']:.2f} / p95 {lat['p95_ms']:.2f} / p99 {lat['p99_ms']:.2f} ms)\n", file=out)
+
+    print(f"{'OPERATION':<28} {'CAT':<6} {'OK':>8} {'ERR':>6} {'OPS/S':>9} "
+          f"{'P50_MS':>9} {'P95_MS':>9} {'P99_MS':>9} {'MAX_MS':>9}", file=out)
+    for name, o in summary["ops"].items():
+        print(f"{name:<28} {o['category']:<6} {o['ok']:>8} {sum(o['errors'].values()):>6} "
+              f"{o['ops_per_sec']:>9.1f} {o['p50_ms']:>9.2f} {o['p95_ms']:>9.2f} "
+              f"{o['p99_ms']:>9.2f} {o['max_ms']:>9.2f}", file=out)
+    print("", file=out)
+    for name, c in sorted(summary["categories"].items()):
+        print(f"{name:<28} {'':<6} {c['ok']:>8} {c['errors']:>6} {c['ops_per_sec']:>9.1f} "
+              f"{c['p50_ms']:>9.2f} {c['p95_ms']:>9.2f} {c['p99_ms']:>9.2f} {c['max_ms']:>9.2f}", file=out)
+
+    p = summary["pool"]
+    print(f"\npool: {p['checkouts']} checkouts, {p['pool_exhausted']} exhausted, "
+          f"wait p50 {p['wait_p50_ms']:.3f} / p95 {p['wait_p95_ms']:.3f} / p99 {p['wait_p99_ms']:.3f} ms, "
+          f"{p['slow_queries']} slow queries", file=out)
+    if summary["errors"]:
+        print("errors: " + ", ".join(f"{k}={v}" for k, v in sorted(summary["errors"].items())), file=out)
+        for kind, msg in sorted(summary["error_examples"].items()):
+            print(f"  e.g. {kind}: {msg[:160]}", file=out)
+    if summary.get("server_locks"):
+        print("server: " + ", ".join(f"{k}={v}" for k, v in sorted(summary["server_locks"].items())), file=out)
+
+
+# ---------------------------------------------------------- #
+# MAIN
+# ---------------------------------------------------------- #
+def configure_and_parse_commandline_arguments():
+    parser = ArgumentParser(
+        prog="benchmarks.load",
+        description="Drive the CLI or service layer from many concurrent workers.")
+    backend = parser.add_mutually_exclusive_group(required=True)
+    backend.add_argument("-c", "--configfile", help="App config for a local MySQL server.")
+    backend.add_argument("--standin", nargs="?", const="", metavar="SQLITE_FILE",
+                         help="Use the SQLite stand-in (temp file unless a path is given).")
+    parser.add_argument("--target", choices=("ui", "service"), default="ui",
+                        help="Drive UserInterface.handle() or CampaignService directly.")
+    parser.add_argument("--workers", type=int, default=8, help="Threads per process.")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run.")
+    parser.add_argument("--ops", type=int, default=None, help="Stop each worker after this many ops.")
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help=f"Category weights (default {DEFAULT_MIX}).")
+    parser.add_argument("--think-ms", type=float, default=0.0,
+                        help="Mean pause between a worker's operations.")
+    parser.add_argument("--pool-size", type=int, default=None,
+                        help="Override database.pool.size for each process.")
+    parser.add_argument("--campaigns", type=int, default=200)
+    parser.add_argument("--channels", type=int, default=50)
+    parser.add_argument("--density", type=float, default=0.1)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true",
+                        help="Delete all rows from the core tables before loading.")
+    parser.add_argument("-o", "--output", help="Write the JSON summary to this file.")
+    return parser.parse_args()
+
+
+def main():
+    args = configure_and_parse_commandline_arguments()
+    mix = parse_mix(args.mix)
+
+    standin_path, remove_standin = None, False
+    if args.configfile:
+        with open(args.configfile, "r") as f:
+            config = json.loads(f.read())
+        backend = "mysql"
+    else:
+        config = {"database": {"pool": {"name": "standin", "size": 10}}}
+        backend = "standin"
+        standin_path = args.standin
+        if not standin_path:
+            # processes need a file they can all open
+            fd, standin_path = tempfile.mkstemp(prefix="it566_load_", suffix=".db")
+            os.close(fd)
+            remove_standin = True
+    if args.pool_size:
+        config["database"]["pool"]["size"] = args.pool_size
+
+    spec = {"config": config, "backend": backend, "standin_path": standin_path}
+    ui = _setup_process(spec)
+    dataset = generator.generate(
+        campaigns=args.campaigns,
+        channels=args.channels,
+        density=args.density,
+        days=args.days,
+        seed=args.seed,
+        reset_first=args.reset or backend == "standin",
+    )
+    print(f"loaded {len(dataset['campaign_ids'])} campaigns, {len(dataset['channel_ids'])} channels; "
+          f"{args.processes} x {args.workers} workers, target={args.target}, mix={args.mix}",
+          file=sys.stderr)
+
+    spec.update({
+        "dataset": dataset, "workers": args.workers, "duration": args.duration,
+        "ops": args.ops, "mix": mix, "target": args.target, "seed": args.seed,
+        "think_ms": args.think_ms,
+    })
+    locks_before = lock_counters() if backend == "mysql" else {}
+
+    started = time.perf_counter()
+    if args.processes <= 1:
+        results = [run_process(dict(spec, index=0, setup=False, ui=ui))]
+    else:
+        # spawn: children must not inherit the parent's open connections
+        mp = multiprocessing.get_context("spawn")
+        with mp.Pool(args.processes) as procs:
+            results = procs.map(run_process, [dict(spec, index=i) for i in range(args.processes)])
+    elapsed = time.perf_counter() - started
+
+    summary = summarize(results, elapsed)
+    if backend == "mysql":
+        after = lock_counters()
+        summary["server_locks"] = {k: after[k] - locks_before.get(k, 0)
+                                   for k in after if k in locks_before and not k.endswith(("_avg", "_max", "current_waits"))}
+    summary["meta"] = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "backend": backend,
+        "target": args.target,
+        "processes": args.processes,
+        "workers": args.workers,
+        "pool_size": config["database"]["pool"]["size"],
+        "mix": mix,
+        "duration": args.duration,
+    }
+    print_report(summary)
+
+    ui.svc.close()
+    DB.close_pool()
+    if remove_standin:
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(standin_path + suffix)
+            except OSError:
+                pass
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(json.dumps(summary, indent=2,
+                               default=lambda o: o.isoformat() if isinstance(o, date) else str(o)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Column projection benchmark: every column vs the DAO read projections.
+
+For each read it compares the full row (what SELECT * used to return)
+with the projection the callers now ask for, and reports per call:
+  - ops/sec of the DAO method
+  - result bytes, estimated as the text-protocol size of the values
+    (length prefix + value text), i.e. what crosses the wire
+  - fetch/decode time: cursor.fetchall() plus building the row dicts
+
+The existence case compares one campaign.get per ID (the old
+_ensure_exists) with a single batched existing_ids() query.
+
+Run from app_framework/src:
+    python -m benchmarks.projection --standin -n 2000
+    python -m benchmarks.projection -c ../config/IT566_app_config.json
+"""
+
+import json
+import time
+from argparse import ArgumentParser
+
+from Campaigns_and_Channels.data_layer.campaign_dao import CampaignDAO
+from Campaigns_and_Channels.data_layer.campaign_channel_xref_dao import CampaignChannelXrefDAO
+from Campaigns_and_Channels.data_layer.channel_dao import ChannelDAO
+from Campaigns_and_Channels.data_layer.db import DB, rows_to_dicts
+from Campaigns_and_Channels.data_layer.query_registry import QUERIES
+
+from . import generator, standin
+
+
+def _wire_bytes(rows) -> int:
+    total = 0
+    for row in rows:
+        for value in row:
+            total += 1 if value is None else 1 + len(str(value).encode())
+    return total
+
+
+def _statement(name: str, params) -> tuple:
+    """(bytes, fetch/decode seconds) of one execution of a registered template."""
+    conn = DB.get_connection()
+    try:
+        cur = DB.execute(conn, QUERIES.get(name), params)
+        started = time.perf_counter()
+        rows = cur.fetchall()
+        rows_to_dicts(cur, rows)
+        return _wire_bytes(rows), time.perf_counter() - started
+    finally:
+        conn.close()
+
+
+def _ops(fn, iterations: int) -> float:
+    fn()  # warm-up: registers the variant, prepares the statement
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - started
+    return iterations / elapsed if elapsed > 0 else float("inf")
+
+
+def build_cases(dataset: dict, list_limit: int, exists_batch: int) -> list:
+    """(case, variant, DAO call, [(template, params) it executes])"""
+    campaigns, channels, xref = CampaignDAO(), ChannelDAO(), CampaignChannelXrefDAO()
+    cid = dataset["campaign_ids"][len(dataset["campaign_ids"]) // 2]
+    ids = dataset["campaign_ids"][:exists_batch]
+    ref = ",".join(CampaignDAO.REF_FIELDS)
+    listing = ",".join(CampaignDAO.LIST_FIELDS)
+    ch_ref = ",".join(ChannelDAO.REF_FIELDS)
+    n = 1
+    while n < len(ids):
+        n *= 2
+    padded = sorted(ids) + [max(ids)] * (n - len(ids))
+    return [
+        ("campaign.get", "all", lambda: campaigns.get(cid),
+         [("campaign.get", (cid,))]),
+        ("campaign.get", "ref", lambda: campaigns.get(cid, CampaignDAO.REF_FIELDS),
+         [(f"campaign.get[{ref}]", (cid,))]),
+        ("campaign.list", "all", lambda: campaigns.list(limit=list_limit),
+         [("campaign.list", (list_limit, 0))]),
+        ("campaign.list", "list", lambda: campaigns.list(limit=list_limit, fields=CampaignDAO.LIST_FIELDS),
+         [(f"campaign.list[{listing}]", (list_limit, 0))]),
+        ("campaign.list", "ref", lambda: campaigns.list(limit=list_limit, fields=CampaignDAO.REF_FIELDS),
+         [(f"campaign.list[{ref}]", (list_limit, 0))]),
+        ("channel.list", "all", lambda: channels.list(limit=list_limit),
+         [("channel.list", (list_limit, 0))]),
+        ("channel.list", "ref", lambda: channels.list(limit=list_limit, fields=ChannelDAO.REF_FIELDS),
+         [(f"channel.list[{ch_ref}]", (list_limit, 0))]),
+        ("channels_for_campaign", "all", lambda: xref.list_channels_for_campaign(cid),
+         [("xref.list_channels_for_campaign", (cid,))]),
+        ("channels_for_campaign", "ref",
+         lambda: xref.list_channels_for_campaign(cid, ChannelDAO.REF_FIELDS),
+         [(f"xref.list_channels_for_campaign[{ch_ref}]", (cid,))]),
+        (f"exists x{len(ids)}", "get loop", lambda: [campaigns.get(i) for i in ids],
+         [("campaign.get", (i,)) for i in ids]),
+        (f"exists x{len(ids)}", "existing_ids", lambda: campaigns.existing_ids(ids),
+         [(f"campaign.existing_ids[{n}]", tuple(padded))]),
+    ]
+
+
+def bench(cases: list, iterations: int) -> list:
+    results = []
+    for case, variant, call, statements in cases:
+        ops = _ops(call, iterations)
+        nbytes, decode = 0, 0.0
+        rounds = max(1, iterations // 10)
+        for _ in range(rounds):
+            for name, params in statements:
+                b, seconds = _statement(name, params)
+                nbytes += b
+                decode += seconds
+        results.append({
+            "case": case,
+            "variant": variant,
+            "ops_per_sec": ops,
+            "queries_per_call": len(statements),
+            "bytes_per_call": nbytes / rounds,
+            "decode_us_per_call": decode / rounds * 1e6,
+        })
+    return results
+
+
+def main():
+    parser = ArgumentParser(
+        prog="benchmarks.projection",
+        description="Compare full-row reads with the DAO column projections.")
+    backend = parser.add_mutually_exclusive_group(required=True)
+    backend.add_argument("-c", "--configfile", help="App config for a local MySQL server.")
+    backend.add_argument("--standin", action="store_true", help="Use the SQLite stand-in.")
+    parser.add_argument("-n", "--iterations", type=int, default=1000)
+    parser.add_argument("--campaigns", type=int, default=1000)
+    parser.add_argument("--channels", type=int, default=100)
+    parser.add_argument("--list-limit", type=int, default=500)
+    parser.add_argument("--exists-batch", type=int, default=50)
+    parser.add_argument("-o", "--output", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    if args.configfile:
+        with open(args.configfile, "r") as f:
+            config = json.loads(f.read())
+        DB.init_pool(config)
+        DB.warm_up()
+    else:
+        standin.install()
+    dataset = generator.generate(
+        campaigns=args.campaigns, channels=args.channels, days=1,
+        reset_first=bool(args.standin),
+    )
+
+    results = bench(build_cases(dataset, args.list_limit, args.exists_batch), args.iterations)
+
+    print(f"\n{'CASE':<24} {'VARIANT':<14} {'OPS/SEC':>10} {'QUERIES':>8} "
+          f"{'BYTES':>10} {'DECODE_US':>10}")
+    for r in results:
+        print(f"{r['case']:<24} {r['variant']:<14} {r['ops_per_sec']:>10.1f} "
+              f"{r['queries_per_call']:>8} {r['bytes_per_call']:>10.0f} {r['decode_us_per_call']:>10.1f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Run the benchmark suite and write JSON results.
+
+Against the local SQLite stand-in (no server, no network):
+    python -m benchmarks.run --standin -o results.json
+
+Against a local MySQL server (use a dedicated database; --reset wipes it):
+    python -m benchmarks.run -c ../config/bench_config.json --reset -o results.json
+
+Run from app_framework/src. Results carry per-iteration samples so two
+files can be compared statistically between commits.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser
+from datetime import date
+
+from Campaigns_and_Channels.data_layer.db import DB
+from Campaigns_and_Channels.data_layer.instrumentation import DBStats
+from Campaigns_and_Channels.presentation_layer.user_interface import UserInterface
+
+from . import generator, standin
+from .scenarios import Context, build_scenarios, run_scenario, uncovered_commands
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=5,
+        )
+        return out.stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def configure_and_parse_commandline_arguments():
+    parser = ArgumentParser(
+        prog="benchmarks.run",
+        description="Run CampaignService / UserInterface benchmarks on synthetic data.")
+    backend = parser.add_mutually_exclusive_group(required=True)
+    backend.add_argument("-c", "--configfile", help="App config for a local MySQL server.")
+    backend.add_argument("--standin", nargs="?", const="", metavar="SQLITE_FILE",
+                         help="Use the SQLite stand-in (temp file unless a path is given).")
+    parser.add_argument("--campaigns", type=int, default=200)
+    parser.add_argument("--channels", type=int, default=50)
+    parser.add_argument("--density", type=float, default=0.1,
+                        help="Fraction of channels linked to each campaign.")
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true",
+                        help="Delete all rows from the core tables before loading.")
+    parser.add_argument("-n", "--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--only", action="append", default=[],
+                        help="Run only scenarios whose name contains this text (repeatable).")
+    parser.add_argument("-o", "--output", help="Write JSON results to this file.")
+    return parser.parse_args()
+
+
+def main():
+    args = configure_and_parse_commandline_arguments()
+
+    if args.configfile:
+        with open(args.configfile, "r") as f:
+            config = json.loads(f.read())
+        DB.init_pool(config)
+        DB.warm_up()  # keep pool creation out of the first scenario
+        backend = "mysql"
+    else:
+        config = {"database": {"pool": {"name": "standin", "size": 10}}}
+        DBStats.configure(config)
+        standin.install(args.standin or None)
+        backend = "standin"
+
+    dataset = generator.generate(
+        campaigns=args.campaigns,
+        channels=args.channels,
+        density=args.density,
+        days=args.days,
+        seed=args.seed,
+        reset_first=args.reset or backend == "standin",
+    )
+    print(f"loaded {len(dataset['campaign_ids'])} campaigns, {len(dataset['channel_ids'])} channels, "
+          f"{dataset['links']} links, {dataset['metric_rows']} metric rows "
+          f"in {dataset['seconds']:.2f}s", file=sys.stderr)
+
+    ui = UserInterface(config)
+    ctx = Context(ui.svc, ui, dataset)
+    scenarios = build_scenarios()
+
+    missing = uncovered_commands(ui, scenarios)
+    if missing:
+        print(f"warning: no scenario for UI command(s): {', '.join(missing)}", file=sys.stderr)
+
+    if args.only:
+        scenarios = [s for s in scenarios if any(o in s.name for o in args.only)]
+
+    results = {}
+    for scn in scenarios:
+        DBStats.reset()
+        r = run_scenario(scn, ctx, args.iterations, args.warmup)
+        results[scn.name] = r
+        print(f"{scn.name:<48} p50 {r['p50_ms']:>9.3f} ms  p95 {r['p95_ms']:>9.3f} ms  "
+              f"{r['ops_per_sec']:>9.1f} ops/s  {r['queries_per_op']:>5.1f} q/op", file=sys.stderr)
+
+    ui.svc.close()
+    DB.close_pool()
+
+    doc = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": backend,
+            "dataset": {
+                "campaigns": args.campaigns,
+                "channels": args.channels,
+                "density": args.density,
+                "days": args.days,
+                "seed": args.seed,
+            },
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+        },
+        "scenarios": results,
+    }
+
+    text = json.dumps(doc, indent=2, default=lambda o: o.isoformat() if isinstance(o, date) else str(o))
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Benchmark scenarios: one per CampaignService method and UserInterface command.
+
+A scenario is a named callable run(ctx, i, prepared) timed per iteration,
+with an optional untimed prepare(ctx, i) step for operations that consume
+state (deletes, unlinks, ...). UI scenarios drive UserInterface.handle()
+with stdout discarded, so they include parsing and rendering cost but not
+terminal I/O.
+"""
+
+import contextlib
+import itertools
+import os
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+
+from Campaigns_and_Channels.data_layer.query_registry import QUERIES
+
+
+class Scenario:
+    """A named, repeatable benchmark operation."""
+
+    def __init__(self, name: str, run, prepare=None, group: str = "service") -> None:
+        self.name = name
+        self.run = run
+        self.prepare = prepare
+        self.group = group
+
+
+class Context:
+    """Shared state for scenarios: service, UI and the generated dataset."""
+
+    def __init__(self, svc, ui, dataset: dict) -> None:
+        self.svc = svc
+        self.ui = ui
+        self.data = dataset
+        self._seq = itertools.count(1)  # next() is atomic: safe across threads
+
+    def campaign_id(self, i: int) -> int:
+        ids = self.data["campaign_ids"]
+        return ids[(i * 7919) % len(ids)]
+
+    def channel_id(self, i: int) -> int:
+        ids = self.data["channel_ids"]
+        return ids[(i * 104729) % len(ids)]
+
+    def day(self, i: int):
+        span = (self.data["end"] - self.data["start"]).days + 1
+        return self.data["start"] + timedelta(days=i % span)
+
+    def week(self, n: int):
+        """(start, end) of the n-th 7-day window of the dataset."""
+        start = self.data["start"] + timedelta(days=7 * n)
+        return start, start + timedelta(days=6)
+
+    def unique(self, label: str) -> str:
+        return f"bench-{label}-{os.getpid()}-{next(self._seq)}"
+
+    def new_campaign(self, i: int) -> int:
+        return self.svc.create_campaign(
+            self.unique("campaign"), self.data["start"], self.data["end"], 1000
+        )
+
+    def new_channel(self, i: int) -> int:
+        return self.svc.create_channel(self.unique("channel"), "Other")
+
+    def new_linked_campaign(self, i: int) -> int:
+        cid = self.new_campaign(i)
+        self.svc.attach_channel(cid, self.channel_id(i))
+        return cid
+
+    def metrics_csv(self, i: int, rows: int = 24) -> str:
+        """Write a small delta CSV for the bulk-increment command."""
+        path = os.path.join(tempfile.gettempdir(), f"it566_bench_{os.getpid()}.csv")
+        with open(path, "w") as f:
+            f.write("campaign_id,date,impressions,clicks,spend_cents,revenue_cents\n")
+            for k in range(rows):
+                f.write(f"{self.campaign_id(i + k)},{self.day(i)},10,1,25,90\n")
+        return path
+
+
+def _total_queries() -> int:
+    return sum(t.calls for t in QUERIES.all())
+
+
+def run_scenario(scn: Scenario, ctx: Context, iterations: int, warmup: int) -> dict:
+    """Run one scenario and return samples plus summary statistics."""
+    samples = []
+    queries = 0
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for i in range(warmup + iterations):
+            prepared = scn.prepare(ctx, i) if scn.prepare else None
+            before = _total_queries()
+            started = time.perf_counter()
+            scn.run(ctx, i, prepared)
+            elapsed = time.perf_counter() - started
+            if i >= warmup:
+                samples.append(elapsed * 1000.0)
+                queries += _total_queries() - before
+
+    ordered = sorted(samples)
+    total_s = sum(samples) / 1000.0
+    return {
+        "group": scn.group,
+        "iterations": iterations,
+        "samples_ms": samples,
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": ordered[len(ordered) // 2],
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "ops_per_sec": (iterations / total_s) if total_s > 0 else 0.0,
+        "queries_per_op": queries / iterations,
+    }
+
+
+def _ui(line_fn):
+    """UI scenario: build a command line and dispatch it through handle()."""
+    def run(ctx, i, prepared):
+        ctx.ui.handle(line_fn(ctx, i, prepared))
+    return run
+
+
+def build_scenarios() -> list:
+    s = []
+
+    # ---------------------------------------------------------- #
+    # SERVICE LAYER
+    # ---------------------------------------------------------- #
+    s += [
+        Scenario("svc.create_campaign",
+                 lambda c, i, p: c.svc.create_campaign(c.unique("c"), c.data["start"], c.data["end"], 500)),
+        Scenario("svc.get_campaign", lambda c, i, p: c.svc.get_campaign(c.campaign_id(i))),
+        Scenario("svc.get_campaign_detail", lambda c, i, p: c.svc.get_campaign_detail(c.campaign_id(i))),
+        Scenario("svc.get_campaigns",
+                 lambda c, i, p: c.svc.get_campaigns([c.campaign_id(i + k) for k in range(50)])),
+        Scenario("svc.list_campaigns", lambda c, i, p: c.svc.list_campaigns(limit=50, offset=0)),
+        Scenario("svc.list_campaigns.search", lambda c, i, p: c.svc.list_campaigns(limit=50, q="campaign-0001")),
+        Scenario("svc.list_campaigns.include_channels",
+                 lambda c, i, p: c.svc.list_campaigns(limit=50, include_channels=True)),
+        Scenario("svc.update_campaign",
+                 lambda c, i, p: c.svc.update_campaign(c.campaign_id(i), budget_cents=1000 + i)),
+        Scenario("svc.set_campaign_status",
+                 lambda c, i, p: c.svc.set_campaign_status(c.campaign_id(i), ("active", "paused")[i % 2])),
+        Scenario("svc.delete_campaign_safe",
+                 lambda c, i, p: c.svc.delete_campaign_safe(p, force=True),
+                 prepare=lambda c, i: c.new_campaign(i)),
+        Scenario("svc.create_channel", lambda c, i, p: c.svc.create_channel(c.unique("ch"), "Other")),
+        Scenario("svc.list_channels", lambda c, i, p: c.svc.list_channels(limit=100, offset=0)),
+        Scenario("svc.get_channels",
+                 lambda c, i, p: c.svc.get_channels([c.channel_id(i + k) for k in range(20)])),
+        Scenario("svc.update_channel",
+                 lambda c, i, p: c.svc.update_channel(p, ch_type="display"),
+                 prepare=lambda c, i: c.new_channel(i)),
+        Scenario("svc.delete_channel_safe",
+                 lambda c, i, p: c.svc.delete_channel_safe(p, force=True),
+                 prepare=lambda c, i: c.new_channel(i)),
+        Scenario("svc.attach_channel",
+                 lambda c, i, p: c.svc.attach_channel(p, c.channel_id(i)),
+                 prepare=lambda c, i: c.new_campaign(i)),
+        Scenario("svc.detach_channel",
+                 lambda c, i, p: c.svc.detach_channel(p, c.channel_id(i)),
+                 prepare=lambda c, i: c.new_linked_campaign(i)),
+        Scenario("svc.list_channels_for_campaign",
+                 lambda c, i, p: c.svc.list_channels_for_campaign(c.campaign_id(i))),
+        Scenario("svc.upsert_campaign_daily_metrics",
+                 lambda c, i, p: c.svc.upsert_campaign_daily_metrics(c.campaign_id(i), c.day(i), 100, 5, 250, 900)),
+        Scenario("svc.increment_campaign_daily_metrics",
+                 lambda c, i, p: c.svc.increment_campaign_daily_metrics(c.campaign_id(i), c.day(i), 10, 1, 25, 90)),
+        Scenario("svc.increment_campaign_daily_metrics_many",
+                 lambda c, i, p: c.svc.increment_campaign_daily_metrics_many(
+                     [(c.campaign_id(i + k), c.day(i), 10, 1, 25, 90) for k in range(24)])),
+        Scenario("svc.flush_metrics", lambda c, i, p: c.svc.flush_metrics()),
+        Scenario("svc.get_campaign_performance.all_time",
+                 lambda c, i, p: c.svc.get_campaign_performance(c.campaign_id(i))),
+        Scenario("svc.get_campaign_performance.range",
+                 lambda c, i, p: c.svc.get_campaign_performance(
+                     c.campaign_id(i), c.data["start"], c.data["start"] + timedelta(days=29))),
+        # campaigns for a channel: indexed keyset query vs filtering every mapping
+        Scenario("svc.get_campaigns_for_channels.one",
+                 lambda c, i, p: c.svc.get_campaigns_for_channels([c.channel_id(i)])),
+        Scenario("svc.get_campaigns_for_channels.one.mapping_scan",
+                 lambda c, i, p: [m for m in c.svc.xref.list_all_mappings()
+                                  if m["channel_id"] == c.channel_id(i)]),
+        Scenario("svc.get_campaigns_for_channels.many",
+                 lambda c, i, p: c.svc.get_campaigns_for_channels(
+                     {c.channel_id(i + k) for k in range(10)})),
+        Scenario("svc.list_campaigns_for_channel",
+                 lambda c, i, p: c.svc.list_campaigns_for_channel(c.channel_id(i), limit=50)),
+        # this week vs last week: one conditional-aggregation query, against
+        # the two get_campaign_performance calls per campaign it replaces
+        Scenario("svc.compare_campaign_performance.one",
+                 lambda c, i, p: c.svc.compare_campaign_performance(
+                     *c.week(1), campaign_ids=[c.campaign_id(i)])),
+        Scenario("svc.compare_campaign_performance.all",
+                 lambda c, i, p: c.svc.compare_campaign_performance(*c.week(1))),
+        Scenario("svc.compare_campaign_performance.all.2n_calls",
+                 lambda c, i, p: [c.svc.get_campaign_performance(cid, *c.week(w))
+                                  for cid in c.data["campaign_ids"] for w in (1, 0)]),
+        Scenario("svc.verify_lifetime_metrics", lambda c, i, p: c.svc.verify_lifetime_metrics()),
+        Scenario("svc.inspect_database", lambda c, i, p: c.svc.inspect_database()),
+        Scenario("svc.database_stats", lambda c, i, p: c.svc.database_stats()),
+    ]
+
+    # ---------------------------------------------------------- #
+    # USER INTERFACE COMMANDS (through handle())
+    # ---------------------------------------------------------- #
+    g = "ui"
+    s += [
+        Scenario("ui.help", _ui(lambda c, i, p: "help"), group=g),
+        Scenario("ui.campaign:list", _ui(lambda c, i, p: "campaign:list"), group=g),
+        Scenario("ui.campaign:add",
+                 _ui(lambda c, i, p: f"campaign:add {c.unique('ui')} 2025-01-01 2025-03-31 1000"), group=g),
+        Scenario("ui.campaign:delete", _ui(lambda c, i, p: f"campaign:delete {p} --force"),
+                 prepare=lambda c, i: c.new_campaign(i), group=g),
+        Scenario("ui.campaign:get", _ui(lambda c, i, p: f"campaign:get {c.campaign_id(i)}"), group=g),
+        Scenario("ui.campaign:get.many",
+                 _ui(lambda c, i, p: "campaign:get " + " ".join(str(c.campaign_id(i + k)) for k in range(10))),
+                 group=g),
+        Scenario("ui.campaign:update",
+                 _ui(lambda c, i, p: f"campaign:update {p} {c.unique('upd')}"),
+                 prepare=lambda c, i: c.new_campaign(i), group=g),
+        Scenario("ui.campaign:set-status",
+                 _ui(lambda c, i, p: f"campaign:set-status {c.campaign_id(i)} active"), group=g),
+        Scenario("ui.campaign:channels",
+                 _ui(lambda c, i, p: f"campaign:channels {c.campaign_id(i)}"), group=g),
+        Scenario("ui.campaign:perf", _ui(lambda c, i, p: f"campaign:perf {c.campaign_id(i)}"), group=g),
+        Scenario("ui.campaign:perf:compare",
+                 _ui(lambda c, i, p: "campaign:perf:compare {} {}".format(*c.week(1))), group=g),
+        Scenario("ui.campaign:metrics:upsert",
+                 _ui(lambda c, i, p: f"campaign:metrics:upsert {c.campaign_id(i)} {c.day(i)} 100 5 250 900"), group=g),
+        Scenario("ui.campaign:metrics:increment",
+                 _ui(lambda c, i, p: f"campaign:metrics:increment {c.campaign_id(i)} {c.day(i)} 1 1 1 1"), group=g),
+        Scenario("ui.campaign:metrics:increment:bulk",
+                 _ui(lambda c, i, p: f"campaign:metrics:increment:bulk {p}"),
+                 prepare=lambda c, i: c.metrics_csv(i), group=g),
+        Scenario("ui.campaign:metrics:flush", _ui(lambda c, i, p: "campaign:metrics:flush"), group=g),
+        Scenario("ui.campaign:metrics:verify", _ui(lambda c, i, p: "campaign:metrics:verify"), group=g),
+        Scenario("ui.channel:list", _ui(lambda c, i, p: "channel:list"), group=g),
+        Scenario("ui.channel:add", _ui(lambda c, i, p: f"channel:add {c.unique('uich')} Other"), group=g),
+        Scenario("ui.channel:campaigns",
+                 _ui(lambda c, i, p: f"channel:campaigns {c.channel_id(i)}"), group=g),
+        Scenario("ui.channel:delete", _ui(lambda c, i, p: f"channel:delete {p} --force"),
+                 prepare=lambda c, i: c.new_channel(i), group=g),
+        Scenario("ui.channel:update",
+                 _ui(lambda c, i, p: f"channel:update {p} {c.unique('uichu')} display"),
+                 prepare=lambda c, i: c.new_channel(i), group=g),
+        Scenario("ui.link", _ui(lambda c, i, p: f"link {p} {c.channel_id(i)}"),
+                 prepare=lambda c, i: c.new_campaign(i), group=g),
+        Scenario("ui.unlink", _ui(lambda c, i, p: f"unlink {c.campaign_id(i)} {c.channel_id(i)}"), group=g),
+        Scenario("ui.inspect:db", _ui(lambda c, i, p: "inspect:db"), group=g),
+        Scenario("ui.stats:db", _ui(lambda c, i, p: "stats:db"), group=g),
+        # a real purge would eat the dataset: time the planning counts only
+        Scenario("ui.db:purge", _ui(lambda c, i, p: "db:purge --dry-run"), group=g),
+    ]
+    return s
+
+
+def uncovered_commands(ui, scenarios) -> list:
+    """UI commands with no ui.<command> scenario (kept in sync by run.py)."""
+    covered = {s.name[3:] for s in scenarios if s.group == "ui"}
+    return sorted(cmd for cmd in ui.commands if cmd not in covered)
@@ -0,0 +1,241 @@
+"""
+Local, network-free stand-in for the MySQL connection pool.
+
+Backs DB with SQLite so benchmarks (and anything else that only needs the
+DAO/service code paths) can run without a MySQL server. The stand-in
+translates the handful of MySQL-only constructs the DAOs use
+(%s placeholders, ON DUPLICATE KEY UPDATE / VALUES(), INSERT IGNORE,
+JSON_ARRAYAGG / JSON_OBJECT, ...) and mirrors the core schema from
+database/mysql/tests/schema/01_schema.sql.
+
+Timings taken against the stand-in are only comparable with other
+stand-in runs; use a local MySQL server (e.g. over a unix socket) for
+absolute numbers.
+"""
+
+import os
+import queue
+import re
+import sqlite3
+import tempfile
+import threading
+from datetime import date, datetime
+
+from Campaigns_and_Channels.data_layer.db import DB
+
+try:
+    from mysql.connector.errors import PoolError
+except ImportError:  # the stand-in itself does not need the driver
+    class PoolError(Exception):
+        """Raised when every stand-in connection is checked out."""
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channel (
+  channel_id   INTEGER PRIMARY KEY AUTOINCREMENT,
+  name         VARCHAR(255) NOT NULL UNIQUE,
+  type         VARCHAR(50)  NOT NULL DEFAULT 'Other',
+  created_at   TIMESTAMP    NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS campaign (
+  campaign_id  INTEGER PRIMARY KEY AUTOINCREMENT,
+  name         VARCHAR(255) NOT NULL,
+  start_date   DATE,
+  end_date     DATE,
+  status       VARCHAR(16) NOT NULL DEFAULT 'draft'
+                 CHECK (status IN ('draft','active','paused','archived')),
+  budget_cents BIGINT NOT NULL DEFAULT 0,
+  created_at   TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_campaign_name ON campaign (name);
+CREATE TABLE IF NOT EXISTS campaign_channel_xref (
+  campaign_id INT NOT NULL REFERENCES campaign (campaign_id) ON DELETE CASCADE,
+  channel_id  INT NOT NULL REFERENCES channel (channel_id) ON DELETE CASCADE,
+  PRIMARY KEY (campaign_id, channel_id)
+);
+CREATE INDEX IF NOT EXISTS fk_ccx_channel ON campaign_channel_xref (channel_id);
+CREATE TABLE IF NOT EXISTS campaign_daily_metrics (
+  campaign_id   INT NOT NULL REFERENCES campaign (campaign_id) ON DELETE CASCADE,
+  metric_date   DATE NOT NULL,
+  impressions   INT DEFAULT 0,
+  clicks        INT DEFAULT 0,
+  spend_cents   BIGINT DEFAULT 0,
+  revenue_cents BIGINT DEFAULT 0,
+  PRIMARY KEY (campaign_id, metric_date)
+);
+"""
+
+# (pattern, replacement) applied in order to every statement
+_TRANSLATIONS = [
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"ON DUPLICATE KEY UPDATE", re.I), "ON CONFLICT DO UPDATE SET"),
+    (re.compile(r"\bVALUES\((\w+)\)"), r"excluded.\1"),
+    (re.compile(r"\bINSERT IGNORE\b", re.I), "INSERT OR IGNORE"),
+    (re.compile(r"\bNOW\(\)", re.I), "CURRENT_TIMESTAMP"),
+    (re.compile(r"\bFOR UPDATE\b", re.I), ""),
+    (re.compile(r"\bJSON_ARRAYAGG\(", re.I), "json_group_array("),
+    (re.compile(r"\bJSON_OBJECT\(", re.I), "json_object("),
+]
+
+_translated: dict = {}
+
+
+def translate(sql: str) -> str:
+    """MySQL statement -> SQLite statement (memoized)."""
+    out = _translated.get(sql)
+    if out is None:
+        out = sql
+        for pattern, repl in _TRANSLATIONS:
+            out = pattern.sub(repl, out)
+        _translated[sql] = out
+    return out
+
+
+def _register_types() -> None:
+    sqlite3.register_adapter(date, lambda d: d.isoformat())
+    sqlite3.register_adapter(datetime, lambda d: d.isoformat(" "))
+    sqlite3.register_converter("DATE", lambda b: date.fromisoformat(b.decode()))
+    sqlite3.register_converter(
+        "TIMESTAMP", lambda b: datetime.fromisoformat(b.decode())
+    )
+
+
+_register_types()
+
+
+class StandInCursor:
+    """Subset of the mysql-connector cursor API used by the DAOs."""
+
+    def __init__(self, connection: "StandInConnection") -> None:
+        self._connection = connection
+        self._cur = connection._db.cursor()
+        self.description = None
+        self.rowcount = -1
+        self.lastrowid = None
+
+    @property
+    def with_rows(self) -> bool:
+        return self.description is not None
+
+    def execute(self, operation: str, params=()):
+        self._cur.execute(translate(operation), tuple(params or ()))
+        self._sync()
+
+    def executemany(self, operation: str, seq_params):
+        self._cur.executemany(translate(operation), [tuple(p) for p in seq_params])
+        self._sync()
+
+    def _sync(self) -> None:
+        self.description = self._cur.description
+        self.rowcount = self._cur.rowcount
+        self.lastrowid = self._cur.lastrowid
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    def fetchmany(self, size: int = 1):
+        return self._cur.fetchmany(size)
+
+    def close(self) -> None:
+        self._cur.close()
+
+
+class StandInConnection:
+    """One SQLite connection handed out by StandInPool."""
+
+    def __init__(self, pool: "StandInPool", path: str) -> None:
+        self._pool = pool
+        self._db = sqlite3.connect(
+            path,
+            timeout=30,
+            check_same_thread=False,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+        )
+        self._db.execute("PRAGMA foreign_keys = ON")
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = NORMAL")
+
+    def cursor(self, prepared: bool = False, raw: bool = False, **kwargs):  # noqa: ARG002
+        return StandInCursor(self)
+
+    def start_transaction(self) -> None:
+        if not self._db.in_transaction:
+            self._db.execute("BEGIN")
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._db.in_transaction
+
+    def commit(self) -> None:
+        self._db.commit()
+
+    def rollback(self) -> None:
+        self._db.rollback()
+
+    def close(self) -> None:
+        """Return to the pool; like a session reset, open work is rolled back."""
+        if self._db.in_transaction:
+            self._db.rollback()
+        self._pool._release(self)
+
+
+class StandInPool:
+    """
+    Fixed-size pool of SQLite connections to one database file.
+    Like MySQLConnectionPool, checkout fails fast with PoolError when empty.
+    """
+
+    def __init__(self, path: str = None, size: int = 10) -> None:
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="it566_standin_", suffix=".db")
+            os.close(fd)
+            self._owns_file = True
+        else:
+            self._owns_file = False
+        self.path = path
+        self.size = size
+        self._idle: "queue.Queue[StandInConnection]" = queue.Queue()
+        self._lock = threading.Lock()
+
+        for _ in range(size):
+            self._idle.put(StandInConnection(self, path))
+
+        conn = self.get_connection()
+        try:
+            conn._db.executescript(SCHEMA)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_connection(self) -> StandInConnection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            raise PoolError("Failed getting connection; pool exhausted")
+
+    def _release(self, conn: StandInConnection) -> None:
+        self._idle.put(conn)
+
+    def _remove_connections(self) -> None:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn._db.close()
+        if self._owns_file:
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.remove(self.path + suffix)
+                except OSError:
+                    pass
+
+
+def install(path: str = None, size: int = 10) -> StandInPool:
+    """Create a stand-in pool and make DB use it."""
+    pool = StandInPool(path, size)
+    DB.use_pool(pool)
+    return pool
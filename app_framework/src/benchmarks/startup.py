@@ -0,0 +1,139 @@
+"""
+Measure CLI startup cost.
+
+Runs fresh interpreters with `python -X importtime` and reports:
+  - total import time and the slowest top-level imports for each entry
+    point (main.py, plus the modules each mode loads lazily)
+  - wall-clock time of `main.py --exec help`, which must not connect to
+    the database (the pool is only built on the first query)
+  - whether mysql.connector was imported at all
+
+    python -m benchmarks.startup --repeats 10 -o startup.json
+
+Run from app_framework/src. No database is needed: the config written
+for the help run points at an unreachable server on purpose.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# entry point -> code executed under -X importtime
+ENTRIES = {
+    "main": "import main",
+    "interactive": "import main; import Campaigns_and_Channels.presentation_layer.user_interface",
+    "batch": "import main; import Campaigns_and_Channels.presentation_layer.batch",
+    "serve": "import main; import Campaigns_and_Channels.presentation_layer.http_api",
+}
+
+_HELP_CONFIG = {
+    "meta": {"log_prefix": "startup"},
+    "database": {
+        "pool": {"name": "startup", "size": 10},
+        "connection": {"config": {
+            "host": "127.0.0.1", "port": 1, "user": "none", "password": "", "database": "none",
+        }},
+    },
+}
+
+
+def parse_importtime(stderr: str) -> list:
+    """[(module, self_us, cumulative_us, depth)] from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cum_us), depth))
+    return rows
+
+
+def measure_imports(code: str, repeats: int) -> dict:
+    totals, per_module, mysql = [], {}, False
+    for _ in range(repeats):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=SRC, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+        rows = parse_importtime(proc.stderr)
+        totals.append(sum(r[1] for r in rows) / 1000.0)
+        for name, _self, cum, depth in rows:
+            if depth == 0:
+                per_module.setdefault(name, []).append(cum / 1000.0)
+            if name.startswith("mysql"):
+                mysql = True
+    slowest = sorted(
+        ((name, statistics.median(v)) for name, v in per_module.items()),
+        key=lambda kv: kv[1], reverse=True,
+    )[:10]
+    return {
+        "import_ms_p50": statistics.median(totals),
+        "import_ms_min": min(totals),
+        "imports_mysql": mysql,
+        "slowest_top_level": [{"module": n, "cumulative_ms": ms} for n, ms in slowest],
+    }
+
+
+def measure_help(repeats: int) -> dict:
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(_HELP_CONFIG, f)
+        config_path = f.name
+    samples = []
+    try:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            proc = subprocess.run(
+                [sys.executable, "main.py", "-c", config_path, "--exec", "help"],
+                cwd=SRC, capture_output=True, text=True,
+            )
+            samples.append((time.perf_counter() - started) * 1000.0)
+            if proc.returncode != 0:
+                raise RuntimeError(f"'--exec help' failed: {proc.stderr.strip() or proc.stdout.strip()}")
+    finally:
+        os.unlink(config_path)
+    return {"wall_ms_p50": statistics.median(samples), "wall_ms_min": min(samples)}
+
+
+def main():
+    parser = ArgumentParser(
+        prog="benchmarks.startup",
+        description="Measure CLI import time and cold-start latency.",
+    )
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--no-help-run", action="store_true",
+                        help="Only measure imports (skip running main.py --exec help).")
+    parser.add_argument("-o", "--output", help="Write JSON results to this file.")
+    args = parser.parse_args()
+
+    results = {"python": sys.version.split()[0], "repeats": args.repeats, "imports": {}}
+    for name, code in ENTRIES.items():
+        r = measure_imports(code, args.repeats)
+        results["imports"][name] = r
+        top = ", ".join(f"{m['module']} {m['cumulative_ms']:.1f}" for m in r["slowest_top_level"][:3])
+        print(f"{name:<12} imports p50 {r['import_ms_p50']:>8.1f} ms  "
+              f"mysql {'yes' if r['imports_mysql'] else 'no ':<3}  slowest: {top}", file=sys.stderr)
+
+    if not args.no_help_run:
+        results["help"] = measure_help(args.repeats)
+        print(f"{'--exec help':<12} wall    p50 {results['help']['wall_ms_p50']:>8.1f} ms", file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Tight-loop benchmark for the DAO statement cache.
+
+Runs CampaignDAO.get and CampaignChannelXrefDAO.get_campaign_performance
+N times with server-side prepared statements on, then off, and prints
+ops/sec plus the per-template counters from the query registry.
+
+Run from app_framework/src:
+    python -m benchmarks.statement_cache -c ../config/IT566_app_config.json -n 5000
+"""
+
+import json
+import time
+from argparse import ArgumentParser
+from datetime import date, timedelta
+
+from Campaigns_and_Channels.data_layer.db import DB
+from Campaigns_and_Channels.data_layer.campaign_dao import CampaignDAO
+from Campaigns_and_Channels.data_layer.campaign_channel_xref_dao import CampaignChannelXrefDAO
+from Campaigns_and_Channels.data_layer.query_registry import QUERIES
+
+
+def run_loop(fn, iterations: int) -> float:
+    """Call fn() iterations times and return ops/sec."""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - started
+    return iterations / elapsed if elapsed > 0 else float("inf")
+
+
+def bench(campaign_id: int, iterations: int, warmup: int) -> dict:
+    campaigns = CampaignDAO()
+    xref = CampaignChannelXrefDAO()
+    end = date.today()
+    start = end - timedelta(days=30)
+
+    cases = {
+        "campaign.get": lambda: campaigns.get(campaign_id),
+        "perf.all_time": lambda: xref.get_campaign_performance(campaign_id),
+        "perf.range": lambda: xref.get_campaign_performance(campaign_id, start, end),
+    }
+
+    results = {}
+    for mode, prepared in (("prepared", True), ("text", False)):
+        DB.set_prepared(prepared)
+        for name, fn in cases.items():
+            run_loop(fn, warmup)
+            results[f"{name}/{mode}"] = run_loop(fn, iterations)
+    return results
+
+
+def main():
+    parser = ArgumentParser(
+        prog="benchmarks.statement_cache",
+        description="Benchmark DAO calls with and without prepared statements.")
+    parser.add_argument("-c", "--configfile", required=True,
+                        help="Configuration file to load.")
+    parser.add_argument("-n", "--iterations", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--campaign-id", type=int, default=1)
+    args = parser.parse_args()
+
+    with open(args.configfile, "r") as f:
+        config = json.loads(f.read())
+    # prepared statements only survive checkouts when the pool keeps sessions
+    config["database"]["pool"]["reset_session"] = False
+    DB.init_pool(config)
+    DB.warm_up()
+
+    results = bench(args.campaign_id, args.iterations, args.warmup)
+
+    print(f"\n{'CASE':<28} {'OPS/SEC':>12}")
+    for name, ops in results.items():
+        print(f"{name:<28} {ops:>12.1f}")
+
+    print(f"\n{'TEMPLATE':<45} {'CALLS':>8} {'AVG_MS':>9} {'MAX_MS':>9}")
+    for row in QUERIES.stats():
+        print(f"{row['template']:<45} {row['calls']:>8} "
+              f"{row['avg_ms']:>9.3f} {row['max_ms']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 """Entry point for the Employee Training Application."""
 
-import json
+import sys
 from argparse import ArgumentParser
-from Campaigns_and_Channels.presentation_layer.user_interface import UserInterface
+from Campaigns_and_Channels.config import CONFIG, ConfigError
+from Campaigns_and_Channels.presentation_layer.output import FORMATS
 
 
 
@@ -12,10 +13,53 @@ def main():
 
 	if args.configfile:
 		config = None
-		with open(args.configfile, 'r') as f:
-			config = json.loads(f.read())
+		try:
+			# parsed and validated once; shared process-wide through CONFIG
+			config = CONFIG.load_config(args.configfile)
+		except ConfigError as e:
+			print(f"ERROR: {e}", file=sys.stderr)
+			sys.exit(2)
 
-	ui = UserInterface(config)
+	if args.audit_queries:
+		from Campaigns_and_Channels.data_layer.query_audit import QueryAudit
+		QueryAudit.configure(config, mode=args.audit_queries)
+
+	profiler = None
+	if args.profile or args.profile_memory or config.get('profiling', {}).get('enabled'):
+		from Campaigns_and_Channels.profiling import CommandProfiler
+		profiler = CommandProfiler.from_config(
+			config,
+			memory=args.profile_memory or None,
+			sample_rate=args.profile_rate,
+			dir=args.profile_dir,
+		)
+
+	# each mode imports only what it needs (see benchmarks/startup.py)
+	if args.serve:
+		from Campaigns_and_Channels.presentation_layer.http_api import serve
+		CONFIG.watch()
+		serve(config, host=args.host, port=args.port)
+		return
+
+	if args.script or args.exec_commands:
+		from Campaigns_and_Channels.presentation_layer.batch import read_script, run_batch, split_commands
+		commands = read_script(args.script) if args.script else []
+		if args.exec_commands:
+			commands += split_commands(args.exec_commands)
+		sys.exit(run_batch(
+			config,
+			commands,
+			transactional=args.transaction,
+			parallel=args.parallel,
+			stop_on_error=args.stop_on_error,
+			output_format=args.format,
+			trace=args.trace,
+			profiler=profiler,
+		))
+
+	from Campaigns_and_Channels.presentation_layer.user_interface import UserInterface
+	ui = UserInterface(config, output_format=args.format, trace=args.trace, profiler=profiler)
+	CONFIG.watch()
 	ui.start()
 			
 		
@@ -31,7 +75,39 @@ def configure_and_parse_commandline_arguments():
 	parser.add_argument('-c','--configfile',
 					help="Configuration file to load.",
 					required=True)
+	parser.add_argument('--format', choices=FORMATS, default='table',
+					help="Output format for listings and reports (commands may override with --format).")
+	parser.add_argument('--script', metavar='FILE',
+					help="Run the commands in FILE ('-' for stdin) and exit; prints one JSON result per command.")
+	parser.add_argument('--exec', dest='exec_commands', metavar='COMMANDS',
+					help="Run ';'-separated commands and exit, like --script.")
+	parser.add_argument('--transaction', action='store_true',
+					help="With --script/--exec: run all commands in one transaction; any failure rolls back all.")
+	parser.add_argument('--parallel', type=int, default=1, metavar='N',
+					help="With --script/--exec: run independent commands on N threads.")
+	parser.add_argument('--stop-on-error', action='store_true',
+					help="With --script/--exec: stop at the first failing command.")
+	parser.add_argument('--trace', action='store_true',
+					help="Print a timing waterfall (parse, service, DAO, pool checkout, SQL, render) after each command.")
+	parser.add_argument('--profile', action='store_true',
+					help="Profile commands with cProfile; reports go to <logs_dir>/profiles.")
+	parser.add_argument('--profile-memory', action='store_true',
+					help="With --profile: also trace allocations (tracemalloc top-N per command).")
+	parser.add_argument('--profile-rate', type=float, default=None, metavar='R',
+					help="With --profile: profile this fraction of commands (e.g. 0.01).")
+	parser.add_argument('--profile-dir', default=None, metavar='DIR',
+					help="With --profile: directory for .pstats and report files.")
+	parser.add_argument('--audit-queries', choices=('warn', 'fail'), default=None,
+					help="Report commands that repeat a query or run one template too often (N+1); 'fail' also fails them.")
+	parser.add_argument('--serve', action='store_true',
+					help="Serve the HTTP/JSON API instead of the interactive menu.")
+	parser.add_argument('--host', default=None,
+					help="With --serve: address to bind (default: config http.host or 127.0.0.1).")
+	parser.add_argument('--port', type=int, default=None,
+					help="With --serve: port to listen on (default: config http.port or 8080).")
 	args = parser.parse_args()
+	if args.transaction and args.parallel > 1:
+		parser.error("--transaction cannot be combined with --parallel")
 	return args
 
 